@@ -0,0 +1,84 @@
+"""Measure per-request CPU time of proxy routes on a warm cache, with and without the encoded response cache.
+
+Without it, every request runs the DTO transfer, JSON encoding and - for clients accepting gzip - compression.
+
+Run with::
+
+    python -m benchmarks.bench_encoded_response
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from typing import Any
+
+from aiohttp import web
+from benchmarks.bench_response_parser import course_search_body, subjects_body
+
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.gettempdir()}/bench_encoded_response.sqlite3")
+
+from litestar.testing import TestClient
+
+import src.controller.proxy.services as services
+from src.asgi.app import app
+from src.config.app import settings
+
+BODIES = {
+    services.SUBJECT_TARGET: subjects_body(500),
+    services.COURSE_SEARCH_TARGET: course_search_body(500),
+}
+CASES = [
+    ("subjects (500 rows)", "/proxy/subject"),
+    ("course search (500 rows)", "/proxy/course?subject_areas=COMP%20SCI&page_size=500"),
+]
+
+
+async def upstream(request: web.Request) -> web.Response:
+    return web.Response(body=BODIES[request.query["target"]], content_type="application/json")
+
+
+def start_upstream() -> str:
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(web.Application())
+    runner.app.router.add_get("/", upstream)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    port = runner.addresses[0][1]
+    return f"http://127.0.0.1:{port}/"
+
+
+def cpu_per_request(client: TestClient[Any], path: str, accept_encoding: str, number: int = 300) -> float:
+    headers = {"Accept-Encoding": accept_encoding}
+    client.get(path, headers=headers).raise_for_status()
+    start = time.process_time()
+    for _ in range(number):
+        client.get(path, headers=headers)
+    return (time.process_time() - start) / number
+
+
+def run() -> None:
+    services.API_END_POINT = start_upstream()
+    print(f"{'route':<26}{'encoding':<10}{'uncached ms':>13}{'cached ms':>11}")  # noqa: T201
+    results: dict[tuple[str, str, bool], float] = {}
+    for cached in (False, True):
+        settings.proxy.RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024 if cached else 0
+        settings.proxy.RESPONSE_CACHE_GZIP = cached
+        with TestClient(app) as client:
+            for name, path in CASES:
+                for accept_encoding in ("identity", "gzip"):
+                    results[(name, accept_encoding, cached)] = cpu_per_request(client, path, accept_encoding)
+    for name, _ in CASES:
+        for accept_encoding in ("identity", "gzip"):
+            uncached = results[(name, accept_encoding, False)] * 1000
+            cached = results[(name, accept_encoding, True)] * 1000
+            print(f"{name:<26}{accept_encoding:<10}{uncached:>13.3f}{cached:>11.3f}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    run()
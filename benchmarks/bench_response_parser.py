@@ -0,0 +1,100 @@
+"""Compare `ResponseParser.decode` with the dict based parsing it replaced.
+
+Run with::
+
+    python -m benchmarks.bench_response_parser
+"""
+
+from __future__ import annotations
+
+import json
+import timeit
+import tracemalloc
+from typing import Any
+
+import msgspec
+
+from src.controller.proxy.helpers import ResponseParser
+from src.controller.proxy.schema import CourseSearch, Subject
+
+IGNORE_FIELDS = [
+    "attr:rownumber",
+    "DISCOVERY_EXPERIENCE_GLOBAL",
+    "DISCOVERY_EXPERIENCE–COMMUNITY",  # noqa: RUF001
+    "DISCOVERY_EXPERIENCE–WORKING",  # noqa: RUF001
+    "FIELD_OF_EDUCATION",
+    "ISLOP",
+    "SSR_HECS_BAND_ID",
+]
+
+
+def legacy_parse(body: bytes, response_dto: Any) -> list[Any]:
+    """Parsing as done before typed decoding: dict tree, field filtering then struct construction."""
+    parsed: dict[str, Any] = json.loads(body)
+    if parsed.get("status", "unsuccessful") != "success":
+        raise Exception("Server response with unsuccessful query")
+    rows = parsed.get("data", {}).get("query", {}).get("rows", [])
+    return [response_dto(**{k: v for k, v in row.items() if k not in IGNORE_FIELDS}) for row in rows]
+
+
+def course_search_body(num_rows: int) -> bytes:
+    rows = [
+        {
+            "attr:rownumber": i,
+            "ACAD_CAREER": "UGRD",
+            "ACAD_CAREER_DESCR": "Undergraduate",
+            "CAMPUS": "North Terrace",
+            "CATALOG_NBR": f"{1000 + i % 3000}",
+            "CLASS_NBR": f"{10000 + i}",
+            "COURSE_ID": f"{100000 + i:06}",
+            "COURSE_OFFER_NBR": "1",
+            "COURSE_TITLE": f"Course Title Number {i}",
+            "SUBJECT": "COMP SCI",
+            "YEAR": "2024",
+            "TERM": "4410",
+            "TERM_DESCR": "Semester 1",
+            "UNITS": "3",
+            "FIELD_OF_EDUCATION": "020103",
+            "ISLOP": "N",
+            "SSR_HECS_BAND_ID": "2",
+        }
+        for i in range(num_rows)
+    ]
+    return msgspec.json.encode(
+        {"status": "success", "data": {"query": {"num_rows": num_rows, "total_rows": num_rows, "rows": rows}}}
+    )
+
+
+def subjects_body(num_rows: int) -> bytes:
+    rows = [{"attr:rownumber": i, "SUBJECT": f"SUBJ{i}", "DESCR": f"Subject description {i}"} for i in range(num_rows)]
+    return msgspec.json.encode(
+        {"status": "success", "data": {"query": {"num_rows": num_rows, "total_rows": num_rows, "rows": rows}}}
+    )
+
+
+def peak_memory(fn: Any) -> int:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run() -> None:
+    cases = [
+        ("COURSE_SEARCH", course_search_body(5000), CourseSearch),
+        ("SUBJECTS_BY_YEAR", subjects_body(500), Subject),
+    ]
+    print(f"{'target':<18}{'path':<10}{'ms/parse':>10}{'peak KiB':>10}")  # noqa: T201
+    for name, body, response_dto in cases:
+        for path, fn in (
+            ("legacy", lambda b=body, d=response_dto: legacy_parse(b, d)),
+            ("msgspec", lambda b=body, d=response_dto: ResponseParser.decode(b, d)),
+        ):
+            number = 20
+            seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+            print(f"{name:<18}{path:<10}{seconds * 1000:>10.3f}{peak_memory(fn) / 1024:>10.0f}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,132 @@
+"""Upstream response payloads for the benchmark suite.
+
+Payloads recorded from courseplanner-api are read from ``benchmarks/fixtures/<TARGET>.json``.
+Targets without a recorded payload fall back to a synthetic payload of the same shape and a
+typical size, so that the suite runs offline. Record payloads with::
+
+    python -m benchmarks.fixtures
+"""
+
+from __future__ import annotations
+
+import asyncio
+import types
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+import aiohttp
+import msgspec
+
+import src.controller.proxy.schema as dto
+from src.controller.proxy import services
+from src.controller.proxy.helpers import ParamsBuilder
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@dataclass(frozen=True)
+class Fixture:
+    target: str
+    """Upstream target."""
+    row_type: Any
+    """Struct type of a row."""
+    params: dict[str, Any]
+    """Query params used to record the payload."""
+    synthetic_rows: int
+    """Number of rows of the synthetic payload."""
+    extractor: Literal["rows", "groups"] = "rows"
+
+    @property
+    def name(self) -> str:
+        return services.target_name(self.target)
+
+    @property
+    def path(self) -> Path:
+        return FIXTURES_DIR / f"{self.name}.json"
+
+    @property
+    def recorded(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> bytes:
+        """Recorded payload if there is one, else a synthetic payload."""
+        if self.recorded:
+            return self.path.read_bytes()
+        if self.extractor == "groups":
+            rows = [{"groups": [synthetic(dto.Group, i) for i in range(self.synthetic_rows)]}]
+        else:
+            rows = [{"attr:rownumber": i + 1, **synthetic(self.row_type, i)} for i in range(self.synthetic_rows)]
+        query = {"num_rows": len(rows), "total_rows": len(rows), "rows": rows}
+        return msgspec.json.encode({"status": "success", "data": {"query": query}})
+
+
+VIRTUAL = {"virtual": services.VIRTUAL}
+YEAR = {"year_from": 2024, "year_to": 2024}
+FIXTURES = [
+    Fixture(services.CAMPUS_TARGET, dto.Campus, {"MaxRows": 9999}, 12),
+    Fixture(services.CSP_ACAD_CAREER_TARGET, dto.Career, {"MaxRows": 9999}, 6),
+    Fixture(services.TERMS_TARGET, dto.Term, {"MaxRows": 9999, **VIRTUAL, **YEAR}, 24),
+    Fixture(services.SUBJECT_TARGET, dto.Subject, {"MaxRows": 9999, **VIRTUAL, **YEAR}, 350),
+    Fixture(
+        services.COURSE_SEARCH_TARGET,
+        dto.CourseSearch,
+        {"subject": "COMP SCI", "year": 2024, "pagenbr": 1, "pagesize": 100, **VIRTUAL},
+        100,
+    ),
+    Fixture(
+        services.COURSE_DETAIL_TARGET,
+        dto.CourseDetail,
+        {"year": 2024, "courseid": "107592", "course_offer_nbr": 1, "term": 4410, **VIRTUAL},
+        1,
+    ),
+    Fixture(
+        services.COURSE_CLASS_LIST_TARGET,
+        dto.Group,
+        {"crseid": "107592", "offer": 1, "term": 4410, "session": 1, **VIRTUAL},
+        4,
+        extractor="groups",
+    ),
+]
+
+
+def synthetic(struct_type: Any, i: int) -> dict[str, Any]:
+    """Row of a struct type with deterministic values."""
+    row: dict[str, Any] = {}
+    for field in msgspec.structs.fields(struct_type):
+        row[field.encode_name] = _synthetic_value(field.type, field.encode_name, i)
+    return row
+
+
+def _synthetic_value(annotation: Any, name: str, i: int) -> Any:
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+        origin = typing.get_origin(annotation)
+    if origin is list:
+        (item_type,) = typing.get_args(annotation)
+        return [_synthetic_value(item_type, name, i * 4 + j) for j in range(4)]
+    if isinstance(annotation, type) and issubclass(annotation, msgspec.Struct):
+        return synthetic(annotation, i)
+    if annotation is int:
+        return i
+    if annotation is float:
+        return i * 0.125
+    return f"{name.lower()} {i}"
+
+
+async def record() -> None:
+    """Download a payload for every fixture from courseplanner-api."""
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    async with aiohttp.ClientSession() as client:
+        for fixture in FIXTURES:
+            params = ParamsBuilder(target=fixture.target, **fixture.params)
+            async with client.get(services.API_END_POINT, params=params.params) as response:
+                response.raise_for_status()
+                fixture.path.write_bytes(await response.read())
+            print(f"recorded {fixture.name}: {fixture.path.stat().st_size} bytes")  # noqa: T201
+
+
+if __name__ == "__main__":
+    asyncio.run(record())
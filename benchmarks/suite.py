@@ -0,0 +1,226 @@
+"""Micro-benchmarks of the proxy hot paths, per upstream target.
+
+Measures in isolation, against the payloads in `benchmarks.fixtures`:
+
+- `ResponseParser.decode` and `ResponseParser.parse` of an upstream response body
+- `ParamsBuilder.params` and `ParamsBuilder.key` of the upstream query
+- `lower_camel` over the field names of a row
+- DTO transfer and JSON encoding of the parsed rows
+
+and reports throughput, mean time, peak memory allocated by a single call and memory retained
+after it. Results are written to ``benchmarks/results/<commit>.json`` so that commits can be compared::
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --compare benchmarks/results/1f0807d.json benchmarks/results/426b85e.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import platform
+import shutil
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
+
+import msgspec
+from benchmarks.fixtures import FIXTURES, Fixture
+from litestar.serialization import encode_json
+from litestar.typing import FieldDefinition
+
+import src.controller.proxy.schema as dto
+from src.controller.proxy import services
+from src.controller.proxy.helpers import ParamsBuilder, ResponseParser
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+
+    from aiohttp import ClientResponse
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+DTOS: dict[str, type[dto.MsgspecDTO[Any]]] = {
+    services.CAMPUS_TARGET: dto.CampusDTO,
+    services.CSP_ACAD_CAREER_TARGET: dto.CareerDTO,
+    services.TERMS_TARGET: dto.TermDTO,
+    services.SUBJECT_TARGET: dto.SubjectDTO,
+    services.COURSE_SEARCH_TARGET: dto.CourseSearchDTO,
+    services.COURSE_DETAIL_TARGET: dto.CourseDetailDTO,
+    services.COURSE_CLASS_LIST_TARGET: dto.CourseClassListDTO,
+}
+
+
+class Result(msgspec.Struct):
+    ops: float
+    """Calls per second."""
+    mean_us: float
+    """Mean time of a call in microseconds."""
+    peak_kib: float
+    """Peak memory allocated during a call."""
+    retained_kib: float
+    """Memory still allocated after a call, excluding its return value."""
+
+
+class Report(msgspec.Struct):
+    commit: str
+    python: str
+    synthetic: list[str]
+    """Fixtures without a recorded payload."""
+    results: dict[str, Result]
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    fn: Callable[[], Any]
+
+
+class _Response:
+    """Stand-in for `aiohttp.ClientResponse` with the body already received."""
+
+    def __init__(self, body: bytes) -> None:
+        self._body = body
+
+    def raise_for_status(self) -> None:
+        pass
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+def _run(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine that never suspends, without the overhead of an event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("Coroutine suspended")
+
+
+def _encoder(fixture: Fixture) -> Callable[[list[Any]], Any]:
+    dto_type = DTOS[fixture.target]
+    handler_id = f"bench:{fixture.name}"
+    dto_type.create_for_field_definition(FieldDefinition.from_annotation(list[fixture.row_type]), handler_id)
+    return dto_type._dto_backends[handler_id]["return_backend"].encode_data
+
+
+def cases(fixture: Fixture) -> list[Case]:
+    body = fixture.load()
+    response = cast("ClientResponse", _Response(body))
+    row_type, extractor = fixture.row_type, fixture.extractor
+    rows = ResponseParser.decode(body, row_type, extractor).data
+    params = ParamsBuilder(target=fixture.target, **fixture.params)
+    field_names = [field.encode_name for field in msgspec.structs.fields(row_type)]
+    encode_data = _encoder(fixture)
+    return [
+        Case(f"{fixture.name}/decode", lambda: ResponseParser.decode(body, row_type, extractor)),
+        Case(f"{fixture.name}/parse", lambda: _run(ResponseParser.parse(response, row_type, extractor))),
+        Case(f"{fixture.name}/params", lambda: (params.params, params.key)),
+        Case(f"{fixture.name}/lower_camel", lambda: [dto.lower_camel(name) for name in field_names]),
+        Case(f"{fixture.name}/transfer", lambda: encode_data(rows)),
+        Case(f"{fixture.name}/encode", lambda: encode_json(encode_data(rows))),
+    ]
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5) -> Result:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    value = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    del value
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Result(
+        ops=1 / best,
+        mean_us=best * 1e6,
+        peak_kib=(peak - before) / 1024,
+        retained_kib=(retained - before) / 1024,
+    )
+
+
+def commit() -> str:
+    """Short hash of HEAD, suffixed with `-dirty` if the work tree has changes."""
+
+    executable = shutil.which("git")
+
+    def git(*args: str) -> str:
+        if executable is None:
+            return ""
+        # Only ever runs the fixed git commands below
+        return subprocess.run([executable, *args], capture_output=True, text=True, check=False).stdout.strip()  # noqa: S603
+
+    sha = git("rev-parse", "--short", "HEAD") or "unknown"
+    return f"{sha}-dirty" if git("status", "--porcelain", "--untracked-files=no") else sha
+
+
+def run(pattern: str | None) -> Report:
+    results: dict[str, Result] = {}
+    print(f"{'case':<34}{'ops/s':>12}{'mean µs':>11}{'peak KiB':>11}{'retained KiB':>14}")  # noqa: T201
+    for fixture in FIXTURES:
+        for case in cases(fixture):
+            if pattern is not None and pattern not in case.name:
+                continue
+            result = results[case.name] = measure(case.fn)
+            print(  # noqa: T201
+                f"{case.name:<34}{result.ops:>12,.0f}{result.mean_us:>11.2f}"
+                f"{result.peak_kib:>11.1f}{result.retained_kib:>14.1f}"
+            )
+    return Report(
+        commit=commit(),
+        python=platform.python_version(),
+        synthetic=[fixture.name for fixture in FIXTURES if not fixture.recorded],
+        results=results,
+    )
+
+
+def compare(base_path: Path, head_path: Path, threshold: float) -> bool:
+    """Print the change of every case between two reports.
+
+    Returns:
+        bool: whether no case got slower by more than `threshold`
+    """
+    base = msgspec.json.decode(base_path.read_bytes(), type=Report)
+    head = msgspec.json.decode(head_path.read_bytes(), type=Report)
+    print(f"{'case':<34}{base.commit:>14}{head.commit:>14}{'speedup':>9}{'peak KiB':>18}")  # noqa: T201
+    ok = True
+    for name, new in head.results.items():
+        if (old := base.results.get(name)) is None:
+            continue
+        speedup = new.ops / old.ops
+        regressed = speedup < 1 - threshold
+        ok = ok and not regressed
+        print(  # noqa: T201
+            f"{name:<34}{old.mean_us:>12.2f}µs{new.mean_us:>12.2f}µs{speedup:>8.2f}x"
+            f"{old.peak_kib:>9.1f} → {new.peak_kib:<6.1f}{'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this string")
+    parser.add_argument("-o", "--output", type=Path, help="where to write the report")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASE", "HEAD"), help="compare two reports")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown reported as a regression")
+    args = parser.parse_args()
+    if args.compare:
+        return 0 if compare(*args.compare, threshold=args.threshold) else 1
+    report = run(args.pattern)
+    output = args.output or RESULTS_DIR / f"{report.commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(msgspec.json.format(msgspec.json.encode(report)))
+    print(f"results written to {output}")  # noqa: T201
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,20 +2,37 @@ from litestar import Litestar
 
 from src.asgi.plugins import alchemy
 from src.config.app import compression, cors, response_cache
+from src.controller.calendar.dependencies import calendar_lifespan
+from src.controller.calendar.router import CalendarController
+from src.controller.catalogue.dependencies import catalogue_lifespan
+from src.controller.catalogue.router import CatalogueController
+from src.controller.proxy.client import proxy_lifespan
 from src.controller.proxy.router import ProxyController
+from src.controller.proxy.warmup import warmup_lifespan
+from src.controller.seats.dependencies import seats_lifespan
+from src.controller.seats.router import SeatsController
 from src.controller.user.guards import session_auth
 from src.controller.user.router import AdminController, AuthController, MeController
 from src.utils.dependencies import create_collection_dependencies
 from src.utils.exceptions import exception_to_http_response
 
 app = Litestar(
-    route_handlers=[MeController, AuthController, ProxyController, AdminController],
+    route_handlers=[
+        MeController,
+        AuthController,
+        ProxyController,
+        AdminController,
+        CatalogueController,
+        CalendarController,
+        SeatsController,
+    ],
     plugins=[alchemy],
     dependencies=create_collection_dependencies(),
     exception_handlers={
         Exception: exception_to_http_response,
     },
     on_app_init=[session_auth.on_app_init],
+    lifespan=[proxy_lifespan, warmup_lifespan, catalogue_lifespan, calendar_lifespan, seats_lifespan],
     response_cache_config=response_cache,
     cors_config=cors,
     compression_config=compression,
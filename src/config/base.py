@@ -15,7 +15,10 @@ from sqlalchemy.pool import NullPool
 __all__ = (
     "AppSettings",
     "DatabaseSettings",
+    "ProxySettings",
+    "SeatWatchSettings",
     "Settings",
+    "TimetableSettings",
 )
 
 
@@ -222,7 +225,133 @@ class AppSettings:
                 self.ALLOWED_CORS_ORIGINS = [host.strip() for host in self.ALLOWED_CORS_ORIGINS.split(",")]
 
 
+@dataclass
+class ProxySettings:
+    """Contains connection pool settings for the upstream courseplanner-api client. See more:
+    https://docs.aiohttp.org/en/stable/client_reference.html#connectors
+    """
+
+    POOL_LIMIT: int = field(default_factory=lambda: int(os.getenv("PROXY_POOL_LIMIT", "100")))
+    """Max number of simultaneous upstream connections."""
+    POOL_LIMIT_PER_HOST: int = field(default_factory=lambda: int(os.getenv("PROXY_POOL_LIMIT_PER_HOST", "20")))
+    """Max number of simultaneous connections to the same upstream host."""
+    KEEPALIVE_TIMEOUT: float = field(default_factory=lambda: float(os.getenv("PROXY_KEEPALIVE_TIMEOUT", "30")))
+    """Time in seconds an idle connection is kept in the pool."""
+    DNS_CACHE_TTL: int = field(default_factory=lambda: int(os.getenv("PROXY_DNS_CACHE_TTL", "300")))
+    """Time in seconds resolved upstream addresses are cached."""
+    CONNECT_TIMEOUT: float = field(default_factory=lambda: float(os.getenv("PROXY_CONNECT_TIMEOUT", "10")))
+    """Time in seconds for acquiring a connection, including TCP and TLS setup."""
+    TIMEOUT: float = field(default_factory=lambda: float(os.getenv("PROXY_TIMEOUT", "30")))
+    """Total time in seconds for an upstream request."""
+    BATCH_CONCURRENCY: int = field(default_factory=lambda: int(os.getenv("PROXY_BATCH_CONCURRENCY", "8")))
+    """Max number of upstream queries in flight for a single batch request."""
+    BATCH_MAX_SIZE: int = field(default_factory=lambda: int(os.getenv("PROXY_BATCH_MAX_SIZE", "50")))
+    """Max number of items accepted by a batch request."""
+    CACHE_MAX_ENTRIES: int = field(default_factory=lambda: int(os.getenv("PROXY_CACHE_MAX_ENTRIES", "2048")))
+    """Max number of upstream responses kept in the in-process cache."""
+    CACHE_MAX_BYTES: int = field(default_factory=lambda: int(os.getenv("PROXY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+    """Max encoded size in bytes of upstream responses kept in the in-process cache."""
+    CACHE_TTL: dict[str, int] | str = field(default_factory=lambda: os.getenv("PROXY_CACHE_TTL", "{}"))
+    """Cache time to live in seconds per upstream target, e.g. `{"CAMPUS": 86400, "COURSE_CLASS_LIST": 30}`.
+    Targets that are not listed use the defaults of `ProxyQueryService`. A value of 0 disables caching."""
+    CACHE_STORE_URL: str = field(default_factory=lambda: os.getenv("PROXY_CACHE_STORE_URL", ""))
+    """Shared cache tier for multi-worker deployments - `redis://...`, `file://<directory>` or `sqlite://<file>`.
+    A `sqlite://` tier persists across restarts and is shared by the workers of a host. Disabled if empty."""
+    CACHE_STORE_MAX_BYTES: int = field(
+        default_factory=lambda: int(os.getenv("PROXY_CACHE_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    )
+    """Max size in bytes of the values kept by a `sqlite://` shared cache tier, least recently read evicted first."""
+    CACHE_STALE_WHILE_REVALIDATE: int = field(
+        default_factory=lambda: int(os.getenv("PROXY_CACHE_STALE_WHILE_REVALIDATE", "300"))
+    )
+    """Time in seconds after expiry during which a cached value is served while it is refreshed in the background."""
+    CACHE_STALE_IF_ERROR: int = field(default_factory=lambda: int(os.getenv("PROXY_CACHE_STALE_IF_ERROR", "86400")))
+    """Time in seconds after expiry during which a cached value is served if upstream fails."""
+    RESPONSE_CACHE_MAX_BYTES: int = field(
+        default_factory=lambda: int(os.getenv("PROXY_RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    )
+    """Max size in bytes of encoded proxy responses kept in the in-process cache, including gzip copies."""
+    RESPONSE_CACHE_GZIP: bool = field(
+        default_factory=lambda: os.getenv("PROXY_RESPONSE_CACHE_GZIP", "True") in TRUE_VALUES,
+    )
+    """Keep a gzip compressed copy of cached proxy responses for clients that accept gzip."""
+    RATE_LIMIT: float = field(default_factory=lambda: float(os.getenv("PROXY_RATE_LIMIT", "50")))
+    """Max number of upstream requests started per second. 0 disables the limit."""
+    RATE_LIMIT_BURST: int = field(default_factory=lambda: int(os.getenv("PROXY_RATE_LIMIT_BURST", "20")))
+    """Max number of upstream requests started at once after an idle period."""
+    CONCURRENCY_MIN: int = field(default_factory=lambda: int(os.getenv("PROXY_CONCURRENCY_MIN", "2")))
+    """Lower bound of the adaptive limit on upstream requests in flight."""
+    CONCURRENCY_MAX: int = field(default_factory=lambda: int(os.getenv("PROXY_CONCURRENCY_MAX", "20")))
+    """Upper bound of the adaptive limit on upstream requests in flight."""
+    LATENCY_TARGET: float = field(default_factory=lambda: float(os.getenv("PROXY_LATENCY_TARGET", "2")))
+    """Time in seconds above which an upstream response lowers the concurrency limit."""
+    QUEUE_TIMEOUT: float = field(default_factory=lambda: float(os.getenv("PROXY_QUEUE_TIMEOUT", "10")))
+    """Max time in seconds a query waits for the rate or concurrency limit before failing."""
+    BREAKER_FAILURE_THRESHOLD: int = field(
+        default_factory=lambda: int(os.getenv("PROXY_BREAKER_FAILURE_THRESHOLD", "5"))
+    )
+    """Consecutive upstream failures after which queries fail fast. 0 disables the circuit breaker."""
+    BREAKER_RESET_TIMEOUT: float = field(default_factory=lambda: float(os.getenv("PROXY_BREAKER_RESET_TIMEOUT", "30")))
+    """Time in seconds queries fail fast before upstream is probed again."""
+    RETRY_POLICY: dict[str, dict[str, Any]] | str = field(default_factory=lambda: os.getenv("PROXY_RETRY_POLICY", "{}"))
+    """Retry policy overrides per upstream target, e.g. `{"COURSE_SEARCH": {"attempts": 2, "hedge": false}}`.
+    See `RetryPolicy` for the fields. Targets that are not listed use the defaults of `ProxyQueryService`."""
+    SERVE_FROM_CATALOGUE: bool = field(
+        default_factory=lambda: os.getenv("PROXY_SERVE_FROM_CATALOGUE", "False") in TRUE_VALUES,
+    )
+    """Answer course searches and course details from the local catalogue mirror instead of courseplanner-api."""
+    WARMUP: bool = field(default_factory=lambda: os.getenv("PROXY_WARMUP", "True") in TRUE_VALUES)
+    """Preload campus, academic career, term and subject lists on startup. Readiness waits for them if enabled."""
+    SNAPSHOT_PATH: str = field(
+        default_factory=lambda: os.getenv("PROXY_SNAPSHOT_PATH", ".cache/proxy_reference.msgpack")
+    )
+    """File the cached reference data is saved to and served from on the next start. Disabled if empty."""
+    SNAPSHOT_INTERVAL: int = field(default_factory=lambda: int(os.getenv("PROXY_SNAPSHOT_INTERVAL", "3600")))
+    """Time in seconds between saves of the snapshot once warm. 0 only saves it once warm and on shutdown."""
+
+    def __post_init__(self) -> None:
+        if isinstance(self.CACHE_TTL, str):
+            try:
+                self.CACHE_TTL = {k: int(v) for k, v in json.loads(self.CACHE_TTL).items()}
+            except (AttributeError, TypeError, ValueError):
+                msg = "PROXY_CACHE_TTL is not a valid mapping of target to seconds."
+                raise ValueError(msg) from None
+        if isinstance(self.RETRY_POLICY, str):
+            try:
+                self.RETRY_POLICY = {k: dict(v) for k, v in json.loads(self.RETRY_POLICY).items()}
+            except (AttributeError, TypeError, ValueError):
+                msg = "PROXY_RETRY_POLICY is not a valid mapping of target to retry policy."
+                raise ValueError(msg) from None
+
+
+@dataclass
+class TimetableSettings:
+    """Contains settings of the timetable search."""
+
+    WORKERS: int = field(
+        default_factory=lambda: int(os.getenv("TIMETABLE_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    )
+    """Number of processes searching large timetables. 0 searches every timetable in a thread of the web worker."""
+    PARALLEL_MIN_OPTIONS: int = field(default_factory=lambda: int(os.getenv("TIMETABLE_PARALLEL_MIN_OPTIONS", "60")))
+    """Min number of classes to pick from for a ranked timetable search to run in the worker processes."""
+
+
+@dataclass
+class SeatWatchSettings:
+    """Contains settings of the seat availability watcher."""
+
+    POLL_INTERVAL: float = field(default_factory=lambda: float(os.getenv("SEAT_WATCH_POLL_INTERVAL", "30")))
+    """Seconds between class list polls of a watched course. Seat counts are only as fresh as the class list cache."""
+    HEARTBEAT_INTERVAL: float = field(default_factory=lambda: float(os.getenv("SEAT_WATCH_HEARTBEAT_INTERVAL", "15")))
+    """Seconds between keepalive comments on an otherwise idle event stream."""
+    MAX_COURSES: int = field(default_factory=lambda: int(os.getenv("SEAT_WATCH_MAX_COURSES", "1000")))
+    """Max number of courses watched at once by this worker. Further subscriptions are refused."""
+
+
 @dataclass
 class Settings:
     app: AppSettings = field(default_factory=AppSettings)
     db: DatabaseSettings = field(default_factory=DatabaseSettings)
+    proxy: ProxySettings = field(default_factory=ProxySettings)
+    timetable: TimetableSettings = field(default_factory=TimetableSettings)
+    seat_watch: SeatWatchSettings = field(default_factory=SeatWatchSettings)
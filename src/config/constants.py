@@ -3,6 +3,16 @@ from __future__ import annotations
 DB_SESSION_DEPENDENCY_KEY = "db_session"
 """The name of the key used for dependency injection of the database
 session."""
+PROXY_SERVICE_STATE_KEY = "proxy_service"
+"""The name of the app state key holding the shared upstream proxy service."""
+PROXY_WARMUP_STATE_KEY = "proxy_warmup"
+"""The name of the app state key holding the reference data cache warm-up."""
+CATALOGUE_SYNC_JOB_STATE_KEY = "catalogue_sync_job"
+"""The name of the app state key holding the background catalogue sync job."""
+TIMETABLE_POOL_STATE_KEY = "timetable_pool"
+"""The name of the app state key holding the timetable search worker processes."""
+SEAT_WATCHER_STATE_KEY = "seat_watcher"
+"""The name of the app state key holding the shared seat availability watcher."""
 USER_DEPENDENCY_KEY = "current_user"
 """The name of the key used for dependency injection of the database
 session."""
@@ -0,0 +1,82 @@
+# bitset.py
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from numpy.typing import NDArray
+
+    from src.controller.calendar.solver import Slot
+
+__all__ = (
+    "clash_matrix",
+    "occupancy",
+)
+
+# Rows of the clash matrix computed at once - bounds the size of the intermediate AND
+_CHUNK_ROWS = 64
+
+
+def occupancy(sections: Sequence[Sequence[Slot]]) -> NDArray[np.uint8]:
+    """Packed bitmask of the time every section occupies over the weeks of the year.
+
+    Each weekday is cut into a grid at every meeting start and end time and at every first and last
+    meeting date. A bit stands for one cell of a grid, which is a stretch of time on that weekday
+    over a run of weeks. Cells occupied by the same sections share a bit. Masks therefore stay a
+    few bytes long, however fine the meeting times and however many weeks the sections span.
+    Bits are only comparable between the rows of one call.
+
+    Args:
+        sections (Sequence[Sequence[Slot]]): weekly slots of each section
+
+    Returns:
+        NDArray[np.uint8]: one row of packed bits per section
+    """
+    slots_by_day: dict[int, list[tuple[int, int, int, int, int]]] = defaultdict(list)
+    for row, slots in enumerate(sections):
+        for slot in slots:
+            first, last = slot.occurrences
+            if first <= last:
+                slots_by_day[slot.day].append((row, slot.start, slot.end, first, last + 1))
+    grids = []
+    for day_slots in slots_by_day.values():
+        _, starts, ends, firsts, stops = np.array(day_slots).T
+        times = np.unique(np.concatenate((starts, ends)))
+        dates = np.unique(np.concatenate((firsts, stops)))
+        grids.append((day_slots, times, dates))
+    offsets = np.cumsum([0] + [(times.size - 1) * (dates.size - 1) for _, times, dates in grids])
+    dense = np.zeros((len(sections), offsets[-1]), dtype=np.bool_)
+    for (day_slots, times, dates), offset in zip(grids, offsets, strict=False):
+        width = times.size - 1
+        for row, start, end, first, stop in day_slots:
+            t0, t1 = np.searchsorted(times, (start, end))
+            d0, d1 = np.searchsorted(dates, (first, stop))
+            cells = dense[row, offset : offset + (dates.size - 1) * width].reshape(-1, width)
+            cells[d0:d1, t0:t1] = True
+    if dense.shape[1]:
+        # Two sections clash iff they share a cell, so cells occupied by the same sections are redundant
+        distinct = np.unique(np.packbits(dense, axis=0), axis=1, return_index=True)[1]
+        dense = dense[:, np.sort(distinct)]
+    return np.packbits(dense, axis=1)
+
+
+def clash_matrix(masks: NDArray[np.uint8]) -> NDArray[np.bool_]:
+    """Which sections share time, given their `occupancy` masks.
+
+    Args:
+        masks (NDArray[np.uint8]): packed occupancy bitmasks, one row per section
+
+    Returns:
+        NDArray[np.bool_]: square matrix, True where two sections clash. The diagonal is True for sections with slots
+    """
+    clashes = np.zeros((masks.shape[0], masks.shape[0]), dtype=np.bool_)
+    for start in range(0, masks.shape[0], _CHUNK_ROWS):
+        chunk = masks[start : start + _CHUNK_ROWS]
+        clashes[start : start + _CHUNK_ROWS] = np.bitwise_and(chunk[:, None, :], masks[None, :, :]).any(axis=2)
+    return clashes
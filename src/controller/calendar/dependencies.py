@@ -0,0 +1,38 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import cast
+
+from litestar import Litestar
+from litestar.datastructures import State
+
+from src.config.app import settings
+from src.config.constants import TIMETABLE_POOL_STATE_KEY
+from src.controller.calendar.parallel import TimetablePool
+from src.controller.calendar.services import CalendarExportService, TimetableService
+from src.controller.proxy.services import ProxyQueryService
+
+__all__ = (
+    "calendar_lifespan",
+    "provide_calendar_export_service",
+    "provide_timetable_service",
+)
+
+
+def provide_timetable_service(state: State, proxy_service: ProxyQueryService) -> TimetableService:
+    return TimetableService(proxy_service, cast(TimetablePool | None, state.get(TIMETABLE_POOL_STATE_KEY)))
+
+
+def provide_calendar_export_service(proxy_service: ProxyQueryService) -> CalendarExportService:
+    return CalendarExportService(proxy_service)
+
+
+@asynccontextmanager
+async def calendar_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Hold the timetable search worker processes for the lifetime of the application and stop them on shutdown."""
+    pool = TimetablePool(settings.timetable)
+    app.state[TIMETABLE_POOL_STATE_KEY] = pool
+    try:
+        yield
+    finally:
+        pool.close()
+        del app.state[TIMETABLE_POOL_STATE_KEY]
@@ -0,0 +1,179 @@
+# ics.py
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+    from src.controller.calendar.meetings import MeetingInterval
+
+__all__ = (
+    "TIMEZONE",
+    "Event",
+    "events_of",
+    "render",
+)
+
+TIMEZONE = "Australia/Adelaide"
+"""Time zone of meeting times"""
+# Current daylight saving rules of `TIMEZONE`, which clients without a time zone database fall back to
+_VTIMEZONE = (
+    "BEGIN:VTIMEZONE",
+    f"TZID:{TIMEZONE}",
+    "BEGIN:STANDARD",
+    "DTSTART:19700405T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=4;BYDAY=1SU",
+    "TZOFFSETFROM:+1030",
+    "TZOFFSETTO:+0930",
+    "TZNAME:ACST",
+    "END:STANDARD",
+    "BEGIN:DAYLIGHT",
+    "DTSTART:19701004T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=1SU",
+    "TZOFFSETFROM:+0930",
+    "TZOFFSETTO:+1030",
+    "TZNAME:ACDT",
+    "END:DAYLIGHT",
+    "END:VTIMEZONE",
+)
+# Max length of a content line in octets, excluding the line break
+_LINE_OCTETS = 75
+_WEEK = timedelta(days=7)
+# Domain part of the ids of the events, which makes them globally unique
+_UID_DOMAIN = "calendar_be"
+
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    """A meeting of a class, weekly from `start` for `count` weeks except on `exdates`."""
+
+    uid: str
+    summary: str
+    description: str
+    location: str
+    start: datetime
+    """Start of the first meeting, in `TIMEZONE`"""
+    end: datetime
+    """End of the first meeting, in `TIMEZONE`"""
+    count: int
+    exdates: tuple[datetime, ...] = ()
+    """Starts of the weeks without a meeting, such as mid-semester breaks"""
+
+
+def events_of(uid: str, summary: str, description: str, intervals: Iterable[MeetingInterval]) -> Iterator[Event]:
+    """Events of the meetings of a class.
+
+    Intervals held on the same weekday, at the same time and in the same place become one weekly
+    event, with the weeks between their date ranges excluded - a class split around a break is one
+    event rather than one per date range.
+
+    Args:
+        uid (str): prefix of the ids of the events, unique to the class
+        summary (str): title of the events
+        description (str): description of the events
+        intervals (Iterable[MeetingInterval]): parsed meetings of the class
+
+    Yields:
+        Event: one event per weekday, time and location the class meets at
+    """
+    occurrences: dict[tuple[int, time, time, str], set[date]] = {}
+    for interval in intervals:
+        key = (interval.weekday, interval.start, interval.end, interval.location)
+        occurrences.setdefault(key, set()).update(interval.occurrences())
+    for index, ((_, start, end, location), days) in enumerate(sorted(occurrences.items())):
+        if not days:
+            continue
+        first, last = min(days), max(days)
+        weeks = (last - first).days // 7 + 1
+        yield Event(
+            uid=f"{uid}-{index}@{_UID_DOMAIN}",
+            summary=summary,
+            description=description,
+            location=location,
+            start=datetime.combine(first, start),
+            end=datetime.combine(first, end),
+            count=weeks,
+            exdates=tuple(
+                datetime.combine(day, start)
+                for day in (first + _WEEK * week for week in range(weeks))
+                if day not in days
+            ),
+        )
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> bytes:
+    """Content line split into lines of at most 75 octets, without splitting a character."""
+    encoded = line.encode()
+    if len(encoded) <= _LINE_OCTETS:
+        return encoded + b"\r\n"
+    parts = []
+    start, limit = 0, _LINE_OCTETS
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Back off to the start of a UTF-8 sequence
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end])
+        # Continuation lines start with a space, which counts towards their length
+        start, limit = end, _LINE_OCTETS - 1
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def _local(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _vevent(event: Event, stamp: str) -> Iterator[str]:
+    yield "BEGIN:VEVENT"
+    yield f"UID:{event.uid}"
+    yield f"DTSTAMP:{stamp}"
+    yield f"DTSTART;TZID={TIMEZONE}:{_local(event.start)}"
+    yield f"DTEND;TZID={TIMEZONE}:{_local(event.end)}"
+    if event.count > 1:
+        yield f"RRULE:FREQ=WEEKLY;COUNT={event.count}"
+    if event.exdates:
+        yield f"EXDATE;TZID={TIMEZONE}:{','.join(_local(exdate) for exdate in event.exdates)}"
+    yield f"SUMMARY:{_escape(event.summary)}"
+    if event.description:
+        yield f"DESCRIPTION:{_escape(event.description)}"
+    if event.location:
+        yield f"LOCATION:{_escape(event.location)}"
+    yield "END:VEVENT"
+
+
+def render(name: str, events: Iterable[Sequence[Event]]) -> Iterator[bytes]:
+    """Encode events as an iCalendar (RFC 5545) file, a chunk at a time.
+
+    Args:
+        name (str): name of the calendar
+        events (Iterable[Sequence[Event]]): events, in chunks that are rendered together
+
+    Yields:
+        bytes: the calendar header, one chunk per chunk of events, and the calendar footer
+    """
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+    header = (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//calendar_be//Timetable Export//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+        f"X-WR-TIMEZONE:{TIMEZONE}",
+        *_VTIMEZONE,
+    )
+    yield b"".join(_fold(line) for line in header)
+    for chunk in events:
+        if chunk:
+            yield b"".join(_fold(line) for event in chunk for line in _vevent(event, stamp))
+    yield _fold("END:VCALENDAR")
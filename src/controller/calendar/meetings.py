@@ -0,0 +1,167 @@
+# meetings.py
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from src.controller.proxy.schema import Meetings, Term
+
+__all__ = (
+    "MeetingInterval",
+    "TermCalendar",
+    "parse_meeting",
+)
+
+_DAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}  # fmt: skip
+_TIME = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$", re.IGNORECASE)
+_DATE = re.compile(r"(\d{1,2})\s+([a-z]{3})", re.IGNORECASE)
+_LINES = re.compile(r"\s*(?:\n|;)\s*")
+# Number of distinct raw meetings whose intervals are kept
+_CACHE_SIZE = 16384
+
+
+@dataclass(frozen=True, slots=True)
+class TermCalendar:
+    """Calendar year that the day and month of the meeting dates of a term fall in."""
+
+    term: str
+    year: int
+    description: str = ""
+
+    @classmethod
+    def from_term(cls, term: Term) -> TermCalendar:
+        return cls(term=term.TERM, year=int(term.ACAD_YEAR), description=term.DESCR)
+
+    @classmethod
+    def from_terms(cls, terms: Sequence[Term]) -> dict[str, TermCalendar]:
+        """Calendar of every term, by term code."""
+        return {term.TERM: cls.from_term(term) for term in terms if term.ACAD_YEAR.isdigit()}
+
+
+@dataclass(frozen=True, slots=True)
+class MeetingInterval:
+    """A class meeting on one day of the week, every week from `first` to `last`."""
+
+    weekday: int
+    """0 is Monday"""
+    start: time
+    end: time
+    first: date
+    """First day of the date range the meeting is in - not necessarily on `weekday`"""
+    last: date
+    """Last day of the date range the meeting is in - not necessarily on `weekday`"""
+    location: str = ""
+
+    @property
+    def start_minutes(self) -> int:
+        return self.start.hour * 60 + self.start.minute
+
+    @property
+    def end_minutes(self) -> int:
+        return self.end.hour * 60 + self.end.minute
+
+    @property
+    def first_occurrence(self) -> date:
+        return self.first + timedelta(days=(self.weekday - self.first.weekday()) % 7)
+
+    @property
+    def last_occurrence(self) -> date:
+        return self.last - timedelta(days=(self.last.weekday() - self.weekday) % 7)
+
+    def occurrences(self) -> Iterator[date]:
+        """Dates the meeting is held on."""
+        day, last = self.first_occurrence, self.last_occurrence
+        while day <= last:
+            yield day
+            day += timedelta(days=7)
+
+
+def _parse_time(value: str) -> time | None:
+    match = _TIME.match(value.strip())
+    if match is None:
+        return None
+    hour, minute, meridiem = int(match[1]), int(match[2] or 0), (match[3] or "").lower()
+    if meridiem == "pm" and hour != 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    return time(hour, minute) if hour < 24 and minute < 60 else None
+
+
+def _parse_date_ranges(value: str, year: int) -> list[tuple[date, date]]:
+    """Date ranges such as `26 Feb - 05 Apr, 22 Apr - 31 May`. Unrecognised dates span the whole year."""
+    ranges = []
+    for part in re.split(r"[,\n;]", value):
+        dates = []
+        for day, month in _DATE.findall(part):
+            try:
+                dates.append(date(year, _MONTHS[month.lower()], int(day)))
+            except (KeyError, ValueError):
+                return [(date(year, 1, 1), date(year, 12, 31))]
+        if not dates:
+            continue
+        first, last = dates[0], dates[-1]
+        # Ranges over the new year, such as summer schools
+        if last < first:
+            last = last.replace(year=year + 1)
+        ranges.append((first, last))
+    return ranges or [(date(year, 1, 1), date(year, 12, 31))]
+
+
+def _parse_line(
+    year: int, dates: str, days: str, start_time: str, end_time: str, location: str
+) -> list[MeetingInterval]:
+    start, end = _parse_time(start_time), _parse_time(end_time)
+    if start is None or end is None or end <= start:
+        return []
+    weekdays = sorted({_DAYS[day] for day in re.findall(r"[a-z]{3}", days.lower()) if day in _DAYS})
+    return [
+        MeetingInterval(weekday=weekday, start=start, end=end, first=first, last=last, location=location)
+        for first, last in _parse_date_ranges(dates, year)
+        for weekday in weekdays
+    ]
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _parse(
+    dates: str, days: str, start_time: str, end_time: str, location: str, year: int
+) -> tuple[MeetingInterval, ...]:
+    lines = [_LINES.split(field.strip()) for field in (dates, days, start_time, end_time, location)]
+    count = max(len(field) for field in lines)
+    if count > 1 and all(len(field) in (1, count) for field in lines):
+        # One meeting per line, fields with a single line apply to every line
+        rows = zip(*(field * count if len(field) == 1 else field for field in lines), strict=True)
+        intervals = [interval for row in rows for interval in _parse_line(year, *row)]
+    else:
+        intervals = _parse_line(year, dates, days, start_time, end_time, location.strip())
+    return tuple(dict.fromkeys(intervals))
+
+
+def parse_meeting(meeting: Meetings, calendar: TermCalendar) -> tuple[MeetingInterval, ...]:
+    """Intervals of a meeting, such as `Monday, Wednesday 10am - 11am from 26 Feb - 05 Apr, 22 Apr - 31 May`.
+
+    Meetings may have several date ranges, and several lines with a date range, days and times
+    each. Meetings without a recognisable day or time, such as online classes, have no intervals.
+
+    Results are cached by the raw fields of the meeting and the year of the term, so identical
+    meetings - of which class lists have many - are parsed once and share the same intervals.
+
+    Args:
+        meeting (Meetings): meeting as returned by courseplanner-api
+        calendar (TermCalendar): calendar of the term the meeting is in
+
+    Returns:
+        tuple[MeetingInterval, ...]: one interval per date range and day of the week
+    """
+    return _parse(meeting.dates, meeting.days, meeting.start_time, meeting.end_time, meeting.location, calendar.year)
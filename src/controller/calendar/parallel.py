@@ -0,0 +1,255 @@
+# parallel.py
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import math
+import multiprocessing
+import struct
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING
+
+import anyio.to_thread
+import msgspec
+
+# msgspec resolves the annotations of `_Job` at runtime
+from src.controller.calendar.schema import TimetablePreferences  # noqa: TCH001
+from src.controller.calendar.solver import Bound, Component, CostModel, Option, Search
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Sequence
+
+    from src.config.base import TimetableSettings
+
+__all__ = (
+    "ParallelRankedSearch",
+    "TimetablePool",
+)
+
+# The shared buffer of a job starts with the bound as a float64, followed by the encoded job
+_BOUND = struct.Struct("d")
+# Aim for this many partitions per worker so that workers finishing early pick up more work
+_PARTITIONS_PER_WORKER = 4
+# Jobs whose buffer a worker keeps attached and decoded
+_ATTACHED_JOBS = 4
+
+
+class _Job(msgspec.Struct, array_like=True):
+    components: list[Component]
+    preferences: TimetablePreferences
+    conflicts: bytes
+    """Clash bitset of every option, `option_bytes` bytes each"""
+    option_bytes: int
+
+
+class _SharedBound(Bound):
+    """Bound kept in the buffer of a job, so that every partition prunes with the best bound found by any worker."""
+
+    def __init__(self, buffer: memoryview) -> None:
+        self.buffer = buffer
+
+    @property
+    def value(self) -> float:  # type: ignore[override]
+        return float(_BOUND.unpack_from(self.buffer)[0])
+
+    def offer(self, score: float) -> None:
+        # Racing workers may overwrite a lower bound with a higher one, which only prunes less
+        if score < self.value:
+            _BOUND.pack_into(self.buffer, 0, score)
+
+
+def _buffer(shared: SharedMemory) -> memoryview:
+    """Buffer of a shared memory block, which is only unset once the block is closed."""
+    if shared.buf is None:
+        raise ValueError(f"Shared memory {shared.name} is closed")
+    return shared.buf
+
+
+# Worker process state - jobs attached by the worker, most recent last
+_attached: OrderedDict[str, tuple[SharedMemory, memoryview, _Job, list[int]]] = OrderedDict()
+
+
+def _attach(name: str) -> tuple[SharedMemory, memoryview, _Job, list[int]]:
+    if (attached := _attached.get(name)) is not None:
+        _attached.move_to_end(name)
+        return attached
+    shared = SharedMemory(name=name)
+    buffer = _buffer(shared)
+    job = msgspec.msgpack.decode(buffer[_BOUND.size :], type=_Job)
+    conflicts = [
+        int.from_bytes(job.conflicts[offset : offset + job.option_bytes], "little")
+        for offset in range(0, len(job.conflicts), job.option_bytes)
+    ]
+    _attached[name] = attached = (shared, buffer, job, conflicts)
+    while len(_attached) > _ATTACHED_JOBS:
+        shared, *_ = _attached.popitem(last=False)[1]
+        shared.close()
+    return attached
+
+
+def _search_partition(
+    name: str, fixed: tuple[int, ...], top_k: int, deadline: float
+) -> tuple[list[tuple[float, list[int]]], bool, int]:
+    """Worker process - best `top_k` timetables that pick the `fixed` options.
+
+    Args:
+        name (str): name of the shared buffer of the job
+        fixed (tuple[int, ...]): options picked for some components
+        top_k (int): number of best timetables to find
+        deadline (float): `time.time()` after which to stop
+
+    Returns:
+        tuple[list[tuple[float, list[int]]], bool, int]: timetables found best first, whether the search
+            finished, and number of nodes visited
+    """
+    _, buffer, job, conflicts = _attach(name)
+    search = Search(job.components, time.monotonic() + deadline - time.time(), conflicts)
+    for option in fixed:
+        search.domains[search.component_of[option]] &= 1 << option
+    if not search.make_arc_consistent():
+        return [], True, search.nodes
+    best: list[tuple[float, list[int]]] = []
+    for score, solution in search.ranked(CostModel(search.options, job.preferences), top_k, _SharedBound(buffer)):
+        best.append((score, solution))
+    best.sort(key=lambda entry: entry[0])
+    return best[:top_k], not search.timed_out, search.nodes
+
+
+class TimetablePool:
+    """Worker processes for ranked timetable searches too large for a thread of the web worker.
+
+    The processes are started on first use and use the `spawn` start method, as forking a process
+    running an event loop and threads is unsafe.
+    """
+
+    def __init__(self, config: TimetableSettings) -> None:
+        self.config = config
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.config.WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def should_run(self, components: Sequence[Component]) -> bool:
+        """Whether a search over `components` is large enough to be worth running in the worker processes."""
+        options = sum(len(component.options) for component in components)
+        return self.config.WORKERS > 0 and options >= self.config.PARALLEL_MIN_OPTIONS
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ParallelRankedSearch:
+    """`RankedSearch` split across the processes of a `TimetablePool`.
+
+    The search space is partitioned by the options of the most constrained components. The
+    components, preferences and clash bitsets are encoded once into a shared memory buffer that
+    every partition reads, rather than pickled with each partition. Partitions also share their
+    bound through the buffer.
+
+    Iterating yields `(score, timetable)` each time a timetable enters the best `top_k` found so
+    far: first the result of a single dive in a thread, then the results of the partitions as they
+    finish.
+    """
+
+    def __init__(
+        self,
+        pool: TimetablePool,
+        components: Sequence[Component],
+        preferences: TimetablePreferences,
+        top_k: int,
+        deadline: float,
+    ) -> None:
+        self.pool = pool
+        self.preferences = preferences
+        self.top_k = top_k
+        self.deadline = deadline
+        """`time.monotonic()` after which to stop"""
+        self.best: list[tuple[float, tuple[Option, ...]]] = []
+        """Best timetables found, best first"""
+        self.complete = False
+        """Whether `best` are proven to be the best `top_k` timetables"""
+        self.nodes = 0
+        """Number of partial timetables visited"""
+        self._components = list(components)
+        self._seen: set[tuple[int, ...]] = set()
+
+    def _partitions(self, search: Search) -> list[tuple[int, ...]]:
+        """Options to fix in each partition - combinations of the options of the most constrained components."""
+        target = self.pool.config.WORKERS * _PARTITIONS_PER_WORKER
+        domains = sorted((domain for domain in search.domains if domain.bit_count() > 1), key=int.bit_count)
+        fixed: list[list[int]] = []
+        size = 1
+        for domain in domains:
+            if size >= target:
+                break
+            fixed.append(list(search.options_in(domain)))
+            size *= len(fixed[-1])
+        return list(itertools.product(*fixed))
+
+    def _merge(self, score: float, solution: Sequence[int], search: Search) -> tuple[Option, ...] | None:
+        """Add a timetable to the best found so far. Returns it if it is among them."""
+        key = tuple(solution)
+        if key in self._seen or (len(self.best) == self.top_k and score >= self.best[-1][0]):
+            return None
+        self._seen.add(key)
+        timetable = tuple(search.options[option] for option in solution)
+        self.best.append((score, timetable))
+        self.best.sort(key=lambda entry: entry[0])
+        del self.best[self.top_k :]
+        return timetable
+
+    async def __aiter__(self) -> AsyncIterator[tuple[float, tuple[Option, ...]]]:
+        search = Search(self._components, self.deadline)
+        if not self._components or not search.make_arc_consistent():
+            self.complete = True
+            return
+        cost = CostModel(search.options, self.preferences)
+        option_bytes = math.ceil(len(search.options) / 8) or 1
+        job = msgspec.msgpack.encode(
+            _Job(
+                components=self._components,
+                preferences=self.preferences,
+                conflicts=b"".join(conflicts.to_bytes(option_bytes, "little") for conflicts in search.conflicts),
+                option_bytes=option_bytes,
+            )
+        )
+        shared = SharedMemory(create=True, size=_BOUND.size + len(job))
+        loop = asyncio.get_running_loop()
+        futures: list[asyncio.Future[tuple[list[tuple[float, list[int]]], bool, int]]] = []
+        try:
+            buffer = _buffer(shared)
+            _BOUND.pack_into(buffer, 0, math.inf)
+            buffer[_BOUND.size :] = job
+            deadline = time.time() + self.deadline - time.monotonic()
+            futures = [
+                loop.run_in_executor(self.pool.executor, _search_partition, shared.name, fixed, self.top_k, deadline)
+                for fixed in self._partitions(search)
+            ]
+            # A single dive finds a good timetable in milliseconds, well before any partition finishes
+            first = await anyio.to_thread.run_sync(next, iter(search.ranked(cost, 1)), None)
+            self.nodes = search.nodes
+            if first is not None and (timetable := self._merge(*first, search)) is not None:
+                yield first[0], timetable
+            complete = True
+            for future in asyncio.as_completed(futures):
+                found, finished, nodes = await future
+                complete = complete and finished
+                self.nodes += nodes
+                for score, solution in found:
+                    if (timetable := self._merge(score, solution, search)) is not None:
+                        yield score, timetable
+            self.complete = complete
+        finally:
+            for future in futures:
+                future.cancel()
+            shared.close()
+            shared.unlink()
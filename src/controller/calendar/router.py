@@ -0,0 +1,120 @@
+from typing import Annotated
+
+from litestar import Controller, get, post
+from litestar.di import Provide
+from litestar.exceptions import ValidationException
+from litestar.params import Parameter
+from litestar.response import Stream
+from litestar.status_codes import HTTP_200_OK
+
+from src.controller.calendar.dependencies import provide_calendar_export_service, provide_timetable_service
+from src.controller.calendar.schema import (
+    MAX_COURSES,
+    CalendarSelection,
+    RankedTimetableRequest,
+    TimetableCourse,
+    TimetableRequest,
+    TimetableResult,
+)
+from src.controller.calendar.services import CalendarExportService, TimetableService
+from src.controller.calendar.urls import CalendarURL
+from src.controller.proxy.dependencies import provide_proxy_service
+from src.controller.proxy.etag import add_etag, track_etags
+from src.controller.proxy.services import YEAR
+
+__all__ = ("CalendarController",)
+
+
+class CalendarController(Controller):
+    """Calendar Controller"""
+
+    tags = ["Calendar Controller"]
+    dependencies = {
+        "proxy_service": Provide(provide_proxy_service, sync_to_thread=False),
+        "timetable_service": Provide(provide_timetable_service, sync_to_thread=False),
+        "calendar_export_service": Provide(provide_calendar_export_service, sync_to_thread=False),
+    }
+    dto = None
+    return_dto = None
+
+    @post(
+        operation_id="GenerateTimetables",
+        name="calendar:timetable",
+        summary="Generate Timetables",
+        description="Find clash-free timetables that pick one class of every class type of the given courses",
+        path=CalendarURL.TIMETABLE.value,
+        exclude_from_auth=True,
+        status_code=200,
+    )
+    async def generate_timetables(self, timetable_service: TimetableService, data: TimetableRequest) -> TimetableResult:
+        return await timetable_service.generate(data)
+
+    @post(
+        operation_id="RankTimetables",
+        name="calendar:rankedTimetable",
+        summary="Rank Timetables",
+        description=(
+            "Stream the best clash-free timetables according to preferences as NDJSON - a line for each timetable "
+            "that enters the best topK found so far, then a result line ranking them"
+        ),
+        path=CalendarURL.RANKED_TIMETABLE.value,
+        exclude_from_auth=True,
+        status_code=200,
+    )
+    async def rank_timetables(self, timetable_service: TimetableService, data: RankedTimetableRequest) -> Stream:
+        return Stream(await timetable_service.rank(data), media_type="application/x-ndjson")
+
+    @get(
+        operation_id="ExportCalendar",
+        name="calendar:export",
+        summary="Export Calendar",
+        description=(
+            "Download the meetings of the selected classes as an iCalendar file. Courses are given as "
+            "courseId:courseOfferNumber"
+        ),
+        path=CalendarURL.EXPORT.value,
+        exclude_from_auth=True,
+        before_request=track_etags,
+        after_request=add_etag,
+    )
+    async def export_calendar(
+        self,
+        calendar_export_service: CalendarExportService,
+        term: int,
+        course: Annotated[list[str], Parameter(query="course")],
+        class_nbr: Annotated[list[str], Parameter(query="classNbr")],
+        session: int = 1,
+        year: int = YEAR,
+    ) -> Stream:
+        """Export selected classes as an iCalendar file.
+
+        Args:
+            calendar_export_service (CalendarExportService): calendar export service
+            term (int): term of the courses
+            course (list[str]): courses of the classes, as `courseId:courseOfferNumber`
+            class_nbr (list[str]): class numbers to export
+            session (int): session of the courses
+            year (int): year of the term
+
+        Raises:
+            ValidationException: a course is not `courseId:courseOfferNumber`, or there are too many courses
+
+        Returns:
+            Stream: the iCalendar file
+        """
+        courses = []
+        for value in dict.fromkeys(course):
+            course_id, _, course_offer_number = value.partition(":")
+            if not course_id or not course_offer_number.isdigit():
+                raise ValidationException(f"Invalid course {value!r}, expected courseId:courseOfferNumber")
+            courses.append(TimetableCourse(course_id, int(course_offer_number), term, session, year))
+        if len(courses) > MAX_COURSES:
+            raise ValidationException(f"At most {MAX_COURSES} courses can be exported")
+        selection = CalendarSelection(courses=tuple(courses), class_nbrs=tuple(class_nbr))
+        return Stream(
+            await calendar_export_service.export(selection),
+            media_type="text/calendar; charset=utf-8",
+            # Set here rather than by the route, so that `add_etag` sees a successful response
+            status_code=HTTP_200_OK,
+            headers={"Content-Disposition": 'attachment; filename="timetable.ics"'},
+        )
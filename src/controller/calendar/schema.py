@@ -0,0 +1,109 @@
+from typing import Annotated
+
+from msgspec import Meta, Struct
+
+from src.controller.proxy.services import YEAR
+from src.utils.schema import CamelizedBaseStruct
+
+__all__ = (
+    "CalendarSelection",
+    "RankedTimetable",
+    "RankedTimetableRequest",
+    "RankedTimetableResult",
+    "Timetable",
+    "TimetableClass",
+    "TimetableCourse",
+    "TimetablePreferences",
+    "TimetableRequest",
+    "TimetableResult",
+)
+
+MAX_COURSES = 8
+"""Max number of courses of a timetable request"""
+MAX_TIME_BUDGET = 10.0
+"""Max number of seconds a timetable request may search for"""
+
+
+class TimetableCourse(Struct, frozen=True, rename="camel"):
+    course_id: str
+    course_offer_number: int
+    term: int
+    session: int = 1
+    year: int = YEAR
+    """Year of the term"""
+
+
+class TimetableRequest(CamelizedBaseStruct):
+    courses: Annotated[list[TimetableCourse], Meta(min_length=1, max_length=MAX_COURSES)]
+    max_results: Annotated[int, Meta(ge=1, le=1000)] = 100
+    """Stop after this many timetables"""
+    time_budget: Annotated[float, Meta(gt=0, le=MAX_TIME_BUDGET)] = 2.0
+    """Stop searching after this many seconds"""
+    include_full: bool = False
+    """Whether classes without available seats can be picked"""
+
+
+class TimetableClass(CamelizedBaseStruct):
+    course_id: str
+    component: str
+    class_nbr: str
+    section: str
+    alternatives: list[str]
+    """Class numbers of the other classes of the component that meet at the exact same times"""
+
+
+class Timetable(CamelizedBaseStruct):
+    classes: list[TimetableClass]
+
+
+class TimetableResult(CamelizedBaseStruct):
+    timetables: list[Timetable]
+    complete: bool
+    """Whether every clash-free timetable is listed. False if the search stopped at `maxResults` or the time budget"""
+    explored: int
+    """Number of partial timetables the search visited"""
+
+
+class CalendarSelection(Struct, frozen=True, rename="camel"):
+    """Classes to export to a calendar"""
+
+    courses: tuple[TimetableCourse, ...]
+    class_nbrs: tuple[str, ...]
+
+
+class TimetablePreferences(Struct, frozen=True, rename="camel"):
+    """Weights of the score of a timetable - lower scores are better"""
+
+    avoid_before: Annotated[int, Meta(ge=0, le=24)] | None = None
+    """Hour before which classes are penalised"""
+    early_penalty: Annotated[float, Meta(ge=0)] = 10.0
+    """Penalty per weekly class starting before `avoidBefore`"""
+    day_penalty: Annotated[float, Meta(ge=0)] = 5.0
+    """Penalty per day of the week with classes"""
+    span_penalty: Annotated[float, Meta(ge=0)] = 1.0
+    """Penalty per hour between the first and the last class of each day"""
+
+
+class RankedTimetableRequest(CamelizedBaseStruct):
+    courses: Annotated[list[TimetableCourse], Meta(min_length=1, max_length=MAX_COURSES)]
+    preferences: TimetablePreferences = TimetablePreferences()
+    top_k: Annotated[int, Meta(ge=1, le=100)] = 10
+    """Number of best timetables to find"""
+    time_budget: Annotated[float, Meta(gt=0, le=MAX_TIME_BUDGET)] = 2.0
+    """Stop searching after this many seconds"""
+    include_full: bool = False
+    """Whether classes without available seats can be picked"""
+
+
+class RankedTimetable(CamelizedBaseStruct, tag_field="kind", tag="timetable"):
+    score: float
+    classes: list[TimetableClass]
+
+
+class RankedTimetableResult(CamelizedBaseStruct, tag_field="kind", tag="result"):
+    timetables: list[RankedTimetable]
+    """Best timetables found, best first"""
+    complete: bool
+    """Whether `timetables` are proven to be the best `topK`. False if the search stopped at the time budget"""
+    explored: int
+    """Number of partial timetables the search visited"""
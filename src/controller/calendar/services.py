@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from functools import partial
+from typing import TYPE_CHECKING
+
+import anyio.to_thread
+import msgspec
+
+from src.controller.calendar.ics import Event, events_of, render
+from src.controller.calendar.meetings import TermCalendar, parse_meeting
+from src.controller.calendar.parallel import ParallelRankedSearch
+from src.controller.calendar.schema import (
+    CalendarSelection,
+    RankedTimetable,
+    RankedTimetableRequest,
+    RankedTimetableResult,
+    Timetable,
+    TimetableClass,
+    TimetableCourse,
+    TimetableRequest,
+    TimetableResult,
+)
+from src.controller.calendar.solver import Component, Option, RankedSearch, Slot, search
+from src.controller.proxy.etag import response_etag
+from src.controller.proxy.helpers import fan_out
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator, Sequence
+
+    from src.controller.calendar.parallel import TimetablePool
+    from src.controller.proxy.schema import CourseDetail, Group
+    from src.controller.proxy.services import ProxyQueryService
+
+__all__ = (
+    "CalendarExportService",
+    "TimetableService",
+    "build_components",
+    "class_lists",
+    "term_calendars",
+)
+
+
+def build_components(
+    course_id: str, groups: Sequence[Group], calendar: TermCalendar, include_full: bool = False
+) -> list[Component]:
+    """Components of a course from its class list.
+
+    Classes of groups of the same type form one component. Classes of a component that meet at the
+    exact same times are merged into one option, as picking one or the other never changes a clash.
+
+    Args:
+        course_id (str): course the class list is of
+        groups (Sequence[Group]): class list
+        calendar (TermCalendar): calendar of the term of the class list
+        include_full (bool, optional): whether to keep classes without available seats. Defaults to False.
+
+    Returns:
+        list[Component]: one component per class type, in class list order
+    """
+    classes_by_type: dict[str, list[tuple[tuple[str, str], tuple[Slot, ...]]]] = {}
+    for group in groups:
+        classes = classes_by_type.setdefault(group.type, [])
+        for class_info in group.classes:
+            if not include_full and class_info.available <= 0:
+                continue
+            slots = tuple(
+                sorted(
+                    {
+                        Slot.from_interval(interval)
+                        for meeting in class_info.meetings
+                        for interval in parse_meeting(meeting, calendar)
+                    }
+                )
+            )
+            classes.append(((class_info.class_nbr, class_info.section), slots))
+    components = []
+    for name, classes in classes_by_type.items():
+        by_slots: dict[tuple[Slot, ...], list[tuple[str, str]]] = {}
+        for class_key, slots in classes:
+            by_slots.setdefault(slots, []).append(class_key)
+        options = tuple(
+            Option(class_nbrs=tuple(class_nbr for class_nbr, _ in keys), section=keys[0][1], slots=slots)
+            for slots, keys in by_slots.items()
+        )
+        components.append(Component(course_id=course_id, name=name, options=options))
+    return components
+
+
+async def term_calendars(proxy_service: ProxyQueryService, years: Sequence[int]) -> dict[str, TermCalendar]:
+    """Calendars of the terms of `years`, by term code. Years whose terms could not be fetched are left out."""
+    terms = await fan_out(proxy_service.term, years, proxy_service.config.BATCH_CONCURRENCY)
+    calendars: dict[str, TermCalendar] = {}
+    for year_terms in terms.values():
+        if not isinstance(year_terms, Exception):
+            calendars.update(TermCalendar.from_terms(year_terms))
+    return calendars
+
+
+async def class_lists(
+    proxy_service: ProxyQueryService, courses: Sequence[TimetableCourse]
+) -> dict[TimetableCourse, tuple[Sequence[Group], TermCalendar]]:
+    """Class list and term calendar of every course, fetched concurrently.
+
+    Args:
+        proxy_service (ProxyQueryService): upstream query service
+        courses (Sequence[TimetableCourse]): courses - duplicates are fetched once
+
+    Raises:
+        Exception: the error of the first class list that could not be fetched
+
+    Returns:
+        dict[TimetableCourse, tuple[Sequence[Group], TermCalendar]]: class list and term calendar, in course order
+    """
+
+    async def class_list(course: TimetableCourse) -> Sequence[Group]:
+        return await proxy_service.course_class_list(
+            course_id=course.course_id,
+            course_offer_number=course.course_offer_number,
+            term=course.term,
+            session=course.session,
+        )
+
+    groups = await fan_out(class_list, courses, proxy_service.config.BATCH_CONCURRENCY)
+    calendars = await term_calendars(proxy_service, [course.year for course in courses])
+    result: dict[TimetableCourse, tuple[Sequence[Group], TermCalendar]] = {}
+    for course, course_groups in groups.items():
+        if isinstance(course_groups, Exception):
+            raise course_groups
+        # Terms missing from the term list are assumed to be in the year of the course
+        calendar = calendars.get(str(course.term)) or TermCalendar(term=str(course.term), year=course.year)
+        result[course] = (course_groups, calendar)
+    return result
+
+
+class TimetableService:
+    """Build clash-free timetables from the class lists of courses."""
+
+    def __init__(self, proxy_service: ProxyQueryService, pool: TimetablePool | None = None) -> None:
+        self.proxy_service = proxy_service
+        self.pool = pool
+
+    async def components(self, courses: Sequence[TimetableCourse], include_full: bool = False) -> list[Component]:
+        """Components of every course, from class lists fetched concurrently.
+
+        Args:
+            courses (Sequence[TimetableCourse]): courses of the timetable
+            include_full (bool, optional): whether to keep classes without available seats. Defaults to False.
+
+        Raises:
+            Exception: the error of the first class list that could not be fetched
+
+        Returns:
+            list[Component]: components of every course, in course order
+        """
+        components: list[Component] = []
+        for course, (groups, calendar) in (await class_lists(self.proxy_service, courses)).items():
+            components.extend(build_components(course.course_id, groups, calendar, include_full))
+        return components
+
+    async def generate(self, request: TimetableRequest) -> TimetableResult:
+        """Timetables that pick one class of every component of every course without clashes.
+
+        The search runs in a worker thread and stops after `request.max_results` timetables or
+        `request.time_budget` seconds, whichever comes first.
+
+        Args:
+            request (TimetableRequest): courses and search limits
+
+        Returns:
+            TimetableResult: timetables found and whether they are all the timetables there are
+        """
+        components = await self.components(request.courses, request.include_full)
+        deadline = time.monotonic() + request.time_budget
+        result = await anyio.to_thread.run_sync(partial(search, components, request.max_results, deadline))
+        timetables = [Timetable(classes=_classes(components, timetable)) for timetable in result.timetables]
+        return TimetableResult(timetables=timetables, complete=result.complete, explored=result.nodes)
+
+    async def rank(self, request: RankedTimetableRequest) -> AsyncIterator[bytes]:
+        """Stream the best timetables according to `request.preferences` as NDJSON.
+
+        Class lists are fetched before this returns, so that upstream errors fail the request rather
+        than the stream. The stream has a `RankedTimetable` line for each timetable that enters the
+        best `request.top_k` found so far, and ends with a `RankedTimetableResult` line ranking them.
+
+        Large searches run in the worker processes of the `TimetablePool`, small ones in a thread.
+
+        Args:
+            request (RankedTimetableRequest): courses, preferences and search limits
+
+        Returns:
+            AsyncIterator[bytes]: NDJSON lines
+        """
+        components = await self.components(request.courses, request.include_full)
+        deadline = time.monotonic() + request.time_budget
+        ranked: RankedSearch | ParallelRankedSearch
+        if self.pool is not None and self.pool.should_run(components):
+            ranked = ParallelRankedSearch(self.pool, components, request.preferences, request.top_k, deadline)
+            return self._stream(components, ranked, aiter(ranked))
+        ranked = RankedSearch(components, request.preferences, request.top_k, deadline)
+        return self._stream(components, ranked, _in_thread(ranked))
+
+    async def _stream(
+        self,
+        components: list[Component],
+        ranked: RankedSearch | ParallelRankedSearch,
+        found: AsyncIterator[tuple[float, tuple[Option, ...]]],
+    ) -> AsyncIterator[bytes]:
+        encoder = msgspec.json.Encoder()
+        async for score, timetable in found:
+            yield encoder.encode(RankedTimetable(score=score, classes=_classes(components, timetable))) + b"\n"
+        result = RankedTimetableResult(
+            timetables=[
+                RankedTimetable(score=score, classes=_classes(components, timetable))
+                for score, timetable in ranked.best
+            ],
+            complete=ranked.complete,
+            explored=ranked.nodes,
+        )
+        yield encoder.encode(result) + b"\n"
+
+
+class CalendarExportService:
+    """Export selected classes as an iCalendar file."""
+
+    def __init__(self, proxy_service: ProxyQueryService) -> None:
+        self.proxy_service = proxy_service
+
+    async def _course_detail(self, course: TimetableCourse) -> CourseDetail:
+        return await self.proxy_service.course_detail(
+            course_id=course.course_id,
+            course_offer_number=course.course_offer_number,
+            term=course.term,
+            year=course.year,
+        )
+
+    async def export(self, selection: CalendarSelection) -> AsyncIterator[bytes]:
+        """Stream the meetings of the selected classes as an iCalendar file.
+
+        Class lists are fetched before this returns, so that upstream errors fail the request rather
+        than the stream. The file is encoded a course at a time as it is sent. Selected class numbers
+        missing from the class lists are left out.
+
+        Files are cached by the selection and the etag of the upstream data they are built from, so
+        downloading the same selection again is answered from memory until a class list changes.
+
+        Args:
+            selection (CalendarSelection): courses and class numbers to export
+
+        Returns:
+            AsyncIterator[bytes]: chunks of the file
+        """
+        courses = await class_lists(self.proxy_service, selection.courses)
+        details = await fan_out(self._course_detail, courses, self.proxy_service.config.BATCH_CONCURRENCY)
+        key = None
+        # Course details only name the events, so a selection whose details failed is exported but not cached
+        etag = response_etag()
+        if etag is not None and not any(isinstance(detail, Exception) for detail in details.values()):
+            digest = hashlib.blake2b(msgspec.msgpack.encode(_canonical(selection)), digest_size=16).hexdigest()
+            key = f"ics:{digest}:{etag}"
+            if (body := self.proxy_service.responses.get(key)) is not None:
+                return _chunks(body.json)
+        class_nbrs = set(selection.class_nbrs)
+        events = (
+            list(_events(course, groups, calendar, details[course], class_nbrs))
+            for course, (groups, calendar) in courses.items()
+        )
+        names = {calendar.description for _, calendar in courses.values()}
+        name = f"Timetable {names.pop()}" if len(names) == 1 and "" not in names else "Timetable"
+        return self._stream(render(name, events), key)
+
+    async def _stream(self, chunks: Iterator[bytes], key: str | None) -> AsyncIterator[bytes]:
+        sent: list[bytes] = []
+        for chunk in chunks:
+            sent.append(chunk)
+            yield chunk
+        if key is not None:
+            self.proxy_service.responses.set(key, b"".join(sent))
+
+
+def _canonical(selection: CalendarSelection) -> CalendarSelection:
+    """Selection with courses and class numbers in a fixed order, so that equal selections hash the same."""
+    courses = sorted(set(selection.courses), key=msgspec.msgpack.encode)
+    return CalendarSelection(courses=tuple(courses), class_nbrs=tuple(sorted(set(selection.class_nbrs))))
+
+
+def _events(
+    course: TimetableCourse,
+    groups: Sequence[Group],
+    calendar: TermCalendar,
+    detail: CourseDetail | Exception,
+    class_nbrs: set[str],
+) -> Iterator[Event]:
+    if isinstance(detail, Exception):
+        code, title = course.course_id, ""
+    else:
+        code, title = f"{detail.SUBJECT} {detail.CATALOG_NBR}", detail.COURSE_TITLE
+    for group in groups:
+        for class_info in group.classes:
+            if class_info.class_nbr not in class_nbrs:
+                continue
+            description = "\n".join(
+                line for line in (title, f"Section {class_info.section}", f"Class {class_info.class_nbr}") if line
+            )
+            yield from events_of(
+                f"{calendar.term}-{class_info.class_nbr}",
+                f"{code} {group.type}",
+                description,
+                (interval for meeting in class_info.meetings for interval in parse_meeting(meeting, calendar)),
+            )
+
+
+async def _chunks(body: bytes) -> AsyncIterator[bytes]:
+    yield body
+
+
+async def _in_thread(ranked: RankedSearch) -> AsyncIterator[tuple[float, tuple[Option, ...]]]:
+    iterator = iter(ranked)
+    # Each step runs in a worker thread until the search finds the next timetable or gives up
+    while (found := await anyio.to_thread.run_sync(next, iterator, None)) is not None:
+        yield found
+
+
+def _classes(components: Sequence[Component], timetable: Sequence[Option]) -> list[TimetableClass]:
+    return [
+        TimetableClass(
+            course_id=component.course_id,
+            component=component.name,
+            class_nbr=option.class_nbrs[0],
+            section=option.section,
+            alternatives=list(option.class_nbrs[1:]),
+        )
+        for component, option in zip(components, timetable, strict=True)
+    ]
@@ -0,0 +1,390 @@
+# solver.py
+
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from src.controller.calendar.meetings import MeetingInterval
+    from src.controller.calendar.schema import TimetablePreferences
+
+from src.controller.calendar.bitset import clash_matrix, occupancy
+
+__all__ = (
+    "Bound",
+    "Component",
+    "CostModel",
+    "Option",
+    "RankedSearch",
+    "Search",
+    "SearchResult",
+    "Slot",
+    "search",
+)
+
+# How many search nodes to visit between deadline checks
+_CHECK_EVERY = 256
+
+
+@dataclass(frozen=True, slots=True, order=True)
+class Slot:
+    """Weekly time slot of a meeting."""
+
+    day: int
+    """Day of the week, 0 is Monday"""
+    start: int
+    """Minutes since midnight"""
+    end: int
+    """Minutes since midnight"""
+    first_day: int
+    """Ordinal of the first day of the date range of the meeting"""
+    last_day: int
+    """Ordinal of the last day of the date range of the meeting"""
+
+    @classmethod
+    def from_interval(cls, interval: MeetingInterval) -> Slot:
+        return cls(
+            interval.weekday,
+            interval.start_minutes,
+            interval.end_minutes,
+            interval.first.toordinal(),
+            interval.last.toordinal(),
+        )
+
+    @property
+    def occurrences(self) -> tuple[int, int]:
+        """Ordinals of the first and last meeting. The first is after the last if there are none"""
+        # Ordinal 1 is a Monday
+        first = self.first_day + (self.day - (self.first_day - 1)) % 7
+        last = self.last_day - ((self.last_day - 1) - self.day) % 7
+        return first, last
+
+    def clashes(self, other: Slot) -> bool:
+        if self.day != other.day or self.start >= other.end or other.start >= self.end:
+            return False
+        (first, last), (other_first, other_last) = self.occurrences, other.occurrences
+        return first <= other_last and other_first <= last and first <= last and other_first <= other_last
+
+
+@dataclass(frozen=True, slots=True)
+class Option:
+    """A class that can be picked for a component, with the classes that meet at the exact same times."""
+
+    class_nbrs: tuple[str, ...]
+    section: str
+    slots: tuple[Slot, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Component:
+    """A class type of a course, such as its lectures, of which exactly one class must be picked."""
+
+    course_id: str
+    name: str
+    options: tuple[Option, ...]
+
+
+@dataclass(slots=True)
+class SearchResult:
+    timetables: list[tuple[Option, ...]] = field(default_factory=list)
+    """One option per component, in the order of the components"""
+    complete: bool = False
+    """Whether every timetable was found before the search stopped"""
+    nodes: int = 0
+    """Number of partial timetables visited"""
+
+
+_Span = tuple[int, int] | None
+# Time spent on campus each day of the week, and number of classes that start too early
+_Profile = tuple[tuple[_Span, ...], int]
+
+
+class CostModel:
+    """Score of a timetable according to the preferences of a student - lower is better.
+
+    A timetable pays `early_penalty` per weekly class starting before `avoid_before`, `day_penalty`
+    per day of the week with classes and `span_penalty` per hour between the first and last class
+    of each day. None of these decrease when a class is added to a timetable.
+    """
+
+    def __init__(self, options: Sequence[Option], preferences: TimetablePreferences) -> None:
+        self.preferences = preferences
+        avoid_before = preferences.avoid_before * 60 if preferences.avoid_before is not None else -1
+        self.spans: list[dict[int, tuple[int, int]]] = []
+        self.early: list[int] = []
+        for option in options:
+            spans: dict[int, tuple[int, int]] = {}
+            for slot in option.slots:
+                start, end = spans.get(slot.day, (slot.start, slot.end))
+                spans[slot.day] = (min(start, slot.start), max(end, slot.end))
+            self.spans.append(spans)
+            self.early.append(sum(slot.start < avoid_before for slot in option.slots))
+        self.empty: _Profile = ((None,) * 7, 0)
+
+    def extend(self, profile: _Profile, option: int) -> _Profile:
+        spans, early = profile
+        if self.spans[option]:
+            days = list(spans)
+            for day, (start, end) in self.spans[option].items():
+                span = days[day]
+                days[day] = (start, end) if span is None else (min(span[0], start), max(span[1], end))
+            spans = tuple(days)
+        return spans, early + self.early[option]
+
+    def score(self, profile: _Profile) -> float:
+        spans, early = profile
+        days = [span for span in spans if span is not None]
+        minutes = sum(end - start for start, end in days)
+        return (
+            self.preferences.early_penalty * early
+            + self.preferences.day_penalty * len(days)
+            + self.preferences.span_penalty * minutes / 60
+        )
+
+
+class Bound:
+    """Score a timetable must beat to be among the best `top_k`, once `top_k` timetables are found."""
+
+    def __init__(self) -> None:
+        self.value = math.inf
+
+    def offer(self, score: float) -> None:
+        """Lower the bound to the score of the worst of `top_k` timetables found."""
+        self.value = min(self.value, score)
+
+
+class Search:
+    """Backtracking search with forward checking, most constrained component first.
+
+    Options are numbered across components and sets of options are int bitsets, so that removing
+    the options that clash with a choice from the domain of every other component is one AND each.
+    """
+
+    def __init__(
+        self, components: Sequence[Component], deadline: float | None, conflicts: list[int] | None = None
+    ) -> None:
+        self.deadline = deadline
+        self.nodes = 0
+        self.options = [option for component in components for option in component.options]
+        self.component_of: list[int] = []
+        domains = []
+        for index, component in enumerate(components):
+            first = len(self.component_of)
+            self.component_of.extend([index] * len(component.options))
+            domains.append(((1 << len(component.options)) - 1) << first)
+        self.domains = domains
+        self.conflicts = conflicts if conflicts is not None else self._conflicts()
+        """Options that clash with each option, as bitsets"""
+        self.timed_out = False
+
+    def _conflicts(self) -> list[int]:
+        clashes = clash_matrix(occupancy([option.slots for option in self.options]))
+        # Options of the same component are never picked together
+        component_of = np.asarray(self.component_of)
+        clashes &= component_of[:, None] != component_of[None, :]
+        packed = np.packbits(clashes, axis=1, bitorder="little")
+        return [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+    def options_in(self, domain: int) -> Iterator[int]:
+        while domain:
+            low = domain & -domain
+            yield low.bit_length() - 1
+            domain ^= low
+
+    def make_arc_consistent(self) -> bool:
+        """Remove options that clash with every option of another component.
+
+        Returns:
+            bool: False if a component has no options left
+        """
+        changed = True
+        while changed:
+            changed = False
+            for index, domain in enumerate(self.domains):
+                for option in self.options_in(domain):
+                    allowed = ~self.conflicts[option]
+                    if any(other & allowed == 0 for k, other in enumerate(self.domains) if k != index):
+                        self.domains[index] &= ~(1 << option)
+                        changed = True
+                if self.domains[index] == 0:
+                    return False
+        return True
+
+    def _expired(self) -> bool:
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % _CHECK_EVERY == 0 and time.monotonic() >= self.deadline:
+            self.timed_out = True
+        return self.timed_out
+
+    def _forward_check(self, domains: list[int], unassigned: list[int], option: int) -> list[int] | None:
+        """Drop the options that clash with `option` from every unassigned component.
+
+        Returns:
+            list[int] | None: pruned domains, or None if an unassigned component has no options left
+        """
+        allowed = ~self.conflicts[option]
+        pruned = list(domains)
+        for k in unassigned:
+            pruned[k] &= allowed
+            if pruned[k] == 0:
+                return None
+        return pruned
+
+    def solutions(self) -> Iterator[list[int]]:
+        yield from self._extend(self.domains, {})
+
+    def _extend(self, domains: list[int], assigned: dict[int, int]) -> Iterator[list[int]]:
+        if len(assigned) == len(domains):
+            yield [assigned[index] for index in range(len(domains))]
+            return
+        unassigned = [index for index in range(len(domains)) if index not in assigned]
+        index = min(unassigned, key=lambda k: domains[k].bit_count())
+        unassigned.remove(index)
+        for option in self.options_in(domains[index]):
+            if self._expired():
+                return
+            if (pruned := self._forward_check(domains, unassigned, option)) is None:
+                continue
+            assigned[index] = option
+            yield from self._extend(pruned, assigned)
+            del assigned[index]
+            if self.timed_out:
+                return
+
+    def ranked(self, cost: CostModel, top_k: int, bound: Bound | None = None) -> Iterator[tuple[float, list[int]]]:
+        """Branch and bound over the timetables, yielding each one that enters the best `top_k` found so far.
+
+        Options are tried cheapest first, so the first timetables found are already good ones. Once
+        `top_k` timetables are found, partial timetables that cost as much as the worst of them are pruned.
+
+        Args:
+            cost (CostModel): score of timetables
+            top_k (int): number of best timetables to find
+            bound (Bound | None, optional): bound shared with searches of other parts of the same timetables.
+                Defaults to a bound of this search only.
+        """
+        best: list[tuple[float, int]] = []
+        yield from self._rank(self.domains, {}, cost.empty, cost, top_k, best, bound or Bound())
+
+    def _rank(
+        self,
+        domains: list[int],
+        assigned: dict[int, int],
+        profile: _Profile,
+        cost: CostModel,
+        top_k: int,
+        best: list[tuple[float, int]],
+        bound: Bound,
+    ) -> Iterator[tuple[float, list[int]]]:
+        if len(assigned) == len(domains):
+            score = cost.score(profile)
+            if len(best) < top_k:
+                heapq.heappush(best, (-score, self.nodes))
+            elif score < -best[0][0]:
+                heapq.heapreplace(best, (-score, self.nodes))
+            else:
+                return
+            if len(best) == top_k:
+                bound.offer(-best[0][0])
+            yield score, [assigned[index] for index in range(len(domains))]
+            return
+        unassigned = [index for index in range(len(domains)) if index not in assigned]
+        index = min(unassigned, key=lambda k: domains[k].bit_count())
+        unassigned.remove(index)
+        candidates = []
+        for option in self.options_in(domains[index]):
+            extended = cost.extend(profile, option)
+            candidates.append((cost.score(extended), option, extended))
+        candidates.sort(key=lambda candidate: candidate[0])
+        for score, option, extended in candidates:
+            if self._expired():
+                return
+            # Costs never decrease as classes are added, so this is a lower bound of every completion
+            if score >= bound.value:
+                return
+            if (pruned := self._forward_check(domains, unassigned, option)) is None:
+                continue
+            assigned[index] = option
+            yield from self._rank(pruned, assigned, extended, cost, top_k, best, bound)
+            del assigned[index]
+            if self.timed_out:
+                return
+
+
+def search(components: Sequence[Component], max_results: int, deadline: float | None = None) -> SearchResult:
+    """Find timetables that pick one option of every component without clashes.
+
+    Args:
+        components (Sequence[Component]): components to pick an option of
+        max_results (int): stop after this many timetables
+        deadline (float | None, optional): `time.monotonic()` after which to stop. Defaults to None.
+
+    Returns:
+        SearchResult: timetables found, in search order
+    """
+    result = SearchResult()
+    if not components:
+        result.complete = True
+        return result
+    state = Search(components, deadline)
+    if not state.make_arc_consistent():
+        result.complete = True
+        return result
+    for solution in state.solutions():
+        result.timetables.append(tuple(state.options[option] for option in solution))
+        if len(result.timetables) >= max_results:
+            break
+    else:
+        result.complete = not state.timed_out
+    result.nodes = state.nodes
+    return result
+
+
+class RankedSearch:
+    """Search for the best `top_k` timetables according to `preferences`.
+
+    Iterating yields `(score, timetable)` each time a timetable enters the best `top_k` found so
+    far, so good timetables come out early and later ones are better. Iteration stops once the
+    best `top_k` are proven or the deadline passes.
+    """
+
+    def __init__(
+        self,
+        components: Sequence[Component],
+        preferences: TimetablePreferences,
+        top_k: int,
+        deadline: float | None = None,
+    ) -> None:
+        self.top_k = top_k
+        self.best: list[tuple[float, tuple[Option, ...]]] = []
+        """Best timetables found, best first"""
+        self.complete = False
+        """Whether `best` are proven to be the best `top_k` timetables"""
+        self._search = Search(components, deadline)
+        self._cost = CostModel(self._search.options, preferences)
+        self._components = components
+
+    @property
+    def nodes(self) -> int:
+        """Number of partial timetables visited"""
+        return self._search.nodes
+
+    def __iter__(self) -> Iterator[tuple[float, tuple[Option, ...]]]:
+        if not self._components or not self._search.make_arc_consistent():
+            self.complete = True
+            return
+        for score, solution in self._search.ranked(self._cost, self.top_k):
+            timetable = tuple(self._search.options[option] for option in solution)
+            self.best.append((score, timetable))
+            self.best.sort(key=lambda entry: entry[0])
+            del self.best[self.top_k :]
+            yield score, timetable
+        self.complete = not self._search.timed_out
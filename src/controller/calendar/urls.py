@@ -0,0 +1,9 @@
+from enum import Enum
+
+__all__ = ("CalendarURL",)
+
+
+class CalendarURL(Enum):
+    TIMETABLE = "/calendar/timetable"
+    RANKED_TIMETABLE = "/calendar/timetable/ranked"
+    EXPORT = "/calendar/export.ics"
@@ -0,0 +1,76 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import cast
+
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.types import Scope
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.app import alchemy
+from src.config.constants import CATALOGUE_SYNC_JOB_STATE_KEY
+from src.controller.catalogue.services import CatalogueSyncJob, CourseDetailService, CourseOfferingService
+from src.controller.proxy.dependencies import provide_proxy_service
+
+__all__ = (
+    "catalogue_lifespan",
+    "provide_catalogue_sync_job",
+    "provide_course_detail_service",
+    "provide_course_offering_service",
+    "provide_mirror_course_detail_service",
+    "provide_mirror_course_offering_service",
+)
+
+
+async def provide_course_offering_service(db_session: AsyncSession) -> AsyncGenerator[CourseOfferingService, None]:
+    async with CourseOfferingService.new(session=db_session) as service:
+        yield service
+
+
+async def provide_course_detail_service(db_session: AsyncSession) -> AsyncGenerator[CourseDetailService, None]:
+    async with CourseDetailService.new(session=db_session) as service:
+        yield service
+
+
+async def provide_mirror_course_offering_service(
+    state: State, scope: Scope
+) -> AsyncGenerator[CourseOfferingService | None, None]:
+    """Course offering service of the catalogue mirror if proxy routes are served from it, else None.
+
+    No database session is opened unless `SERVE_FROM_CATALOGUE` is set.
+    """
+    if not provide_proxy_service(state).config.SERVE_FROM_CATALOGUE:
+        yield None
+        return
+    async with CourseOfferingService.new(session=alchemy.provide_session(state, scope)) as service:
+        yield service
+
+
+async def provide_mirror_course_detail_service(
+    state: State, scope: Scope
+) -> AsyncGenerator[CourseDetailService | None, None]:
+    """Course detail service of the catalogue mirror if proxy routes are served from it, else None.
+
+    No database session is opened unless `SERVE_FROM_CATALOGUE` is set.
+    """
+    if not provide_proxy_service(state).config.SERVE_FROM_CATALOGUE:
+        yield None
+        return
+    async with CourseDetailService.new(session=alchemy.provide_session(state, scope)) as service:
+        yield service
+
+
+def provide_catalogue_sync_job(state: State) -> CatalogueSyncJob:
+    return cast(CatalogueSyncJob, state[CATALOGUE_SYNC_JOB_STATE_KEY])
+
+
+@asynccontextmanager
+async def catalogue_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Hold the catalogue sync job for the lifetime of the application and cancel it on shutdown."""
+    job = CatalogueSyncJob()
+    app.state[CATALOGUE_SYNC_JOB_STATE_KEY] = job
+    try:
+        yield
+    finally:
+        await job.close()
+        del app.state[CATALOGUE_SYNC_JOB_STATE_KEY]
@@ -0,0 +1,35 @@
+from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+
+from src.db.models.class_section import ClassSection
+from src.db.models.course_detail import CourseDetail
+from src.db.models.course_offering import CourseOffering
+from src.db.models.subject import Subject
+from src.db.models.term import Term
+
+__all__ = (
+    "ClassSectionRepository",
+    "CourseDetailRepository",
+    "CourseOfferingRepository",
+    "SubjectRepository",
+    "TermRepository",
+)
+
+
+class TermRepository(SQLAlchemyAsyncRepository[Term]):
+    model_type = Term
+
+
+class SubjectRepository(SQLAlchemyAsyncRepository[Subject]):
+    model_type = Subject
+
+
+class CourseOfferingRepository(SQLAlchemyAsyncRepository[CourseOffering]):
+    model_type = CourseOffering
+
+
+class CourseDetailRepository(SQLAlchemyAsyncRepository[CourseDetail]):
+    model_type = CourseDetail
+
+
+class ClassSectionRepository(SQLAlchemyAsyncRepository[ClassSection]):
+    model_type = ClassSection
@@ -0,0 +1,87 @@
+from typing import Annotated
+
+from litestar import Controller, get, post
+from litestar.di import Provide
+from litestar.params import Parameter
+
+from src.controller.catalogue.dependencies import provide_catalogue_sync_job, provide_course_detail_service
+from src.controller.catalogue.schema import CatalogueSyncStatus, CourseSearchHit
+from src.controller.catalogue.services import CatalogueSyncJob, CourseDetailService, SyncMode
+from src.controller.catalogue.urls import CatalogueURL
+from src.controller.proxy.dependencies import provide_proxy_service
+from src.controller.proxy.services import YEAR, ProxyQueryService
+from src.controller.user.guards import require_superuser
+
+__all__ = ("CatalogueController",)
+
+
+class CatalogueController(Controller):
+    """Catalogue Mirror Controller"""
+
+    tags = ["Catalogue Controller"]
+    dependencies = {
+        "proxy_service": Provide(provide_proxy_service, sync_to_thread=False),
+        "sync_job": Provide(provide_catalogue_sync_job, sync_to_thread=False),
+        "course_detail_service": Provide(provide_course_detail_service),
+    }
+    dto = None
+    return_dto = None
+
+    @post(
+        operation_id="SyncCatalogue",
+        name="catalogue:sync",
+        summary="Sync Catalogue",
+        description="Start mirroring courses, course details and class lists of a year from courseplanner-api",
+        path=CatalogueURL.SYNC.value,
+        status_code=202,
+        guards=[require_superuser],
+    )
+    async def sync_catalogue(
+        self,
+        proxy_service: ProxyQueryService,
+        sync_job: CatalogueSyncJob,
+        year: Annotated[int, Parameter(query="year", default=YEAR, required=False)],
+        mode: Annotated[SyncMode, Parameter(query="mode", default="full", required=False)],
+    ) -> CatalogueSyncStatus:
+        """Start a catalogue sync in the background. Does nothing if a sync is already running.
+
+        Args:
+            proxy_service (ProxyQueryService): upstream query service
+            sync_job (CatalogueSyncJob): background sync job
+            year (int): academic year to mirror
+            mode (SyncMode): `full`, or `class_lists` to only refresh class lists of mirrored courses
+
+        Returns:
+            CatalogueSyncStatus: status of the running sync
+        """
+        return sync_job.start(proxy_service, year, mode)
+
+    @get(
+        operation_id="GetCatalogueSyncStatus",
+        name="catalogue:syncStatus",
+        summary="Get Catalogue Sync Status",
+        description="Get progress of the last catalogue sync",
+        path=CatalogueURL.SYNC.value,
+        guards=[require_superuser],
+    )
+    async def get_sync_status(self, sync_job: CatalogueSyncJob) -> CatalogueSyncStatus:
+        return sync_job.status
+
+    @get(
+        operation_id="SearchCatalogue",
+        name="catalogue:search",
+        summary="Search Catalogue",
+        description="Ranked full-text search over mirrored course titles, codes, syllabi and assumed knowledge",
+        path=CatalogueURL.SEARCH.value,
+        exclude_from_auth=True,
+    )
+    async def search_catalogue(
+        self,
+        course_detail_service: CourseDetailService,
+        search_text: Annotated[str, Parameter(query="q", min_length=1, max_length=256)],
+        year: Annotated[int | None, Parameter(query="year", required=False)] = None,
+        term: Annotated[str | None, Parameter(query="term", required=False)] = None,
+        limit: Annotated[int, Parameter(query="limit", ge=1, le=100, default=25, required=False)] = 25,
+        offset: Annotated[int, Parameter(query="offset", ge=0, default=0, required=False)] = 0,
+    ) -> list[CourseSearchHit]:
+        return await course_detail_service.search_text(search_text, year=year, term=term, limit=limit, offset=offset)
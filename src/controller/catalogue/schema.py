@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import Literal
+
+from src.utils.schema import CamelizedBaseStruct
+
+__all__ = (
+    "CatalogueSyncStatus",
+    "ClassListChangeSet",
+    "ClassSectionChange",
+    "CourseSearchHit",
+    "SeatCount",
+)
+
+
+class CatalogueSyncStatus(CamelizedBaseStruct):
+    state: Literal["idle", "running", "succeeded", "failed"] = "idle"
+    mode: Literal["full", "class_lists"] = "full"
+    year: int | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    terms: int = 0
+    subjects: int = 0
+    offerings: int = 0
+    details: int = 0
+    failed_subjects: int = 0
+    failed_details: int = 0
+    class_lists: int = 0
+    changed_class_sections: int = 0
+    failed_class_lists: int = 0
+    error: str | None = None
+
+
+class CourseSearchHit(CamelizedBaseStruct):
+    course_id: str
+    course_offer_nbr: str
+    term: str
+    year: str
+    subject: str
+    catalog_nbr: str
+    course_title: str
+    rank: float
+    """Relevance - higher is better"""
+
+
+class SeatCount(CamelizedBaseStruct):
+    size: int
+    enrolled: int
+    available: int
+
+
+class ClassSectionChange(CamelizedBaseStruct):
+    kind: Literal["added", "changed", "removed"]
+    group_type: str
+    class_nbr: str
+    section: str
+    old: SeatCount | None = None
+    """Seat count before the change. None for added classes."""
+    new: SeatCount | None = None
+    """Seat count after the change. None for removed classes."""
+
+
+class ClassListChangeSet(CamelizedBaseStruct):
+    course_id: str
+    course_offer_nbr: str
+    term: str
+    session: str
+    changes: list[ClassSectionChange]
+    unchanged: int
+    """Number of classes whose content did not change."""
@@ -0,0 +1,559 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import re
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any, Literal
+
+import msgspec
+from advanced_alchemy.service import SQLAlchemyAsyncRepositoryService
+from litestar.exceptions import ServiceUnavailableException
+from sqlalchemy import ColumnElement, Select, column, func, literal_column, select, table
+
+import src.controller.proxy.schema as dto
+from src.config.app import alchemy
+from src.controller.catalogue.repositories import (
+    ClassSectionRepository,
+    CourseDetailRepository,
+    CourseOfferingRepository,
+    SubjectRepository,
+    TermRepository,
+)
+from src.controller.catalogue.schema import (
+    CatalogueSyncStatus,
+    ClassListChangeSet,
+    ClassSectionChange,
+    CourseSearchHit,
+    SeatCount,
+)
+from src.controller.proxy.helpers import fan_out
+from src.db.models.class_section import ClassSection
+from src.db.models.course_detail import SEARCH_INDEX_NAME, SEARCH_KEY_NAME, CourseDetail
+from src.db.models.course_offering import CourseOffering
+from src.db.models.subject import Subject
+from src.db.models.term import Term
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from src.controller.proxy.services import ProxyQueryService
+
+__all__ = (
+    "CatalogueSyncJob",
+    "CatalogueSyncService",
+    "ClassSectionService",
+    "CourseDetailService",
+    "CourseOfferingService",
+    "SubjectService",
+    "TermService",
+)
+
+logger = logging.getLogger(__name__)
+
+SYNC_PAGE_SIZE = 100
+"""Rows per upstream page when crawling course search results."""
+SYNC_PREFETCH = 4
+"""Pages fetched concurrently per subject when crawling course search results."""
+
+DetailKey = tuple[str, str, str, str]
+"""course_id, course_offer_nbr, term, year"""
+ClassListKey = tuple[str, str, str]
+"""course_id, course_offer_nbr, term"""
+SyncMode = Literal["full", "class_lists"]
+ChangeListener = Callable[[ClassListChangeSet], None]
+
+_class_info_encoder = msgspec.json.Encoder()
+
+_SEARCH_TOKEN = re.compile(r"\w+")
+_SQLITE_SEARCH_INDEX = table(SEARCH_INDEX_NAME, column("rowid"))
+_SQLITE_SEARCH_KEY = table(SEARCH_KEY_NAME, column("search_rowid"), column("detail_id"))
+_SQLITE_RANK = f"bm25({SEARCH_INDEX_NAME}, 10.0, 10.0, 10.0, 4.0, 2.0)"
+"""FTS5 rank weighted by column: title, subject, catalogue number, syllabus, assumed knowledge. Lower is better."""
+
+
+class TermService(SQLAlchemyAsyncRepositoryService[Term]):
+    def __init__(self, **kwargs: Any) -> None:
+        self.repository = TermRepository(**kwargs)
+        self.model_type = Term
+
+
+class SubjectService(SQLAlchemyAsyncRepositoryService[Subject]):
+    def __init__(self, **kwargs: Any) -> None:
+        self.repository = SubjectRepository(**kwargs)
+        self.model_type = Subject
+
+
+class CourseOfferingService(SQLAlchemyAsyncRepositoryService[CourseOffering]):
+    def __init__(self, **kwargs: Any) -> None:
+        self.repository = CourseOfferingRepository(**kwargs)
+        self.model_type = CourseOffering
+
+    @staticmethod
+    def from_struct(row: dto.CourseSearch) -> CourseOffering:
+        return CourseOffering(**{name.lower(): getattr(row, name) for name in row.__struct_fields__})
+
+    @staticmethod
+    def to_struct(model: CourseOffering) -> dto.CourseSearch:
+        return dto.CourseSearch(**{name: getattr(model, name.lower()) for name in dto.CourseSearch.__struct_fields__})
+
+    async def search(
+        self,
+        course_title: str | None = None,
+        subject_areas: str | None = None,
+        catalogue_number: int | None = None,
+        class_number: str | None = None,
+        year: int | None = None,
+        term: str | None = None,
+        academic_career: str | None = None,
+        campus: str | None = None,
+        page_number: int = 1,
+        page_size: int = 25,
+    ) -> list[dto.CourseSearch]:
+        """Search the mirrored course search results. Takes the same criteria as `ProxyQueryService.course`.
+
+        Returns:
+            list[dto.CourseSearch]: requested page of matching rows
+        """
+        filters: list[Any] = []
+        if course_title:
+            filters.append(func.lower(CourseOffering.course_title).contains(course_title.lower(), autoescape=True))
+        criteria = {
+            CourseOffering.subject: subject_areas,
+            CourseOffering.catalog_nbr: catalogue_number,
+            CourseOffering.class_nbr: class_number,
+            CourseOffering.year: year,
+            CourseOffering.term: term,
+            CourseOffering.acad_career: academic_career,
+            CourseOffering.campus: campus,
+        }
+        filters.extend(column == str(value) for column, value in criteria.items() if value is not None)
+        statement = (
+            select(CourseOffering)
+            .where(*filters)
+            .order_by(CourseOffering.subject, CourseOffering.catalog_nbr, CourseOffering.class_nbr)
+            .limit(page_size)
+            .offset(page_size * (page_number - 1))
+        )
+        return [self.to_struct(model) for model in await self.list(statement=statement)]
+
+
+class CourseDetailService(SQLAlchemyAsyncRepositoryService[CourseDetail]):
+    def __init__(self, **kwargs: Any) -> None:
+        self.repository = CourseDetailRepository(**kwargs)
+        self.model_type = CourseDetail
+
+    @staticmethod
+    def key(model: CourseDetail) -> DetailKey:
+        return (model.course_id, model.course_offer_nbr, model.term, model.year)
+
+    @staticmethod
+    def update_from_struct(model: CourseDetail, detail: dto.CourseDetail) -> CourseDetail:
+        model.subject = detail.SUBJECT
+        model.catalog_nbr = detail.CATALOG_NBR
+        model.course_title = detail.COURSE_TITLE
+        model.syllabus = detail.SYLLABUS
+        model.assumed_knowledge = detail.ASSUMED_KNOWLEDGE
+        model.data = msgspec.to_builtins(detail)
+        return model
+
+    @staticmethod
+    def to_struct(model: CourseDetail) -> dto.CourseDetail:
+        return msgspec.convert(model.data, dto.CourseDetail)
+
+    async def get_detail(
+        self, course_id: str, course_offer_number: int, term: int, year: int
+    ) -> dto.CourseDetail | None:
+        model = await self.get_one_or_none(
+            course_id=course_id, course_offer_nbr=str(course_offer_number), term=str(term), year=str(year)
+        )
+        return self.to_struct(model) if model is not None else None
+
+    async def search_text(
+        self,
+        query: str,
+        year: int | None = None,
+        term: str | None = None,
+        limit: int = 25,
+        offset: int = 0,
+    ) -> list[CourseSearchHit]:
+        """Ranked full-text search over course titles, codes, syllabi and assumed knowledge.
+
+        On SQLite every word is matched as a prefix, so partial words typed into a search box match.
+        On PostgreSQL the query supports web search syntax - quoted phrases, `or` and `-word`.
+
+        Args:
+            query (str): search text
+            year (int | None, optional): academic year. Defaults to None.
+            term (str | None, optional): term code. Defaults to None.
+            limit (int, optional): max number of hits. Defaults to 25.
+            offset (int, optional): number of hits to skip. Defaults to 0.
+
+        Returns:
+            list[CourseSearchHit]: hits, best match first
+
+        Raises:
+            ServiceUnavailableException: if the database is neither SQLite nor PostgreSQL
+        """
+        filters: list[Any] = []
+        if year is not None:
+            filters.append(CourseDetail.year == str(year))
+        if term is not None:
+            filters.append(CourseDetail.term == term)
+        columns = (
+            CourseDetail.course_id,
+            CourseDetail.course_offer_nbr,
+            CourseDetail.term,
+            CourseDetail.year,
+            CourseDetail.subject,
+            CourseDetail.catalog_nbr,
+            CourseDetail.course_title,
+        )
+        rank: ColumnElement[Any]
+        statement: Select[Any]
+        match self.repository.session.bind.dialect.name:
+            case "sqlite":
+                tokens = _SEARCH_TOKEN.findall(query)
+                if not tokens:
+                    return []
+                rank = literal_column(_SQLITE_RANK)
+                statement = (
+                    select(*columns, (-rank).label("rank"))
+                    .join(_SQLITE_SEARCH_KEY, _SQLITE_SEARCH_KEY.c.detail_id == CourseDetail.id)
+                    .join(_SQLITE_SEARCH_INDEX, _SQLITE_SEARCH_INDEX.c.rowid == _SQLITE_SEARCH_KEY.c.search_rowid)
+                    .where(
+                        literal_column(SEARCH_INDEX_NAME).op("MATCH")(" ".join(f'"{token}"*' for token in tokens)),
+                        *filters,
+                    )
+                    .order_by(rank)
+                )
+            case "postgresql":
+                if not query.strip():
+                    return []
+                ts_query = func.websearch_to_tsquery("english", query)
+                search_vector: ColumnElement[Any] = literal_column("course_detail_table.search_vector")
+                rank = func.ts_rank_cd(search_vector, ts_query)
+                statement = (
+                    select(*columns, rank.label("rank"))
+                    .where(search_vector.op("@@")(ts_query), *filters)
+                    .order_by(rank.desc())
+                )
+            case dialect:
+                raise ServiceUnavailableException(detail=f"Full-text search is not supported on {dialect}")
+        statement = statement.order_by(CourseDetail.subject, CourseDetail.catalog_nbr).limit(limit).offset(offset)
+        result = await self.repository.session.execute(statement)
+        return [CourseSearchHit(**row._asdict()) for row in result]
+
+
+class ClassSectionService(SQLAlchemyAsyncRepositoryService[ClassSection]):
+    def __init__(self, **kwargs: Any) -> None:
+        self.repository = ClassSectionRepository(**kwargs)
+        self.model_type = ClassSection
+
+    @staticmethod
+    def content_hash(class_info: dto.ClassInfo) -> str:
+        """Digest of the canonical encoding of a class. Struct fields always encode in declaration order."""
+        return hashlib.blake2b(_class_info_encoder.encode(class_info), digest_size=16).hexdigest()
+
+    @staticmethod
+    def seat_count(class_info: dto.ClassInfo | ClassSection) -> SeatCount:
+        return SeatCount(size=class_info.size, enrolled=class_info.enrolled, available=class_info.available)
+
+    @staticmethod
+    def update_from_struct(model: ClassSection, class_info: dto.ClassInfo, content_hash: str) -> ClassSection:
+        model.section = class_info.section
+        model.size = class_info.size
+        model.enrolled = class_info.enrolled
+        model.available = class_info.available
+        model.content_hash = content_hash
+        model.data = msgspec.to_builtins(class_info)
+        return model
+
+    async def apply_class_list(
+        self, course_id: str, course_offer_nbr: str, term: str, groups: Sequence[dto.Group], session: str = "1"
+    ) -> ClassListChangeSet:
+        """Store a freshly downloaded class list, writing only the classes whose content changed.
+
+        Args:
+            course_id (str): course id
+            course_offer_nbr (str): course offer number
+            term (str): term code
+            groups (Sequence[dto.Group]): class list
+            session (str, optional): session code. Defaults to "1".
+
+        Returns:
+            ClassListChangeSet: added, changed and removed classes with their seat counts
+        """
+        existing = {
+            (model.group_type, model.class_nbr): model
+            for model in await self.list(
+                course_id=course_id, course_offer_nbr=course_offer_nbr, term=term, session=session
+            )
+        }
+        changes: list[ClassSectionChange] = []
+        new_models: list[ClassSection] = []
+        seen: set[tuple[str, str]] = set()
+        unchanged = 0
+        for group in groups:
+            for class_info in group.classes:
+                key = (group.type, class_info.class_nbr)
+                if key in seen:
+                    continue
+                seen.add(key)
+                content_hash = self.content_hash(class_info)
+                model = existing.pop(key, None)
+                if model is not None and model.content_hash == content_hash:
+                    unchanged += 1
+                    continue
+                change = ClassSectionChange(
+                    kind="added", group_type=group.type, class_nbr=class_info.class_nbr, section=class_info.section
+                )
+                if model is None:
+                    model = ClassSection(
+                        course_id=course_id,
+                        course_offer_nbr=course_offer_nbr,
+                        term=term,
+                        session=session,
+                        group_type=group.type,
+                        class_nbr=class_info.class_nbr,
+                    )
+                    new_models.append(model)
+                else:
+                    change.kind = "changed"
+                    change.old = self.seat_count(model)
+                change.new = self.seat_count(class_info)
+                self.update_from_struct(model, class_info, content_hash)
+                changes.append(change)
+        for (group_type, class_nbr), model in existing.items():
+            changes.append(
+                ClassSectionChange(
+                    kind="removed",
+                    group_type=group_type,
+                    class_nbr=class_nbr,
+                    section=model.section,
+                    old=self.seat_count(model),
+                )
+            )
+        if new_models:
+            await self.create_many(new_models)
+        if existing:
+            await self.delete_many([model.id for model in existing.values()])
+        # Changed classes are dirty in the session; unchanged ones are not written
+        await self.repository.session.flush()
+        return ClassListChangeSet(
+            course_id=course_id,
+            course_offer_nbr=course_offer_nbr,
+            term=term,
+            session=session,
+            changes=changes,
+            unchanged=unchanged,
+        )
+
+
+class CatalogueSyncService:
+    def __init__(self, proxy_service: ProxyQueryService, session: AsyncSession) -> None:
+        """Populate the catalogue mirror from courseplanner-api.
+
+        Args:
+            proxy_service (ProxyQueryService): upstream query service
+            session (AsyncSession): database session. The caller commits.
+        """
+        self.proxy_service = proxy_service
+        self.session = session
+        self.change_sets: list[ClassListChangeSet] = []
+        """Class list changes made by the sync. Only class lists with at least one change are listed."""
+
+    async def sync(self, year: int, status: CatalogueSyncStatus) -> CatalogueSyncStatus:
+        """Mirror terms, subjects, course search results, course details and class lists of a year.
+
+        Course search results are replaced per subject, details and class lists per course, so a
+        subject or course that fails to download keeps its previously mirrored rows.
+
+        Args:
+            year (int): academic year
+            status (CatalogueSyncStatus): progress counters, updated in place
+
+        Returns:
+            CatalogueSyncStatus: `status`
+        """
+        terms = await self.proxy_service.term(year=year)
+        term_service = TermService(session=self.session)
+        await term_service.delete_where(Term.term.in_([term.TERM for term in terms]))
+        await term_service.create_many(
+            [Term(term=term.TERM, descr=term.DESCR, acad_year=term.ACAD_YEAR, current=term.CURRENT) for term in terms]
+        )
+        status.terms = len(terms)
+
+        subjects = await self.proxy_service.subjects(year=year)
+        subject_service = SubjectService(session=self.session)
+        await subject_service.delete_where(Subject.year == year)
+        await subject_service.create_many(
+            [Subject(subject=subject.SUBJECT, descr=subject.DESCR, year=year) for subject in subjects]
+        )
+        status.subjects = len(subjects)
+
+        offerings = await self._sync_offerings(year, [subject.SUBJECT for subject in subjects], status)
+        await self._sync_details(year, offerings, status)
+        await self._sync_class_lists([(row.COURSE_ID, row.COURSE_OFFER_NBR, row.TERM) for row in offerings], status)
+        return status
+
+    async def sync_class_lists(self, year: int, status: CatalogueSyncStatus) -> CatalogueSyncStatus:
+        """Refresh the class lists of the mirrored courses of a year. Only changed classes are written.
+
+        Args:
+            year (int): academic year
+            status (CatalogueSyncStatus): progress counters, updated in place
+
+        Returns:
+            CatalogueSyncStatus: `status`
+        """
+        statement = (
+            select(CourseOffering.course_id, CourseOffering.course_offer_nbr, CourseOffering.term)
+            .where(CourseOffering.year == str(year))
+            .distinct()
+        )
+        keys = [(row.course_id, row.course_offer_nbr, row.term) for row in await self.session.execute(statement)]
+        await self._sync_class_lists(keys, status)
+        return status
+
+    async def _sync_offerings(
+        self, year: int, subjects: Sequence[str], status: CatalogueSyncStatus
+    ) -> list[dto.CourseSearch]:
+        async def crawl(subject: str) -> list[dto.CourseSearch]:
+            paginator = await self.proxy_service.course_paginator(
+                subject_areas=subject, year=year, page_size=SYNC_PAGE_SIZE, prefetch=SYNC_PREFETCH
+            )
+            try:
+                return [row async for page in paginator for row in page.data]
+            finally:
+                await paginator.aclose()
+
+        results = await fan_out(crawl, subjects, self.proxy_service.config.BATCH_CONCURRENCY)
+        offering_service = CourseOfferingService(session=self.session)
+        offerings: list[dto.CourseSearch] = []
+        for subject, rows in results.items():
+            if isinstance(rows, Exception):
+                status.failed_subjects += 1
+                continue
+            unique_rows = {(row.COURSE_ID, row.COURSE_OFFER_NBR, row.TERM, row.CLASS_NBR): row for row in rows}
+            await offering_service.delete_where(CourseOffering.subject == subject, CourseOffering.year == str(year))
+            await offering_service.create_many([offering_service.from_struct(row) for row in unique_rows.values()])
+            offerings.extend(unique_rows.values())
+        status.offerings = len(offerings)
+        return offerings
+
+    async def _sync_details(
+        self, year: int, offerings: Sequence[dto.CourseSearch], status: CatalogueSyncStatus
+    ) -> None:
+        keys: list[DetailKey] = list(
+            dict.fromkeys((row.COURSE_ID, row.COURSE_OFFER_NBR, row.TERM, str(year)) for row in offerings)
+        )
+
+        async def fetch(key: DetailKey) -> dto.CourseDetail:
+            course_id, course_offer_nbr, term, _ = key
+            return await self.proxy_service.course_detail(
+                course_id=course_id, course_offer_number=int(course_offer_nbr), term=int(term), year=year
+            )
+
+        results = await fan_out(fetch, keys, self.proxy_service.config.BATCH_CONCURRENCY)
+        detail_service = CourseDetailService(session=self.session)
+        existing = {detail_service.key(model): model for model in await detail_service.list(year=str(year))}
+        new_models = []
+        for key, detail in results.items():
+            if isinstance(detail, Exception):
+                status.failed_details += 1
+                continue
+            model = existing.get(key)
+            if model is None:
+                course_id, course_offer_nbr, term, year_ = key
+                model = CourseDetail(course_id=course_id, course_offer_nbr=course_offer_nbr, term=term, year=year_)
+                new_models.append(model)
+            detail_service.update_from_struct(model, detail)
+            status.details += 1
+        await detail_service.create_many(new_models)
+        await self.session.flush()
+
+    async def _sync_class_lists(self, keys: Sequence[ClassListKey], status: CatalogueSyncStatus) -> None:
+        async def fetch(key: ClassListKey) -> Sequence[dto.Group]:
+            course_id, course_offer_nbr, term = key
+            return await self.proxy_service.course_class_list(
+                course_id=course_id, course_offer_number=int(course_offer_nbr), term=int(term)
+            )
+
+        results = await fan_out(fetch, keys, self.proxy_service.config.BATCH_CONCURRENCY)
+        class_section_service = ClassSectionService(session=self.session)
+        for (course_id, course_offer_nbr, term), groups in results.items():
+            if isinstance(groups, Exception):
+                status.failed_class_lists += 1
+                continue
+            change_set = await class_section_service.apply_class_list(course_id, course_offer_nbr, term, groups)
+            status.class_lists += 1
+            status.changed_class_sections += len(change_set.changes)
+            if change_set.changes:
+                self.change_sets.append(change_set)
+
+
+class CatalogueSyncJob:
+    """Runs at most one catalogue sync at a time in the background and reports its progress."""
+
+    def __init__(self) -> None:
+        self.status = CatalogueSyncStatus()
+        self.listeners: list[ChangeListener] = []
+        """Called with each class list change set once the sync that made it is committed."""
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, proxy_service: ProxyQueryService, year: int, mode: SyncMode = "full") -> CatalogueSyncStatus:
+        """Start a sync unless one is already running.
+
+        Args:
+            proxy_service (ProxyQueryService): upstream query service
+            year (int): academic year
+            mode (SyncMode, optional): `full` mirrors everything, `class_lists` only refreshes the class lists
+                of already mirrored courses. Defaults to "full".
+
+        Returns:
+            CatalogueSyncStatus: status of the running sync
+        """
+        if not self.running:
+            self.status = CatalogueSyncStatus(state="running", mode=mode, year=year, started_at=datetime.now(UTC))
+            self._task = asyncio.create_task(self._run(proxy_service, year, mode, self.status))
+        return self.status
+
+    async def _run(
+        self, proxy_service: ProxyQueryService, year: int, mode: SyncMode, status: CatalogueSyncStatus
+    ) -> None:
+        try:
+            async with alchemy.get_session() as session:
+                sync_service = CatalogueSyncService(proxy_service, session)
+                if mode == "class_lists":
+                    await sync_service.sync_class_lists(year, status)
+                else:
+                    await sync_service.sync(year, status)
+                await session.commit()
+        except Exception as e:  # noqa: BLE001
+            status.state = "failed"
+            status.error = str(e) or type(e).__name__
+            return
+        finally:
+            status.finished_at = datetime.now(UTC)
+        status.state = "succeeded"
+        # The sync is committed, a failing listener only misses its own notification
+        for change_set in sync_service.change_sets:
+            for listener in self.listeners:
+                try:
+                    listener(change_set)
+                except Exception:
+                    logger.exception("Catalogue change listener failed on course %s", change_set.course_id)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
@@ -0,0 +1,8 @@
+from enum import Enum
+
+__all__ = ("CatalogueURL",)
+
+
+class CatalogueURL(Enum):
+    SYNC = "/catalogue/sync"
+    SEARCH = "/catalogue/search"
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, cast
+
+import msgspec
+
+if TYPE_CHECKING:
+    from litestar.stores.base import Store
+
+__all__ = (
+    "CacheEntry",
+    "EncodedBody",
+    "MemoryCache",
+    "ProxyCache",
+    "ResponseCache",
+    "create_store",
+)
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    value: Any
+    """Parsed upstream data."""
+    size: int
+    """Size in bytes of the encoded value."""
+    expires_at: float
+    """Unix time after which the entry is stale."""
+    stale_until: float
+    """Unix time after which the entry is dropped - stale entries may still be served while revalidating or on error."""
+    etag: str = ""
+    """Digest of the encoded value. Identical values have identical etags. Empty if the value is not cached."""
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    @property
+    def evictable(self) -> bool:
+        return time.time() >= self.stale_until
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        """In-process LRU cache bounded by entry count and by total encoded size.
+
+        Args:
+            max_entries (int): max number of entries
+            max_bytes (int): max sum of entry sizes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.evictable:
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        self.delete(key)
+        if entry.size > self.max_bytes or self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self.size += entry.size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def items(self) -> list[tuple[str, CacheEntry]]:
+        """Entries that are not evictable, least recently used first."""
+        return [(key, entry) for key, entry in self._entries.items() if not entry.evictable]
+
+
+class ProxyCache:
+    def __init__(self, memory: MemoryCache, store: Store | None = None) -> None:
+        """Two tier cache for parsed upstream data.
+
+        Lookups try the in-process `memory` tier first, then the optional `store` tier which can be
+        shared between workers. Values found in `store` are copied into `memory`.
+
+        Args:
+            memory (MemoryCache): in-process tier
+            store (Store | None, optional): shared tier. Defaults to None.
+        """
+        self.memory = memory
+        self.store = store
+        self.hits = 0
+        """Number of lookups served by the in-process tier."""
+        self.store_hits = 0
+        """Number of lookups served by the shared tier."""
+        self.misses = 0
+        """Number of lookups served by neither tier."""
+
+    async def get(self, key: str, value_type: Any) -> CacheEntry | None:
+        """Look up a key.
+
+        Args:
+            key (str): cache key
+            value_type (Any): type of the cached value, used to decode values from the shared tier
+
+        Returns:
+            CacheEntry | None: entry if found and not evictable. The entry may be stale.
+        """
+        if (entry := self.memory.get(key)) is not None:
+            self.hits += 1
+            return entry
+        if self.store is not None and (raw := await self.store.get(key)) is not None:
+            expires_at, stale_until, etag, value = msgspec.json.decode(raw, type=tuple[float, float, str, value_type])
+            entry = CacheEntry(value=value, size=len(raw), expires_at=expires_at, stale_until=stale_until, etag=etag)
+            if not entry.evictable:
+                self.store_hits += 1
+                self.memory.set(key, entry)
+                return entry
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: int, stale_ttl: int = 0) -> CacheEntry:
+        """Store a value in every tier.
+
+        Args:
+            key (str): cache key
+            value (Any): value - must be encodable by msgspec
+            ttl (int): time in seconds the value is fresh
+            stale_ttl (int, optional): time in seconds the value is kept after it becomes stale. Defaults to 0.
+
+        Returns:
+            CacheEntry: stored entry
+        """
+        expires_at = time.time() + ttl
+        stale_until = expires_at + stale_ttl
+        encoded = msgspec.json.encode(value)
+        etag = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+        raw = msgspec.json.encode((expires_at, stale_until, etag, msgspec.Raw(encoded)))
+        entry = CacheEntry(value=value, size=len(raw), expires_at=expires_at, stale_until=stale_until, etag=etag)
+        self.memory.set(key, entry)
+        if self.store is not None:
+            await self.store.set(key, raw, expires_in=ttl + stale_ttl)
+        return entry
+
+
+@dataclass(slots=True)
+class EncodedBody:
+    json: bytes
+    """Encoded response body."""
+    gzip: bytes | None = None
+    """Gzip compressed `json`, if it is large enough to be worth compressing."""
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, max_bytes: int, gzip_min_size: int | None = 500) -> None:
+        """In-process cache of encoded response bodies.
+
+        Bodies are keyed by route and by the etag of the data they were encoded from, so they never
+        go stale - new upstream data has a new etag and old bodies age out of the LRU.
+
+        Args:
+            max_entries (int): max number of bodies
+            max_bytes (int): max sum of body sizes, including their compressed copies
+            gzip_min_size (int | None, optional): min body size in bytes to keep a gzip compressed copy of.
+                None disables precompression. Defaults to 500.
+        """
+        self.memory = MemoryCache(max_entries=max_entries, max_bytes=max_bytes)
+        self.gzip_min_size = gzip_min_size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> EncodedBody | None:
+        entry = self.memory.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cast(EncodedBody, entry.value)
+
+    def set(self, key: str, json: bytes) -> EncodedBody:
+        body = EncodedBody(json=json)
+        if self.gzip_min_size is not None and len(json) >= self.gzip_min_size:
+            body.gzip = gzip.compress(json, compresslevel=9)
+        size = len(json) + len(body.gzip or b"")
+        self.memory.set(key, CacheEntry(value=body, size=size, expires_at=math.inf, stale_until=math.inf))
+        return body
+
+
+def create_store(url: str, max_bytes: int = 0) -> Store | None:
+    """Create the shared cache tier from a url.
+
+    Supported urls are `redis://...` (requires the `redis` package), `file://<directory>` and
+    `sqlite://<database file>`.
+
+    Args:
+        url (str): store url. An empty url disables the shared tier.
+        max_bytes (int, optional): max total size of the values kept by a `sqlite://` store. 0 disables the bound.
+            Defaults to 0.
+
+    Returns:
+        Store | None: store
+    """
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        from litestar.stores.redis import RedisStore
+
+        return RedisStore.with_client(url=url, namespace="PROXY_CACHE")
+    if url.startswith("file://"):
+        from pathlib import Path
+
+        from litestar.stores.file import FileStore
+
+        return FileStore(path=Path(url.removeprefix("file://")))
+    if url.startswith("sqlite://"):
+        from .store import SQLiteStore
+
+        return SQLiteStore(url.removeprefix("sqlite://"), max_bytes=max_bytes)
+    raise ValueError(f"Unsupported cache store url: {url}")
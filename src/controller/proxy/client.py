@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+from src.config.app import settings
+from src.config.constants import PROXY_SERVICE_STATE_KEY
+from src.controller.proxy.services import ProxyQueryService
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+    from litestar import Litestar
+
+    from src.config.base import ProxySettings
+
+__all__ = (
+    "create_client_session",
+    "proxy_lifespan",
+)
+
+
+def create_client_session(config: ProxySettings) -> aiohttp.ClientSession:
+    """Create an upstream client session backed by a keep-alive connection pool.
+
+    Connections are reused across requests so that only the first request to courseplanner-api
+    pays for DNS lookup and TCP + TLS setup.
+
+    Args:
+        config (ProxySettings): pool and timeout settings
+
+    Returns:
+        aiohttp.ClientSession: client session. Must be closed by the caller.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.POOL_LIMIT,
+        limit_per_host=config.POOL_LIMIT_PER_HOST,
+        keepalive_timeout=config.KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=config.DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(total=config.TIMEOUT, connect=config.CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+@asynccontextmanager
+async def proxy_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Open the shared upstream client for the lifetime of the application.
+
+    The `ProxyQueryService` bound to the client is stored on the application state and
+    injected into route handlers with `provide_proxy_service`.
+
+    Args:
+        app (Litestar): application instance
+    """
+    async with create_client_session(settings.proxy) as client:
+        proxy_service = ProxyQueryService(client=client, config=settings.proxy)
+        app.state[PROXY_SERVICE_STATE_KEY] = proxy_service
+        try:
+            yield
+        finally:
+            del app.state[PROXY_SERVICE_STATE_KEY]
+            await proxy_service.close()
@@ -0,0 +1,13 @@
+from typing import cast
+
+from litestar.datastructures import State
+
+from src.config.constants import PROXY_SERVICE_STATE_KEY
+from src.controller.proxy.services import ProxyQueryService
+
+__all__ = ("provide_proxy_service",)
+
+
+def provide_proxy_service(state: State) -> ProxyQueryService:
+    """Return the application wide proxy service created by `proxy_lifespan`."""
+    return cast(ProxyQueryService, state[PROXY_SERVICE_STATE_KEY])
@@ -0,0 +1,115 @@
+# etag.py
+
+from __future__ import annotations
+
+import hashlib
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+from litestar import Response
+from litestar.status_codes import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+from litestar.utils.scope.state import ScopeState
+
+if TYPE_CHECKING:
+    from litestar import Request
+    from litestar.types import Scope
+
+    from .cache import EncodedBody
+
+__all__ = (
+    "add_etag",
+    "record_etag",
+    "response_etag",
+    "set_encoded_body",
+    "track_etags",
+)
+
+
+_UNCACHED = ""
+"""Etag recorded for upstream data that is not cached. A response built from it gets no etag."""
+
+
+class _ConditionalRequest:
+    __slots__ = ("accepts_gzip", "body", "etags", "if_none_match", "scope")
+
+    def __init__(self, scope: Scope, if_none_match: str | None, accepts_gzip: bool) -> None:
+        self.scope = scope
+        self.if_none_match = if_none_match
+        self.accepts_gzip = accepts_gzip
+        self.etags: list[str] = []
+        self.body: EncodedBody | None = None
+
+    @property
+    def etag(self) -> str | None:
+        # The same data gives the same etag, whatever order it was read in and however often
+        etags = sorted(set(self.etags))
+        if not etags or _UNCACHED in etags:
+            return None
+        if len(etags) == 1:
+            return etags[0]
+        return hashlib.blake2b(",".join(etags).encode(), digest_size=16).hexdigest()
+
+    def matches(self, etag: str) -> bool:
+        """Weak comparison against `If-None-Match`, as required for conditional GET."""
+        if self.if_none_match is None:
+            return False
+        candidates = {candidate.strip().removeprefix("W/") for candidate in self.if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+
+
+_conditional: ContextVar[_ConditionalRequest | None] = ContextVar("proxy_conditional", default=None)
+
+
+def record_etag(etag: str) -> None:
+    """Record the etag of upstream data used to answer the current request. Uncached data has an empty etag."""
+    if (conditional := _conditional.get()) is not None:
+        conditional.etags.append(etag)
+
+
+def response_etag() -> str | None:
+    """Etag of the response to the current request, or None if it is not built from cached upstream data only."""
+    conditional = _conditional.get()
+    return conditional.etag if conditional is not None else None
+
+
+def set_encoded_body(body: EncodedBody) -> None:
+    """Provide the encoded response body, so that a precompressed copy can be sent."""
+    if (conditional := _conditional.get()) is not None:
+        conditional.body = body
+
+
+async def track_etags(request: Request[Any, Any, Any]) -> None:
+    """`before_request` hook - start recording the etags of the upstream data a GET request uses."""
+    conditional = None
+    if request.method in ("GET", "HEAD"):
+        conditional = _ConditionalRequest(
+            request.scope,
+            if_none_match=request.headers.get("if-none-match"),
+            accepts_gzip="gzip" in request.headers.get("accept-encoding", ""),
+        )
+    _conditional.set(conditional)
+
+
+async def add_etag(response: Response[Any]) -> Response[Any]:
+    """`after_request` hook - tag a response built from cached upstream data with a strong etag.
+
+    The etag is derived from the etags of the cache entries the response was built from, so it is
+    known without encoding the response. Requests whose `If-None-Match` matches get an empty
+    `304 Not Modified`. Responses with a precompressed body are sent as is to clients accepting gzip.
+    """
+    conditional = _conditional.get()
+    if conditional is None or (digest := conditional.etag) is None or response.status_code != HTTP_200_OK:
+        return response
+    etag = f'"{digest}"'
+    if conditional.matches(etag):
+        return Response(content=None, status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if conditional.accepts_gzip and conditional.body is not None and conditional.body.gzip is not None:
+        response.content = conditional.body.gzip
+        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+        # Keep the compression middleware from compressing the body again
+        scope_state = ScopeState.from_scope(conditional.scope)
+        scope_state.is_cached = True
+        scope_state.response_compressed = True
+    return response
@@ -1,20 +1,34 @@
 # helpers.py
 
-from typing import TYPE_CHECKING, Any, Literal, Self, cast
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from functools import cache
+from typing import Any, Literal, Self, TypeVar, cast
 
 import aiohttp
+import msgspec
 from aiohttp import ClientResponse as Response
-from aiohttp.web_exceptions import HTTPError
 
-if TYPE_CHECKING:
-    from src.controller.proxy.schema import Group
+from src.controller.proxy.schema import Envelope, GroupsRow
 
 __all__ = (
     "Paginator",
     "ParamsBuilder",
     "ResponseParser",
+    "SingleFlight",
+    "fan_out",
 )
 
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class _Status(msgspec.Struct):
+    status: str = "unsuccessful"
+
+
+_status_decoder = msgspec.json.Decoder(_Status)
+
 
 class ParamsBuilder:
     def __init__(self, **kwargs: Any):
@@ -23,6 +37,12 @@ class ParamsBuilder:
         if not self._params:
             raise ValueError("Params must have at least one search criteria")
 
+    def copy(self) -> "ParamsBuilder":
+        return ParamsBuilder(**self._params)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._params.get(key, default)
+
     def set(self, key: str, value: Any) -> None:
         self._params[key] = value
 
@@ -35,51 +55,66 @@ class ParamsBuilder:
     def params(self) -> str:
         return "&".join(f"{k}={v}" for k, v in self._params.items())
 
+    @property
+    def key(self) -> str:
+        """Canonical form of the params - identical queries map to the same key regardless of insertion order."""
+        return "&".join(f"{k}={v}" for k, v in sorted(self._params.items()))
 
-class ResponseParser:
-    ignore_fields = [
-        "attr:rownumber",
-        "DISCOVERY_EXPERIENCE_GLOBAL",
-        "DISCOVERY_EXPERIENCE–COMMUNITY",  # noqa: RUF001
-        "DISCOVERY_EXPERIENCE–WORKING",  # noqa: RUF001
-        "FIELD_OF_EDUCATION",
-        "ISLOP",
-        "SSR_HECS_BAND_ID",
-    ]
 
+class ResponseParser:
     def __init__(self, data: Any, num_rows: int, total_rows: int) -> None:
         self.data = data
         self.num_rows = num_rows
         self.total_rows = total_rows
 
-    @classmethod
-    async def _extract_query(cls, response: Response) -> Any:
-        # Validate
-        try:
-            response.raise_for_status()
-        except HTTPError as e:
-            raise e
+    @staticmethod
+    @cache
+    def _decoder(response_dto: Any, extractor: Literal["rows", "groups"]) -> msgspec.json.Decoder[Envelope[Any]]:
+        match extractor:
+            case "rows":
+                return msgspec.json.Decoder(Envelope[response_dto])  # type: ignore[valid-type]
+            case "groups":
+                return msgspec.json.Decoder(Envelope[GroupsRow])
+            case _:
+                raise ValueError(f"Invalid extractor: {extractor}")
 
-        body: dict[str, Any] = await response.json()
-        status = body.get("status", "unsuccessful")
-        if status != "success":
-            raise Exception("Server response with unsuccessful query")
+    @classmethod
+    def decode(
+        cls,
+        body: bytes,
+        response_dto: Any,
+        extractor: Literal["rows", "groups"] = "rows",
+    ) -> "ResponseParser":
+        """Decode a raw response body in one pass.
 
-        # Extract query data
-        data: dict[str, Any] = body.get("data", {})
-        return data.get("query", {})
+        Rows are decoded straight into `response_dto` instances. Fields that `response_dto`
+        does not declare are skipped by the decoder.
 
-    @classmethod
-    async def _extract_rows(cls, response: Response) -> Any:
-        query = await cls._extract_query(response)
-        return query.get("rows", [])
+        Args:
+            body (bytes): raw response body
+            response_dto (Any): struct type of each row. Ignored for the `groups` extractor which always yields `Group`
+            extractor (Literal["rows", "groups"], optional): how to extract rows from the response. Defaults to "rows".
 
-    @classmethod
-    async def _extract_groups(cls, response: Response) -> Any:
-        rows = await cls._extract_rows(response)
-        if rows:
-            return cast(list["Group"], rows[0].get("groups", []))
-        return []
+        Returns:
+            ResponseParser: parsed rows and row counts
+        """
+        try:
+            envelope = cls._decoder(response_dto, extractor).decode(body)
+        except msgspec.ValidationError:
+            # Unsuccessful responses do not necessarily follow the row schema
+            if _status_decoder.decode(body).status != "success":
+                raise Exception("Server response with unsuccessful query") from None
+            raise
+        if envelope.status != "success":
+            raise Exception("Server response with unsuccessful query")
+        query = envelope.data.query
+        if extractor == "groups":
+            data = query.rows[0].groups if query.rows else []
+            total_rows = 1
+        else:
+            data = query.rows
+            total_rows = query.total_rows
+        return cls(data=data, num_rows=len(data), total_rows=total_rows)
 
     @classmethod
     async def parse(
@@ -88,55 +123,160 @@ class ResponseParser:
         response_dto: Any,
         extractor: Literal["rows", "groups"] = "rows",
     ) -> "ResponseParser":
-        match extractor:
-            case "rows":
-                query = await cls._extract_query(response)
-                total_rows = query.get("total_rows", -1)
-                data = query.get("rows", [])
-            case "groups":
-                data = await cls._extract_groups(response)
-                total_rows = 1
-            case _:
-                raise ValueError(f"Invalid extractor: {extractor}")
-        rows = []
-        for row in data:
-            rows.append(response_dto(**{k: v for k, v in row.items() if k not in cls.ignore_fields}))
-        num_rows = len(rows)
-
-        return cls(data=rows, num_rows=num_rows, total_rows=total_rows)
+        response.raise_for_status()
+        return cls.decode(await response.read(), response_dto, extractor)
 
 
 class Paginator:
+    page_key = "pagenbr"
+    """Query param holding the 1-based page number."""
+
     def __init__(
         self,
+        client: aiohttp.ClientSession,
         end_point: str,
         params: ParamsBuilder,
         response_dto: Any,
         page_size: int = 25,
+        prefetch: int = 0,
+        fetch: Callable[[ParamsBuilder], Awaitable[ResponseParser]] | None = None,
     ):
+        """Iterate over the pages of a query.
+
+        Pages are yielded in order. With `prefetch` set, the total row count returned with the
+        first page is used to fetch up to `prefetch` of the following pages concurrently, so that
+        each page is usually ready by the time it is requested.
+
+        Args:
+            client (aiohttp.ClientSession): upstream client
+            end_point (str): upstream url
+            params (ParamsBuilder): query params - the page number is set per page
+            response_dto (Any): struct type of each row
+            page_size (int, optional): rows per page. Defaults to 25.
+            prefetch (int, optional): max number of pages fetched ahead of the consumer. Defaults to 0 - pages are
+            fetched one after another.
+            fetch (Callable[[ParamsBuilder], Awaitable[ResponseParser]] | None, optional): fetches the page with the
+            given params, e.g. through rate limiting and retries. Defaults to None - a plain GET through `client`.
+        """
+        self.client = client
         self.end_point = end_point
         self.params = params
         self.page_size = page_size
         self.dto = response_dto
-        self.page_number = 0
-        self._has_next = True
+        self.prefetch = prefetch
+        self.fetch = fetch
+        self.page_number = 1
+        self._last_page: int | None = None
+        self._pending: dict[int, asyncio.Task[ResponseParser]] = {}
 
-    async def __aiter__(self) -> Self:
-        self.page_number = 0
-        self._has_next = True
+    def __aiter__(self) -> Self:
+        self._cancel_pending()
+        self.page_number = 1
+        self._last_page = None
         return self
 
     async def __anext__(self) -> ResponseParser:
-        if self._has_next:
-            self.params.set("page_number", self.page_number)
-            async with aiohttp.ClientSession() as client:
-                raw_response = await client.get(self.end_point, params=self.params.params)
-            response = await ResponseParser.parse(raw_response, self.dto)
-            self.page_number += 1
-            if (
-                response.total_rows == -1
-                or response.total_rows <= (self.page_number - 1) * self.page_size + response.num_rows
-            ):
-                self._has_next = False
-            return response
-        raise StopIteration
+        if self._last_page is not None and self.page_number > self._last_page:
+            raise StopAsyncIteration
+        task = self._pending.pop(self.page_number, None)
+        response = await task if task is not None else await self._fetch(self.page_number)
+        if self._last_page is None:
+            self._last_page = self._count_pages(response)
+        self.page_number += 1
+        self._schedule()
+        return response
+
+    async def aclose(self) -> None:
+        """Cancel pages that were fetched ahead but not consumed."""
+        self._cancel_pending()
+
+    def _count_pages(self, response: ResponseParser) -> int:
+        if response.total_rows == -1 or response.num_rows == 0:
+            return self.page_number
+        return max(self.page_number, -(-response.total_rows // self.page_size))
+
+    def _schedule(self) -> None:
+        if not self.prefetch or self._last_page is None:
+            return
+        for page_number in range(self.page_number, min(self._last_page, self.page_number + self.prefetch - 1) + 1):
+            if page_number not in self._pending:
+                self._pending[page_number] = asyncio.ensure_future(self._fetch(page_number))
+
+    def _cancel_pending(self) -> None:
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+
+    async def _fetch(self, page_number: int) -> ResponseParser:
+        params = self.params.copy()
+        params.set(self.page_key, page_number)
+        if self.fetch is not None:
+            return await self.fetch(params)
+        async with self.client.get(self.end_point, params=params.params) as raw_response:
+            return await ResponseParser.parse(raw_response, self.dto)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single call.
+
+    The first caller for a key starts the call. Callers arriving while it is in flight await
+    the same result instead of starting their own. The call runs in its own task so that a
+    cancelled caller does not cancel it for everyone else.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: dict[Hashable, asyncio.Task[Any]] = {}
+        self.calls = 0
+        """Number of calls that were started."""
+        self.coalesced = 0
+        """Number of calls that were served by a call already in flight."""
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        return cast(T, await asyncio.shield(task))
+
+    async def close(self) -> None:
+        """Cancel the calls in flight and wait for them to finish."""
+        tasks = list(self._in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _forget(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+async def fan_out(fn: Callable[[K], Awaitable[T]], keys: Iterable[K], limit: int) -> dict[K, T | Exception]:
+    """Call `fn` once per distinct key with at most `limit` calls in flight.
+
+    Args:
+        fn (Callable[[K], Awaitable[T]]): call to make for each key
+        keys (Iterable[K]): keys - duplicates are only called once
+        limit (int): max number of concurrent calls
+
+    Returns:
+        dict[K, T | Exception]: result or raised exception per key, in the order keys were first seen
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def call(key: K) -> T | Exception:
+        async with semaphore:
+            try:
+                return await fn(key)
+            except Exception as e:  # noqa: BLE001
+                return e
+
+    unique_keys = list(dict.fromkeys(keys))
+    results = await asyncio.gather(*(call(key) for key in unique_keys))
+    return dict(zip(unique_keys, results, strict=True))
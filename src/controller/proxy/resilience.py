@@ -0,0 +1,341 @@
+# resilience.py
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Literal, TypeVar
+
+import aiohttp
+import msgspec
+from litestar.exceptions import ServiceUnavailableException
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable
+
+    from src.config.base import ProxySettings
+
+__all__ = (
+    "AdaptiveLimiter",
+    "CircuitBreaker",
+    "LatencyWindow",
+    "RetryPolicy",
+    "TokenBucket",
+    "UpstreamGuard",
+    "UpstreamUnavailableException",
+    "hedge",
+    "is_upstream_failure",
+)
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailableException(ServiceUnavailableException):
+    """Upstream query was not attempted because courseplanner-api is unhealthy or overloaded."""
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Whether an exception indicates an unhealthy upstream rather than a bad query.
+
+    Connection errors, timeouts, 429 and 5xx responses count as failures. Other 4xx responses do not.
+    """
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, aiohttp.ClientError | asyncio.TimeoutError)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        """Limit the rate of upstream requests.
+
+        Args:
+            rate (float): tokens added per second. A rate of 0 disables the limit.
+            burst (int): max number of tokens, i.e. requests that may start at once after an idle period
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it. Waiters are served in arrival order."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AdaptiveLimiter:
+    def __init__(self, min_limit: int, max_limit: int, latency_target: float, backoff: float = 0.5) -> None:
+        """Limit the number of upstream requests in flight, adapting the limit AIMD style.
+
+        The limit grows by one for every `limit` requests that succeed within `latency_target`, and is
+        multiplied by `backoff` when a request fails or is slower than `latency_target`. Only requests
+        started after the last decrease can decrease it again, so that a burst of failures from the
+        same brownout backs off once rather than collapsing the limit to `min_limit`.
+
+        Args:
+            min_limit (int): lower bound of the limit
+            max_limit (int): upper bound of the limit and initial limit
+            latency_target (float): time in seconds above which a successful request counts as congestion
+            backoff (float, optional): multiplicative decrease factor. Defaults to 0.5.
+        """
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._decreased_at = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        """Wait for a free slot and take it.
+
+        Returns:
+            float: start time to pass to `release`
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, started_at: float, ok: bool | None) -> None:
+        """Free a slot and adapt the limit to the outcome of the request.
+
+        Args:
+            started_at (float): value returned by `acquire`
+            ok (bool | None): whether the request succeeded. None keeps the limit, e.g. for cancelled requests.
+        """
+        now = time.monotonic()
+        if ok and now - started_at <= self.latency_target:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        elif ok is not None and started_at >= self._decreased_at:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._decreased_at = now
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """Fail fast while upstream is unhealthy.
+
+        The circuit opens after `failure_threshold` consecutive failures and rejects every request for
+        `reset_timeout` seconds. It then lets a single probe request through: success closes the
+        circuit, failure opens it again.
+
+        Args:
+            failure_threshold (int): consecutive failures that open the circuit. 0 disables the breaker.
+            reset_timeout (float): time in seconds the circuit stays open before probing upstream
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opens = 0
+        """Number of times the circuit opened."""
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> Literal["closed", "open", "half_open"]:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    @property
+    def probing(self) -> bool:
+        """Whether the probe of the half open state is claimed."""
+        return self._probing
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now.
+
+        A `True` result in the half open state claims the probe, which only `record(ok, probe=True)` or
+        `release_probe` settle.
+        """
+        match self.state:
+            case "closed":
+                return True
+            case "half_open" if not self._probing:
+                self._probing = True
+                return True
+            case _:
+                return False
+
+    def release_probe(self) -> None:
+        """Give up a claimed probe without recording an outcome."""
+        self._probing = False
+
+    def record(self, ok: bool, probe: bool = False) -> None:
+        """Record the outcome of a request.
+
+        Args:
+            ok (bool): whether upstream answered
+            probe (bool, optional): whether the request claimed the probe. Defaults to False.
+        """
+        if probe:
+            self._probing = False
+        elif self._opened_at is not None:
+            # Late outcome of a request sent before the circuit opened - only the probe settles an open circuit
+            return
+        if ok:
+            self.failures = 0
+            self._opened_at = None
+            return
+        self.failures += 1
+        if self._opened_at is not None or (self.failure_threshold and self.failures >= self.failure_threshold):
+            if self._opened_at is None:
+                self.opens += 1
+            self._opened_at = time.monotonic()
+
+
+class UpstreamGuard:
+    def __init__(self, config: ProxySettings) -> None:
+        """Protect courseplanner-api with a rate limit, an adaptive concurrency limit and a circuit breaker.
+
+        Args:
+            config (ProxySettings): limiter and breaker settings
+        """
+        self.bucket = TokenBucket(rate=config.RATE_LIMIT, burst=config.RATE_LIMIT_BURST)
+        self.limiter = AdaptiveLimiter(
+            min_limit=config.CONCURRENCY_MIN,
+            max_limit=config.CONCURRENCY_MAX,
+            latency_target=config.LATENCY_TARGET,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=config.BREAKER_RESET_TIMEOUT,
+        )
+        self.queue_timeout = config.QUEUE_TIMEOUT
+        self.rejected = 0
+        """Number of requests rejected by the circuit breaker or after waiting `QUEUE_TIMEOUT`."""
+
+    @asynccontextmanager
+    async def __call__(self) -> AsyncIterator[None]:
+        """Hold an upstream slot for the duration of the block and record its outcome.
+
+        Raises:
+            UpstreamUnavailableException: if the circuit is open or no slot frees up within `QUEUE_TIMEOUT`
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise UpstreamUnavailableException(detail="courseplanner-api is unavailable")
+        # Only a request allowed while the probe is claimed can hold it, as it was free before `allow`
+        probe = self.breaker.probing
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self.bucket.acquire()
+                started_at = await self.limiter.acquire()
+        except TimeoutError:
+            self.rejected += 1
+            if probe:
+                self.breaker.release_probe()
+            raise UpstreamUnavailableException(detail="courseplanner-api is overloaded") from None
+        try:
+            yield
+        except asyncio.CancelledError:
+            await self.limiter.release(started_at, ok=None)
+            if probe:
+                self.breaker.release_probe()
+            raise
+        except Exception as e:
+            ok = not is_upstream_failure(e)
+            await self.limiter.release(started_at, ok)
+            self.breaker.record(ok, probe)
+            raise
+        await self.limiter.release(started_at, ok=True)
+        self.breaker.record(ok=True, probe=probe)
+
+
+class RetryPolicy(msgspec.Struct, frozen=True, kw_only=True):
+    """How an idempotent upstream query is retried."""
+
+    attempts: int = 3
+    """Max number of attempts, including the first."""
+    base_delay: float = 0.1
+    """Time in seconds of the first backoff. Each retry doubles it."""
+    max_delay: float = 2.0
+    """Max time in seconds of a single backoff."""
+    deadline: float = 10.0
+    """Max total time in seconds spent on all attempts and backoffs."""
+    hedge: bool = True
+    """Send a second attempt when the first is slower than the observed p95 latency."""
+
+    def backoff(self, retry: int) -> float:
+        """Full jitter exponential backoff before the `retry`-th retry, counting from 1."""
+        # Jitter only spreads retries out in time, it is not used for security
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))  # noqa: S311
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 256, min_samples: int = 20) -> None:
+        """Latencies of the most recent successful upstream calls of a target.
+
+        Args:
+            size (int, optional): number of latencies kept. Defaults to 256.
+            min_samples (int, optional): samples required before quantiles are reported. Defaults to 20.
+        """
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def quantile(self, q: float) -> float | None:
+        """Latency below which a fraction `q` of the recent calls completed, or None with too few samples."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def hedge(
+    fn: Callable[[], Awaitable[T]], delay: float | None, on_hedge: Callable[[], None] | None = None
+) -> tuple[T, bool]:
+    """Call `fn`, and call it a second time if the first call takes longer than `delay`.
+
+    The first call to succeed wins and the other is cancelled. If one call fails, the result of the
+    other is awaited.
+
+    Args:
+        fn (Callable[[], Awaitable[T]]): call to hedge
+        delay (float | None): time in seconds before the hedged call is sent. None disables hedging.
+        on_hedge (Callable[[], None] | None, optional): called when the hedged call is sent. Defaults to None.
+
+    Returns:
+        tuple[T, bool]: result, and whether the hedged call won
+    """
+    primary = asyncio.ensure_future(fn())
+    tasks = {primary}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tasks.add(asyncio.ensure_future(fn()))
+                if on_hedge is not None:
+                    on_hedge()
+        while True:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tasks.discard(task)
+                if task.exception() is None or not tasks:
+                    return task.result(), task is not primary
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,17 +1,41 @@
 from collections.abc import Sequence
 
-from litestar import Controller, get
+from litestar import Controller, Response, get, post
+from litestar.datastructures import State
+from litestar.di import Provide
+from litestar.status_codes import HTTP_200_OK, HTTP_503_SERVICE_UNAVAILABLE
 
+from src.config.constants import PROXY_WARMUP_STATE_KEY
+from src.controller.catalogue.dependencies import (
+    provide_mirror_course_detail_service,
+    provide_mirror_course_offering_service,
+)
+from src.controller.catalogue.services import CourseDetailService, CourseOfferingService
+from src.controller.proxy.dependencies import provide_proxy_service
+from src.controller.proxy.etag import add_etag, track_etags
 from src.controller.proxy.schema import (
     Campus,
+    CampusDTO,
     Career,
+    CareerDTO,
+    CourseClassListBatchDTO,
+    CourseClassListBatchItem,
     CourseClassListDTO,
+    CourseClassListKey,
     CourseDetail,
+    CourseDetailBatchDTO,
+    CourseDetailBatchItem,
     CourseDetailDTO,
+    CourseDetailKey,
     CourseSearch,
+    CourseSearchDTO,
     Group,
+    ProxyStats,
+    ReadinessStatus,
     Subject,
+    SubjectDTO,
     Term,
+    TermDTO,
 )
 from src.controller.proxy.services import ProxyQueryService
 from src.controller.proxy.urls import ProxyURL
@@ -23,9 +47,16 @@ class ProxyController(Controller):
     """Proxy Controller"""
 
     tags = ["Proxy Controller"]
+    dependencies = {
+        "proxy_service": Provide(provide_proxy_service, sync_to_thread=False),
+        "course_offering_service": Provide(provide_mirror_course_offering_service),
+        "course_detail_service": Provide(provide_mirror_course_detail_service),
+    }
     dto = None
     return_dto = None
     exclude_from_auth = True
+    before_request = staticmethod(track_etags)
+    after_request = staticmethod(add_etag)
 
     @get(
         operation_id="GetCampusInfo",
@@ -34,10 +65,10 @@ class ProxyController(Controller):
         description="Get Campus Information",
         path=ProxyURL.CAMPUS.value,
         exclude_from_auth=True,
-        cache=True,
+        return_dto=CampusDTO,
     )
-    async def get_campus_info(self) -> Sequence[Campus]:
-        return await ProxyQueryService.campus()
+    async def get_campus_info(self, proxy_service: ProxyQueryService) -> Sequence[Campus]:
+        return await proxy_service.campus()
 
     @get(
         operation_id="GetAcademicLevelInfo",
@@ -46,10 +77,10 @@ class ProxyController(Controller):
         description="Get Academic Level Info",
         path=ProxyURL.ACADEMIC_CAREER.value,
         exclude_from_auth=True,
-        cache=True,
+        return_dto=CareerDTO,
     )
-    async def get_academic_career_info(self) -> Sequence[Career]:
-        return await ProxyQueryService.academic_career()
+    async def get_academic_career_info(self, proxy_service: ProxyQueryService) -> Sequence[Career]:
+        return await proxy_service.academic_career()
 
     @get(
         operation_id="GetTermInfo",
@@ -58,10 +89,10 @@ class ProxyController(Controller):
         description="Get Term Info",
         path=ProxyURL.TERM.value,
         exclude_from_auth=True,
-        cache=True,
+        return_dto=TermDTO,
     )
-    async def get_term_info(self) -> Sequence[Term]:
-        return await ProxyQueryService.term()
+    async def get_term_info(self, proxy_service: ProxyQueryService) -> Sequence[Term]:
+        return await proxy_service.term()
 
     @get(
         operation_id="GetSubjectInfo",
@@ -70,10 +101,10 @@ class ProxyController(Controller):
         description="Get Subject Info",
         path=ProxyURL.SUBJECT.value,
         exclude_from_auth=True,
-        cache=True,
+        return_dto=SubjectDTO,
     )
-    async def get_subject_info(self) -> Sequence[Subject]:
-        return await ProxyQueryService.subjects()
+    async def get_subject_info(self, proxy_service: ProxyQueryService) -> Sequence[Subject]:
+        return await proxy_service.subjects()
 
     @get(
         operation_id="GetCourseInfo",
@@ -82,10 +113,12 @@ class ProxyController(Controller):
         description="Get Course Info",
         path=ProxyURL.COURSE.value,
         exclude_from_auth=True,
-        cache=True,
+        return_dto=CourseSearchDTO,
     )
     async def get_course_info(
         self,
+        proxy_service: ProxyQueryService,
+        course_offering_service: CourseOfferingService | None,
         course_title: str | None = None,
         subject_areas: str | None = None,
         catalogue_number: int | None = None,
@@ -97,7 +130,20 @@ class ProxyController(Controller):
         page_number: int = 1,
         page_size: int = 25,
     ) -> Sequence[CourseSearch]:
-        return await ProxyQueryService.course(
+        if course_offering_service is not None:
+            return await course_offering_service.search(
+                course_title=course_title,
+                subject_areas=subject_areas,
+                catalogue_number=catalogue_number,
+                class_number=class_number,
+                year=year,
+                term=term,
+                academic_career=academic_career,
+                campus=campus,
+                page_number=page_number,
+                page_size=page_size,
+            )
+        return await proxy_service.course(
             course_title=course_title,
             subject_areas=subject_areas,
             catalogue_number=catalogue_number,
@@ -117,20 +163,45 @@ class ProxyController(Controller):
         description="Get Course Detail",
         path=ProxyURL.COURSE_DETAIL.value,
         exclude_from_auth=True,
-        dto=CourseDetailDTO,
-        cache=True,
+        return_dto=CourseDetailDTO,
     )
     async def get_course_detail(
         self,
+        proxy_service: ProxyQueryService,
+        course_detail_service: CourseDetailService | None,
         course_id: str,
         course_offer_number: int,
         term: int,
         year: int = 2024,
     ) -> CourseDetail:
-        return await ProxyQueryService.course_detail(
+        if course_detail_service is not None:
+            detail = await course_detail_service.get_detail(
+                course_id=course_id, course_offer_number=course_offer_number, term=term, year=year
+            )
+            # Courses missing from the mirror are looked up upstream
+            if detail is not None:
+                return detail
+        return await proxy_service.course_detail(
             course_id=course_id, course_offer_number=course_offer_number, term=term, year=year
         )
 
+    @post(
+        operation_id="GetCourseDetailBatch",
+        name="proxy:courseDetailBatch",
+        summary="Get Course Detail Batch",
+        description="Get details of several courses in one request. Errors are reported per course",
+        path=ProxyURL.COURSE_DETAIL_BATCH.value,
+        exclude_from_auth=True,
+        return_dto=CourseDetailBatchDTO,
+        status_code=200,
+    )
+    async def get_course_detail_batch(
+        self,
+        proxy_service: ProxyQueryService,
+        data: list[CourseDetailKey],
+    ) -> list[CourseDetailBatchItem]:
+        return await proxy_service.course_detail_batch(data)
+
     @get(
         operation_id="GetCourseClassList",
         name="proxy:courseClassList",
@@ -138,19 +209,61 @@ class ProxyController(Controller):
         description="Get Course ClassList",
         path=ProxyURL.COURSE_CLASS_LIST.value,
         exclude_from_auth=True,
-        dto=CourseClassListDTO,
-        cache=True,
+        return_dto=CourseClassListDTO,
     )
     async def get_course_class_list(
         self,
+        proxy_service: ProxyQueryService,
         course_id: str,
         course_offer_number: int,
         term: int,
         session: int = 1,
     ) -> Sequence[Group]:
-        return await ProxyQueryService.course_class_list(
+        return await proxy_service.course_class_list(
             course_id=course_id,
             course_offer_number=course_offer_number,
             term=term,
             session=session,
         )
+
+    @post(
+        operation_id="GetCourseClassListBatch",
+        name="proxy:courseClassListBatch",
+        summary="Get Course ClassList Batch",
+        description="Get class lists of several courses in one request. Errors are reported per course",
+        path=ProxyURL.COURSE_CLASS_LIST_BATCH.value,
+        exclude_from_auth=True,
+        return_dto=CourseClassListBatchDTO,
+        status_code=200,
+    )
+    async def get_course_class_list_batch(
+        self,
+        proxy_service: ProxyQueryService,
+        data: list[CourseClassListKey],
+    ) -> list[CourseClassListBatchItem]:
+        return await proxy_service.course_class_list_batch(data)
+
+    @get(
+        operation_id="GetProxyStats",
+        name="proxy:stats",
+        summary="Get Proxy Stats",
+        description="Get upstream call counters of this worker",
+        path=ProxyURL.STATS.value,
+        exclude_from_auth=True,
+    )
+    async def get_proxy_stats(self, proxy_service: ProxyQueryService) -> ProxyStats:
+        return proxy_service.stats()
+
+    @get(
+        operation_id="GetProxyReadiness",
+        name="proxy:ready",
+        summary="Get Proxy Readiness",
+        description="Whether the reference data caches of this worker are warm. Responds 503 until they are.",
+        path=ProxyURL.READY.value,
+        exclude_from_auth=True,
+    )
+    async def get_readiness(self, state: State) -> Response[ReadinessStatus]:
+        warmup = state.get(PROXY_WARMUP_STATE_KEY)
+        # Without the warm-up lifespan there is nothing to wait for
+        status = ReadinessStatus(ready=True) if warmup is None else warmup.status
+        return Response(status, status_code=HTTP_200_OK if status.ready else HTTP_503_SERVICE_UNAVAILABLE)
@@ -1,54 +1,149 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING, Generic, Literal, TypeVar, cast
+
 from litestar.dto.config import DTOConfig
 from litestar.dto.msgspec_dto import MsgspecDTO
+from litestar.serialization import encode_json, get_serializer
 from msgspec import Struct, field
 
+from src.config.constants import PROXY_SERVICE_STATE_KEY
+
+from .etag import response_etag, set_encoded_body
+
+if TYPE_CHECKING:
+    from collections.abc import Collection
+
+    from litestar.types.serialization import LitestarEncodableType
+
+    from .services import ProxyQueryService
+
 __all__ = (
     "Campus",
+    "CampusDTO",
     "Career",
+    "CareerDTO",
     "ClassInfo",
+    "CourseClassListBatchDTO",
+    "CourseClassListBatchItem",
     "CourseClassListDTO",
+    "CourseClassListKey",
     "CourseDetail",
+    "CourseDetailBatchDTO",
+    "CourseDetailBatchItem",
     "CourseDetailDTO",
+    "CourseDetailKey",
     "CourseSearch",
+    "CourseSearchDTO",
     "CriticalDates",
+    "Data",
+    "EncodedMsgspecDTO",
+    "Envelope",
     "Group",
+    "GroupsRow",
     "Meetings",
+    "ProxyStats",
+    "Query",
+    "ReadinessStatus",
     "Subject",
+    "SubjectDTO",
     "Term",
+    "TermDTO",
     "lower_camel",
 )
 
+T = TypeVar("T")
+StructT = TypeVar("StructT", bound=Struct)
+
 
 def lower_camel(word: str) -> str:
     word = word.lower()
     return word.split("_")[0] + "".join(x.capitalize() or "_" for x in word.split("_")[1:])
 
 
-class Career(Struct, rename=lower_camel):
-    FIELDVALUE: str = field(name="value")
-    XLATLONGNAME: str = field(name="name")
+class EncodedMsgspecDTO(MsgspecDTO[StructT]):
+    """DTO that caches the encoded response body per route and etag of the upstream data it is built from.
+
+    A cache hit skips both the DTO transfer and JSON encoding. Responses that are not built from
+    cached upstream data only are transferred and encoded as usual.
+    """
+
+    def data_to_encodable_type(self, data: StructT | Collection[StructT]) -> LitestarEncodableType | bytes:
+        etag = response_etag()
+        proxy_service = cast("ProxyQueryService | None", self.asgi_connection.app.state.get(PROXY_SERVICE_STATE_KEY))
+        if etag is None or proxy_service is None:
+            return super().data_to_encodable_type(data)
+        route_handler = self.asgi_connection.route_handler
+        key = f"{route_handler.handler_id}:{etag}"
+        body = proxy_service.responses.get(key)
+        if body is None:
+            encodable = super().data_to_encodable_type(data)
+            serializer = get_serializer(route_handler.resolve_type_encoders())
+            body = proxy_service.responses.set(key, encode_json(encodable, serializer))
+        set_encoded_body(body)
+        return body.json
+
+
+# Upstream structs keep the field names used by courseplanner-api so that response bodies decode
+# straight into them. Renaming for our own API happens in the DTOs.
+
+
+class Query(Struct, Generic[T]):
+    rows: list[T] = field(default_factory=list)
+    num_rows: int = 0
+    total_rows: int = -1
 
 
-class Campus(Struct, rename=lower_camel):
+class Data(Struct, Generic[T]):
+    query: Query[T] = field(default_factory=Query)
+
+
+class Envelope(Struct, Generic[T]):
+    """Body of a courseplanner-api response"""
+
+    status: str = "unsuccessful"
+    data: Data[T] = field(default_factory=Data)
+
+
+class Career(Struct):
+    FIELDVALUE: str
+    XLATLONGNAME: str
+
+
+class CareerDTO(EncodedMsgspecDTO[Career]):
+    config = DTOConfig(rename_fields={"FIELDVALUE": "value", "XLATLONGNAME": "name"})
+
+
+class Campus(Struct):
     CAMPUS: str
     DESCR: str
 
 
-class Subject(Struct, rename=lower_camel):
+class CampusDTO(EncodedMsgspecDTO[Campus]):
+    config = DTOConfig(rename_strategy=lower_camel)
+
+
+class Subject(Struct):
     SUBJECT: str
     DESCR: str
 
 
-class Term(Struct, rename=lower_camel):
+class SubjectDTO(EncodedMsgspecDTO[Subject]):
+    config = DTOConfig(rename_strategy=lower_camel)
+
+
+class Term(Struct):
     TERM: str
     DESCR: str
     ACAD_YEAR: str
     CURRENT: str
 
 
-class CourseSearch(Struct, rename=lower_camel):
+class TermDTO(EncodedMsgspecDTO[Term]):
+    config = DTOConfig(rename_strategy=lower_camel)
+
+
+class CourseSearch(Struct):
     ACAD_CAREER: str
     ACAD_CAREER_DESCR: str
     CAMPUS: str
@@ -64,7 +159,11 @@ class CourseSearch(Struct, rename=lower_camel):
     UNITS: str
 
 
-class CriticalDates(Struct, rename=lower_camel):
+class CourseSearchDTO(EncodedMsgspecDTO[CourseSearch]):
+    config = DTOConfig(rename_strategy=lower_camel)
+
+
+class CriticalDates(Struct):
     CENSUS_DT: str
     LAST_DAY: str
     LAST_DAY_TO_WF: str
@@ -94,10 +193,30 @@ class CourseDetail(CourseSearch):
     URL: str
 
 
-class CourseDetailDTO(MsgspecDTO[CourseDetail]):
+class CourseDetailDTO(EncodedMsgspecDTO[CourseDetail]):
     config = DTOConfig(rename_strategy=lower_camel)
 
 
+class CourseDetailKey(Struct, frozen=True, rename=lower_camel):
+    course_id: str
+    course_offer_number: int
+    term: int
+    year: int = 2024
+
+
+class CourseDetailBatchItem(Struct):
+    course_id: str
+    course_offer_number: int
+    term: int
+    year: int
+    detail: CourseDetail | None = None
+    error: str | None = None
+
+
+class CourseDetailBatchDTO(MsgspecDTO[CourseDetailBatchItem]):
+    config = DTOConfig(rename_strategy=lower_camel, max_nested_depth=3)
+
+
 class Meetings(Struct):
     dates: str
     days: str
@@ -122,5 +241,70 @@ class Group(Struct):
     classes: list[ClassInfo]
 
 
-class CourseClassListDTO(MsgspecDTO[Group]):
+class CourseClassListDTO(EncodedMsgspecDTO[Group]):
     config = DTOConfig(rename_strategy=lower_camel)
+
+
+class CourseClassListKey(Struct, frozen=True, rename=lower_camel):
+    course_id: str
+    course_offer_number: int
+    term: int
+    session: int = 1
+
+
+class CourseClassListBatchItem(Struct):
+    course_id: str
+    course_offer_number: int
+    term: int
+    session: int
+    groups: list[Group] = field(default_factory=list)
+    """Empty if the class list could not be retrieved"""
+    error: str | None = None
+
+
+class CourseClassListBatchDTO(MsgspecDTO[CourseClassListBatchItem]):
+    # Class lists are nested one level deeper than in `CourseClassListDTO`, and encoded the same
+    config = DTOConfig(rename_strategy=lower_camel, max_nested_depth=2)
+
+
+class GroupsRow(Struct):
+    groups: list[Group] = field(default_factory=list)
+
+
+class ProxyStats(Struct, rename=lower_camel):
+    upstream_calls: int
+    coalesced_calls: int
+    cache_hits: int
+    cache_store_hits: int
+    cache_misses: int
+    cache_entries: int
+    cache_bytes: int
+    response_cache_hits: int
+    response_cache_misses: int
+    response_cache_entries: int
+    response_cache_bytes: int
+    stale_hits: int
+    stale_errors: int
+    concurrency_limit: float
+    in_flight: int
+    rejected_calls: int
+    circuit_state: Literal["closed", "open", "half_open"]
+    circuit_opens: int
+    attempts: int
+    retries: int
+    hedged_calls: int
+    hedge_wins: int
+    latency_p95: dict[str, float]
+
+
+class ReadinessStatus(Struct, rename=lower_camel):
+    ready: bool
+    """Whether the reference data caches are warm"""
+    snapshot_entries: int = 0
+    """Number of cached queries loaded from the snapshot on startup"""
+    snapshot_saved_at: float | None = None
+    """Unix time the loaded snapshot was saved at"""
+    warmed_at: float | None = None
+    """Unix time the warm-up completed at"""
+    error: str | None = None
+    """Error of the last failed warm-up attempt, until warm-up succeeds"""
@@ -2,14 +2,23 @@
 
 from __future__ import annotations
 
-from collections.abc import Sequence
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Sequence
 from typing import Any, Literal, cast
 
 import aiohttp
+import msgspec
+from litestar.exceptions import NotFoundException, ValidationException
 
 import src.controller.proxy.schema as dto
+from src.config.app import compression
+from src.config.base import ProxySettings
 
-from .helpers import Paginator, ParamsBuilder, ResponseParser
+from .cache import CacheEntry, MemoryCache, ProxyCache, ResponseCache, create_store
+from .etag import record_etag
+from .helpers import Paginator, ParamsBuilder, ResponseParser, SingleFlight, fan_out
+from .resilience import LatencyWindow, RetryPolicy, UpstreamGuard, hedge, is_upstream_failure
 
 __all__ = ("ProxyQueryService",)
 
@@ -24,70 +33,317 @@ SUBJECT_TARGET = "/system/SUBJECTS_BY_YEAR/queryx"
 API_END_POINT = "https://courseplanner-api.adelaide.edu.au/api/course-planner-query/v1/"
 VIRTUAL = "Y"
 YEAR = 2024
+CACHE_TTL = {
+    CAMPUS_TARGET: 24 * 60 * 60,
+    CSP_ACAD_CAREER_TARGET: 24 * 60 * 60,
+    TERMS_TARGET: 6 * 60 * 60,
+    SUBJECT_TARGET: 6 * 60 * 60,
+    COURSE_SEARCH_TARGET: 60 * 60,
+    COURSE_DETAIL_TARGET: 60 * 60,
+    COURSE_CLASS_LIST_TARGET: 60,
+}
+"""Default cache time to live in seconds per upstream target. Class lists carry live seat counts."""
+RETRY_POLICY = {
+    CAMPUS_TARGET: RetryPolicy(),
+    CSP_ACAD_CAREER_TARGET: RetryPolicy(),
+    TERMS_TARGET: RetryPolicy(),
+    SUBJECT_TARGET: RetryPolicy(),
+    COURSE_SEARCH_TARGET: RetryPolicy(),
+    COURSE_DETAIL_TARGET: RetryPolicy(),
+    COURSE_CLASS_LIST_TARGET: RetryPolicy(attempts=2, deadline=5.0),
+}
+"""Default retry policy per upstream target. Every target is a read-only query and safe to retry.
+Class lists give up sooner - a stale seat count is more useful than a slow one."""
+HEDGE_QUANTILE = 0.95
+"""Latency quantile of a target after which a hedged attempt is sent."""
+
+
+def target_name(target: str) -> str:
+    """Name of an upstream target, e.g. `CAMPUS` for `/system/CAMPUS/queryx`."""
+    return target.split("/")[2]
 
 
 class ProxyQueryService:
-    @staticmethod
-    async def query(param_builder: ParamsBuilder, response_dto: Any, extractor: Literal["rows", "groups"] = "rows") -> Any:
-        async with aiohttp.ClientSession() as client:
-            raw_response = await client.get(
-                url=API_END_POINT,
-                params=param_builder.params,
+    def __init__(
+        self,
+        client: aiohttp.ClientSession,
+        config: ProxySettings | None = None,
+        cache: ProxyCache | None = None,
+    ) -> None:
+        """Query service for courseplanner-api.
+
+        Args:
+            client (aiohttp.ClientSession): shared upstream client. Its connection pool is reused by every query.
+            config (ProxySettings | None, optional): proxy settings. Defaults to settings read from the environment.
+            cache (ProxyCache | None, optional): cache for parsed upstream data. Defaults to a cache built from `config`.
+        """
+        self.client = client
+        self.config = config or ProxySettings()
+        self.cache = cache or ProxyCache(
+            memory=MemoryCache(max_entries=self.config.CACHE_MAX_ENTRIES, max_bytes=self.config.CACHE_MAX_BYTES),
+            store=create_store(self.config.CACHE_STORE_URL, max_bytes=self.config.CACHE_STORE_MAX_BYTES),
+        )
+        self.responses = ResponseCache(
+            max_entries=self.config.CACHE_MAX_ENTRIES,
+            max_bytes=self.config.RESPONSE_CACHE_MAX_BYTES,
+            gzip_min_size=compression.minimum_size if self.config.RESPONSE_CACHE_GZIP else None,
+        )
+        """Encoded response bodies, filled by `EncodedMsgspecDTO`."""
+        self.cache_ttl = {
+            target: cast(dict[str, int], self.config.CACHE_TTL).get(target_name(target), ttl)
+            for target, ttl in CACHE_TTL.items()
+        }
+        self.retry_policy = {
+            target: msgspec.structs.replace(
+                policy, **cast(dict[str, dict[str, Any]], self.config.RETRY_POLICY).get(target_name(target), {})
             )
-            result = await ResponseParser.parse(raw_response, response_dto, extractor=extractor)
-            return result.data
+            for target, policy in RETRY_POLICY.items()
+        }
+        self.latency = {target: LatencyWindow() for target in RETRY_POLICY}
+        self.single_flight = SingleFlight()
+        self.guard = UpstreamGuard(self.config)
+        self.attempts = 0
+        self.retries = 0
+        self.hedged_calls = 0
+        self.hedge_wins = 0
+        self.stale_hits = 0
+        self.stale_errors = 0
+        self._revalidating: dict[str, asyncio.Task[Any]] = {}
+
+    async def close(self) -> None:
+        """Cancel background revalidation and upstream calls in flight, and close the shared cache tier.
+
+        Call before closing the upstream client.
+        """
+        for task in self._revalidating.values():
+            task.cancel()
+        await asyncio.gather(*self._revalidating.values(), return_exceptions=True)
+        # Cancelling a revalidation only cancels its wait on the upstream call
+        await self.single_flight.close()
+        if self.cache.store is not None:
+            await self.cache.store.__aexit__(None, None, None)
+
+    def stats(self) -> dto.ProxyStats:
+        return dto.ProxyStats(
+            upstream_calls=self.single_flight.calls,
+            coalesced_calls=self.single_flight.coalesced,
+            cache_hits=self.cache.hits,
+            cache_store_hits=self.cache.store_hits,
+            cache_misses=self.cache.misses,
+            cache_entries=len(self.cache.memory),
+            cache_bytes=self.cache.memory.size,
+            response_cache_hits=self.responses.hits,
+            response_cache_misses=self.responses.misses,
+            response_cache_entries=len(self.responses.memory),
+            response_cache_bytes=self.responses.memory.size,
+            stale_hits=self.stale_hits,
+            stale_errors=self.stale_errors,
+            concurrency_limit=self.guard.limiter.limit,
+            in_flight=self.guard.limiter.in_flight,
+            rejected_calls=self.guard.rejected,
+            circuit_state=self.guard.breaker.state,
+            circuit_opens=self.guard.breaker.opens,
+            attempts=self.attempts,
+            retries=self.retries,
+            hedged_calls=self.hedged_calls,
+            hedge_wins=self.hedge_wins,
+            latency_p95={
+                target_name(target): p95
+                for target, window in self.latency.items()
+                if (p95 := window.quantile(HEDGE_QUANTILE)) is not None
+            },
+        )
+
+    async def query(
+        self, param_builder: ParamsBuilder, response_dto: Any, extractor: Literal["rows", "groups"] = "rows"
+    ) -> Any:
+        """Query courseplanner-api.
+
+        Results are cached for the time to live configured for the query target. Concurrent queries
+        with identical params that miss the cache share a single upstream call and its parsed result.
+
+        Once expired, a cached result is still served for `CACHE_STALE_WHILE_REVALIDATE` seconds while a
+        single background query refreshes it, and for `CACHE_STALE_IF_ERROR` seconds if upstream fails.
+
+        Failed upstream calls are retried with jittered exponential backoff within the deadline of the
+        target's retry policy, and a call slower than the target's p95 latency is hedged with a second one.
+        Upstream calls are rate limited and their concurrency adapts to upstream latency and errors.
+        While upstream keeps failing, queries fail fast with `UpstreamUnavailableException` - or are
+        answered from the cache - instead of waiting on courseplanner-api.
+
+        The etag of the returned data is recorded so that route handlers can answer conditional requests.
+
+        Args:
+            param_builder (ParamsBuilder): query params
+            response_dto (Any): struct type of each returned row
+            extractor (Literal["rows", "groups"], optional): how to extract rows from the response. Defaults to "rows".
+
+        Returns:
+            Any: list of parsed rows
+        """
+        key = f"{extractor}:{response_dto.__name__}:{param_builder.key}"
+        ttl = self.cache_ttl.get(param_builder.get("target"), 0)
+
+        def fetch() -> Awaitable[CacheEntry]:
+            return self._fetch(key, ttl, param_builder, response_dto, extractor)
+
+        entry = None
+        if ttl:
+            value_type = list[dto.Group] if extractor == "groups" else list[response_dto]  # type: ignore[valid-type]
+            entry = await self.cache.get(key, value_type)
+            if entry is not None:
+                if not entry.expired:
+                    record_etag(entry.etag)
+                    return entry.value
+                if time.time() < entry.expires_at + self.config.CACHE_STALE_WHILE_REVALIDATE:
+                    self.stale_hits += 1
+                    self._revalidate(key, fetch)
+                    record_etag(entry.etag)
+                    return entry.value
+        try:
+            entry = await self.single_flight.do(key, fetch)
+        except Exception:
+            if entry is None:
+                raise
+            self.stale_errors += 1
+        record_etag(entry.etag)
+        return entry.value
+
+    async def wait_revalidations(self) -> list[BaseException]:
+        """Wait for the background revalidations in flight to finish.
+
+        Returns:
+            list[BaseException]: errors of the failed revalidations
+        """
+        tasks = list(self._revalidating.values())
+        if not tasks:
+            return []
+        # Unlike `gather`, `wait` leaves the revalidations running if the caller is cancelled
+        await asyncio.wait(tasks)
+        return [error for task in tasks if not task.cancelled() and (error := task.exception()) is not None]
+
+    def _revalidate(self, key: str, fetch: Callable[[], Awaitable[CacheEntry]]) -> None:
+        if key in self._revalidating:
+            return
+        task = asyncio.ensure_future(self.single_flight.do(key, fetch))
+        self._revalidating[key] = task
+
+        def done(task: asyncio.Task[Any]) -> None:
+            del self._revalidating[key]
+            # A failed refresh keeps serving the stale entry; the next stale hit retries it
+            if not task.cancelled():
+                task.exception()
+
+        task.add_done_callback(done)
+
+    async def _fetch(
+        self,
+        key: str,
+        ttl: int,
+        param_builder: ParamsBuilder,
+        response_dto: Any,
+        extractor: Literal["rows", "groups"],
+    ) -> CacheEntry:
+        result = await self._call(param_builder, response_dto, extractor)
+        if ttl:
+            stale_ttl = max(self.config.CACHE_STALE_WHILE_REVALIDATE, self.config.CACHE_STALE_IF_ERROR)
+            return await self.cache.set(key, result.data, ttl, stale_ttl)
+        now = time.time()
+        return CacheEntry(value=result.data, size=0, expires_at=now, stale_until=now)
+
+    async def _call(
+        self, param_builder: ParamsBuilder, response_dto: Any, extractor: Literal["rows", "groups"]
+    ) -> ResponseParser:
+        target = param_builder.get("target")
+        policy = self.retry_policy.get(target, RetryPolicy())
+        window = self.latency.setdefault(target, LatencyWindow())
+
+        async def attempt() -> ResponseParser:
+            self.attempts += 1
+            started_at = time.monotonic()
+            async with (
+                self.guard(),
+                self.client.get(
+                    url=API_END_POINT,
+                    params=param_builder.params,
+                ) as raw_response,
+            ):
+                result = await ResponseParser.parse(raw_response, response_dto, extractor=extractor)
+            window.add(time.monotonic() - started_at)
+            return result
 
-    @staticmethod
-    async def campus() -> Sequence[dto.Campus]:
+        def on_hedge() -> None:
+            self.hedged_calls += 1
+
+        retries = 0
+        try:
+            async with asyncio.timeout(policy.deadline) as deadline:
+                while True:
+                    try:
+                        result, hedge_won = await hedge(
+                            attempt, window.quantile(HEDGE_QUANTILE) if policy.hedge else None, on_hedge
+                        )
+                    except Exception as e:
+                        retries += 1
+                        if retries >= policy.attempts or not is_upstream_failure(e):
+                            raise
+                        self.retries += 1
+                        await asyncio.sleep(policy.backoff(retries))
+                    else:
+                        self.hedge_wins += hedge_won
+                        return result
+        except TimeoutError as e:
+            if not deadline.expired():
+                raise
+            raise aiohttp.ServerTimeoutError(f"Upstream query exceeded its {policy.deadline}s deadline") from e
+
+    async def campus(self) -> Sequence[dto.Campus]:
         return cast(
             Sequence[dto.Campus],
-            await ProxyQueryService.query(ParamsBuilder(target=CAMPUS_TARGET, MaxRows=9999), dto.Campus),
+            await self.query(ParamsBuilder(target=CAMPUS_TARGET, MaxRows=9999), dto.Campus),
         )
 
-    @staticmethod
-    async def academic_career() -> Sequence[dto.Career]:
+    async def academic_career(self) -> Sequence[dto.Career]:
         return cast(
             Sequence[dto.Career],
-            await ProxyQueryService.query(
+            await self.query(
                 ParamsBuilder(target=CSP_ACAD_CAREER_TARGET, MaxRows=9999),
                 dto.Career,
             ),
         )
 
-    @staticmethod
-    async def term() -> Sequence[dto.Term]:
+    async def term(self, year: int = YEAR) -> Sequence[dto.Term]:
         return cast(
             Sequence[dto.Term],
-            await ProxyQueryService.query(
+            await self.query(
                 ParamsBuilder(
                     target=TERMS_TARGET,
                     MaxRows=9999,
                     virtual=VIRTUAL,
-                    year_from=YEAR,
-                    year_to=YEAR,
+                    year_from=year,
+                    year_to=year,
                 ),
                 dto.Term,
             ),
         )
 
-    @staticmethod
-    async def subjects() -> Sequence[dto.Subject]:
+    async def subjects(self, year: int = YEAR) -> Sequence[dto.Subject]:
         return cast(
             Sequence[dto.Subject],
-            await ProxyQueryService.query(
+            await self.query(
                 ParamsBuilder(
                     target=SUBJECT_TARGET,
                     MaxRows=9999,
                     virtual=VIRTUAL,
-                    year_from=YEAR,
-                    year_to=YEAR,
+                    year_from=year,
+                    year_to=year,
                 ),
                 dto.Subject,
             ),
         )
 
-    @staticmethod
     async def course(
+        self,
         course_title: str | None = None,
         subject_areas: str | None = None,
         catalogue_number: int | None = None,
@@ -117,14 +373,15 @@ class ProxyQueryService:
         )
         return cast(
             Sequence[dto.CourseSearch],
-            await ProxyQueryService.query(
+            await self.query(
                 params_builder,
                 dto.CourseSearch,
             ),
         )
 
-    @staticmethod
-    async def course_detail(course_id: str, course_offer_number: int, term: int, year: int = YEAR) -> dto.CourseDetail:
+    async def course_detail(
+        self, course_id: str, course_offer_number: int, term: int, year: int = YEAR
+    ) -> dto.CourseDetail:
         params_builder = ParamsBuilder(
             target=COURSE_DETAIL_TARGET,
             virtual=VIRTUAL,
@@ -133,14 +390,54 @@ class ProxyQueryService:
             course_offer_nbr=course_offer_number,
             term=term,
         )
-        data = await ProxyQueryService.query(
+        data = await self.query(
             params_builder,
             dto.CourseDetail,
         )
+        if not data:
+            raise NotFoundException(f"Course {course_id} offer {course_offer_number} not found in term {term}")
         return cast(dto.CourseDetail, data[0])
 
-    @staticmethod
-    async def course_class_list(course_id: str, course_offer_number: int, term: int, session: int = 1) -> Sequence[dto.Group]:
+    async def course_detail_batch(self, keys: Sequence[dto.CourseDetailKey]) -> list[dto.CourseDetailBatchItem]:
+        """Get details of several courses.
+
+        Distinct keys are queried concurrently, at most `BATCH_CONCURRENCY` at a time. A failed item
+        does not fail the batch - its error is reported on the item instead.
+
+        Args:
+            keys (Sequence[dto.CourseDetailKey]): courses to query
+
+        Raises:
+            ValidationException: if there are more than `BATCH_MAX_SIZE` keys
+
+        Returns:
+            list[dto.CourseDetailBatchItem]: one item per key, in the order of `keys`
+        """
+        if len(keys) > self.config.BATCH_MAX_SIZE:
+            raise ValidationException(f"Batch must not have more than {self.config.BATCH_MAX_SIZE} items")
+
+        async def fetch(key: dto.CourseDetailKey) -> dto.CourseDetail:
+            return await self.course_detail(
+                course_id=key.course_id, course_offer_number=key.course_offer_number, term=key.term, year=key.year
+            )
+
+        results = await fan_out(fetch, keys, self.config.BATCH_CONCURRENCY)
+        items = []
+        for key in keys:
+            item = dto.CourseDetailBatchItem(
+                course_id=key.course_id, course_offer_number=key.course_offer_number, term=key.term, year=key.year
+            )
+            result = results[key]
+            if isinstance(result, Exception):
+                item.error = str(result) or type(result).__name__
+            else:
+                item.detail = result
+            items.append(item)
+        return items
+
+    async def course_class_list(
+        self, course_id: str, course_offer_number: int, term: int, session: int = 1
+    ) -> Sequence[dto.Group]:
         params_builder = ParamsBuilder(
             target=COURSE_CLASS_LIST_TARGET,
             virtual=VIRTUAL,
@@ -149,11 +446,51 @@ class ProxyQueryService:
             term=term,
             session=session,
         )
-        data = await ProxyQueryService.query(params_builder, dto.Group, extractor="groups")
+        data = await self.query(params_builder, dto.Group, extractor="groups")
         return cast(Sequence[dto.Group], data)
 
-    @staticmethod
+    async def course_class_list_batch(
+        self, keys: Sequence[dto.CourseClassListKey]
+    ) -> list[dto.CourseClassListBatchItem]:
+        """Get class lists of several courses.
+
+        Distinct keys are queried concurrently, at most `BATCH_CONCURRENCY` at a time, through the
+        same cache and single-flight as single class lists. A failed item does not fail the batch -
+        its error is reported on the item instead.
+
+        Args:
+            keys (Sequence[dto.CourseClassListKey]): courses to query
+
+        Raises:
+            ValidationException: if there are more than `BATCH_MAX_SIZE` keys
+
+        Returns:
+            list[dto.CourseClassListBatchItem]: one item per key, in the order of `keys`
+        """
+        if len(keys) > self.config.BATCH_MAX_SIZE:
+            raise ValidationException(f"Batch must not have more than {self.config.BATCH_MAX_SIZE} items")
+
+        async def fetch(key: dto.CourseClassListKey) -> Sequence[dto.Group]:
+            return await self.course_class_list(
+                course_id=key.course_id, course_offer_number=key.course_offer_number, term=key.term, session=key.session
+            )
+
+        results = await fan_out(fetch, keys, self.config.BATCH_CONCURRENCY)
+        items = []
+        for key in keys:
+            item = dto.CourseClassListBatchItem(
+                course_id=key.course_id, course_offer_number=key.course_offer_number, term=key.term, session=key.session
+            )
+            result = results[key]
+            if isinstance(result, Exception):
+                item.error = str(result) or type(result).__name__
+            else:
+                item.groups = list(result)
+            items.append(item)
+        return items
+
     async def course_paginator(
+        self,
         course_title: str | None = None,
         subject_areas: str | None = None,
         catalogue_number: int | None = None,
@@ -163,25 +500,30 @@ class ProxyQueryService:
         academic_career: str | None = None,
         campus: str | None = None,
         page_size: int = 25,
+        prefetch: int = 0,
     ) -> Paginator:
         params_builder = ParamsBuilder(
             course_title=course_title,
-            subject_areas=subject_areas,
-            catalogue_number=catalogue_number,
-            class_number=class_number,
+            subject=subject_areas,
+            catalogue_nbr=catalogue_number,
+            classnbr=class_number,
             year=year,
             term=term,
-            academic_career=academic_career,
+            career=academic_career,
             campus=campus,
         )
         params_builder.add(
-            page_size=page_size,
+            pagesize=page_size,
             target=COURSE_SEARCH_TARGET,
             virtual=VIRTUAL,
         )
         return Paginator(
+            client=self.client,
             end_point=API_END_POINT,
             params=params_builder,
             response_dto=dto.CourseSearch,
             page_size=page_size,
+            prefetch=prefetch,
+            # Pages share the rate limit, circuit breaker and retry policy of every other upstream query
+            fetch=lambda params: self._call(params, dto.CourseSearch, "rows"),
         )
@@ -0,0 +1,235 @@
+# store.py
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, TypeVar
+
+import anyio.to_thread
+from litestar.stores.base import Store
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from types import TracebackType
+
+__all__ = ("SQLiteStore",)
+
+T = TypeVar("T")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL,
+        accessed_at REAL NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at) WHERE expires_at IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)",
+    # Total size of the entries, kept exact by triggers so that every process sees the same total
+    "CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO usage VALUES (0, 0)",
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries
+    BEGIN UPDATE usage SET size = size + new.size; END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries
+    BEGIN UPDATE usage SET size = size - old.size + new.size; END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries
+    BEGIN UPDATE usage SET size = size - old.size; END
+    """,
+)
+# Reads refresh the access time of an entry at most this often in seconds, so hot entries do not write on every read
+_ACCESS_RESOLUTION = 60.0
+
+
+def _seconds(value: int | timedelta | None) -> float | None:
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return value
+
+
+class SQLiteStore(Store):
+    """Shared cache tier in a SQLite database file.
+
+    Values survive restarts and are shared by every worker process that opens the same file. The
+    database runs in WAL mode, so readers never block the writer and each other; concurrent writers
+    wait up to `timeout` seconds for the write lock. Once the values exceed `max_bytes`, expired
+    values are dropped, then the least recently read ones.
+    """
+
+    __slots__ = ("_connection", "_lock", "_pid", "max_bytes", "path", "timeout")
+
+    def __init__(self, path: str | Path, max_bytes: int = 0, timeout: float = 5.0) -> None:
+        """Open a store. The database file is created on first use.
+
+        Args:
+            path (str | Path): database file
+            max_bytes (int, optional): max total size of the stored values. 0 disables the bound. Defaults to 0.
+            timeout (float, optional): max time in seconds to wait for another process to release
+                the write lock. Defaults to 5.0.
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._connection: sqlite3.Connection | None = None
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared with a forked child
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+        self._connection, self._pid = connection, os.getpid()
+        return connection
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        def run() -> T:
+            with self._lock:
+                return fn(self._connect())
+
+        return await anyio.to_thread.run_sync(run)
+
+    async def set(self, key: str, value: str | bytes, expires_in: int | timedelta | None = None) -> None:
+        if isinstance(value, str):
+            value = value.encode()
+        ttl = _seconds(expires_in)
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+
+        def set_(connection: sqlite3.Connection) -> None:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    """
+                    INSERT INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        value = excluded.value,
+                        size = excluded.size,
+                        expires_at = excluded.expires_at,
+                        accessed_at = excluded.accessed_at
+                    """,
+                    (key, value, len(value), expires_at, now),
+                )
+                if self.max_bytes:
+                    self._evict(connection, now)
+
+        await self._run(set_)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop values until they fit in `max_bytes`. Must be called in a write transaction."""
+        if self._usage(connection) <= self.max_bytes:
+            return
+        connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        excess = self._usage(connection) - self.max_bytes
+        if excess > 0:
+            # The least recently read values, just enough of them to cover the excess
+            connection.execute(
+                """
+                DELETE FROM entries WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY accessed_at, key) - size AS preceding FROM entries
+                    )
+                    WHERE preceding < ?
+                )
+                """,
+                (excess,),
+            )
+
+    @staticmethod
+    def _usage(connection: sqlite3.Connection) -> int:
+        return int(connection.execute("SELECT size FROM usage").fetchone()[0])
+
+    async def get(self, key: str, renew_for: int | timedelta | None = None) -> bytes | None:
+        renew = _seconds(renew_for)
+
+        def get(connection: sqlite3.Connection) -> bytes | None:
+            row = connection.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            now = time.time()
+            if expires_at is not None and expires_at <= now:
+                # Only drop the value read, another process may have replaced it since
+                connection.execute("DELETE FROM entries WHERE key = ? AND expires_at <= ?", (key, now))
+                return None
+            if renew is not None and expires_at is not None:
+                connection.execute(
+                    "UPDATE entries SET expires_at = ?, accessed_at = ? WHERE key = ?", (now + renew, now, key)
+                )
+            elif now - accessed_at >= _ACCESS_RESOLUTION:
+                connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return bytes(value)
+
+        return await self._run(get)
+
+    async def delete(self, key: str) -> None:
+        await self._run(lambda connection: connection.execute("DELETE FROM entries WHERE key = ?", (key,)))
+
+    async def delete_all(self) -> None:
+        await self._run(lambda connection: connection.execute("DELETE FROM entries"))
+
+    async def delete_expired(self) -> None:
+        """Drop every expired value."""
+        now = time.time()
+        await self._run(lambda connection: connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)))
+
+    async def exists(self, key: str) -> bool:
+        now = time.time()
+        return await self._run(
+            lambda connection: connection.execute(
+                "SELECT 1 FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            is not None
+        )
+
+    async def expires_in(self, key: str) -> int | None:
+        def expires_in(connection: sqlite3.Connection) -> int | None:
+            row = connection.execute("SELECT expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] is None:
+                return None
+            remaining = int(row[0] - time.time())
+            return remaining if remaining > 0 else None
+
+        return await self._run(expires_in)
+
+    async def size(self) -> int:
+        """Total size in bytes of the stored values, including expired values not dropped yet."""
+        return await self._run(self._usage)
+
+    async def close(self) -> None:
+        def close() -> None:
+            with self._lock:
+                if self._connection is not None and self._pid == os.getpid():
+                    self._connection.close()
+                self._connection = None
+
+        await anyio.to_thread.run_sync(close)
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        await self.close()
@@ -10,4 +10,8 @@ class ProxyURL(Enum):
     SUBJECT = "/proxy/subject"
     COURSE = "/proxy/course"
     COURSE_DETAIL = "/proxy/courseDetail"
+    COURSE_DETAIL_BATCH = "/proxy/courseDetail/batch"
     COURSE_CLASS_LIST = "/proxy/courseClassList"
+    COURSE_CLASS_LIST_BATCH = "/proxy/courseClassList/batch"
+    STATS = "/proxy/stats"
+    READY = "/proxy/ready"
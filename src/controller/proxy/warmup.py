@@ -0,0 +1,237 @@
+# warmup.py
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import anyio.to_thread
+import msgspec
+
+from src.config.app import settings
+from src.config.constants import PROXY_SERVICE_STATE_KEY, PROXY_WARMUP_STATE_KEY
+from src.controller.proxy import schema as dto
+from src.controller.proxy.cache import CacheEntry
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+    from litestar import Litestar
+
+    from src.controller.proxy.services import ProxyQueryService
+
+__all__ = (
+    "ReferenceWarmup",
+    "warmup_lifespan",
+)
+
+logger = logging.getLogger(__name__)
+
+# Cached values persisted in the snapshot, by the struct name in their cache key
+_REFERENCE_TYPES: dict[str, Any] = {
+    "Campus": list[dto.Campus],
+    "Career": list[dto.Career],
+    "Term": list[dto.Term],
+    "Subject": list[dto.Subject],
+}
+_SNAPSHOT_VERSION = 1
+# Delay in seconds before retrying a failed warm-up, doubled after each failure
+_RETRY_DELAY = 1.0
+_MAX_RETRY_DELAY = 60.0
+
+
+class _SnapshotEntry(msgspec.Struct, array_like=True):
+    key: str
+    expires_at: float
+    stale_until: float
+    etag: str
+    value: msgspec.Raw
+    """msgpack encoded value"""
+
+
+class _Snapshot(msgspec.Struct):
+    version: int
+    saved_at: float
+    entries: list[_SnapshotEntry]
+
+
+def _value_type(key: str) -> Any:
+    """Type of the value cached under a `ProxyQueryService.query` key, if it is reference data."""
+    extractor, _, rest = key.partition(":")
+    return _REFERENCE_TYPES.get(rest.partition(":")[0]) if extractor == "rows" else None
+
+
+class ReferenceWarmup:
+    """Preloads the reference data behind `campus`, `academic_career`, `term` and `subjects` on startup.
+
+    The cached reference data is persisted to a snapshot file on shutdown. On the next start, the
+    snapshot is loaded into the in-process cache before the first request, so that the last known
+    data is served at once. Entries that expired since are served stale while they are refreshed in
+    the background, or for `CACHE_STALE_IF_ERROR` seconds if upstream fails. The application is only
+    ready once the reference data was refreshed from upstream; the snapshot is then saved again, and
+    every `snapshot_interval` seconds after that.
+    """
+
+    def __init__(
+        self,
+        proxy_service: ProxyQueryService,
+        snapshot_path: str = "",
+        enabled: bool = True,
+        snapshot_interval: float = 0,
+    ) -> None:
+        self.proxy_service = proxy_service
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.enabled = enabled
+        self.snapshot_interval = snapshot_interval
+        self.status = dto.ReadinessStatus(ready=not enabled)
+        self._task: asyncio.Task[None] | None = None
+
+    def load_snapshot(self) -> int:
+        """Copy the entries of the snapshot file into the in-process cache.
+
+        Returns:
+            int: number of entries loaded. 0 if there is no snapshot or it cannot be read
+        """
+        if self.snapshot_path is None:
+            return 0
+        try:
+            snapshot = msgspec.msgpack.decode(self.snapshot_path.read_bytes(), type=_Snapshot)
+        except FileNotFoundError:
+            return 0
+        except (OSError, msgspec.DecodeError):
+            logger.warning("Ignoring unreadable proxy snapshot %s", self.snapshot_path, exc_info=True)
+            return 0
+        if snapshot.version != _SNAPSHOT_VERSION:
+            return 0
+        config = self.proxy_service.config
+        now = time.time()
+        loaded = 0
+        for entry in snapshot.entries:
+            value_type = _value_type(entry.key)
+            if value_type is None:
+                continue
+            try:
+                value = msgspec.msgpack.decode(entry.value, type=value_type)
+            except msgspec.DecodeError:
+                continue
+            expires_at, stale_until = entry.expires_at, entry.stale_until
+            if expires_at <= now:
+                # Serve expired data while it is refreshed, and fall back to it while upstream fails
+                expires_at = now
+                stale_until = now + max(config.CACHE_STALE_WHILE_REVALIDATE, config.CACHE_STALE_IF_ERROR)
+            self.proxy_service.cache.memory.set(
+                entry.key,
+                CacheEntry(
+                    value=value, size=len(entry.value), expires_at=expires_at, stale_until=stale_until, etag=entry.etag
+                ),
+            )
+            loaded += 1
+        self.status.snapshot_entries = loaded
+        self.status.snapshot_saved_at = snapshot.saved_at
+        return loaded
+
+    def save_snapshot(self) -> int:
+        """Write the cached reference data to the snapshot file, replacing it atomically.
+
+        Returns:
+            int: number of entries saved
+        """
+        if self.snapshot_path is None:
+            return 0
+        entries = [
+            _SnapshotEntry(
+                key=key,
+                expires_at=entry.expires_at,
+                stale_until=entry.stale_until,
+                etag=entry.etag,
+                value=msgspec.Raw(msgspec.msgpack.encode(entry.value)),
+            )
+            for key, entry in self.proxy_service.cache.memory.items()
+            if _value_type(key) is not None
+        ]
+        if not entries:
+            return 0
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+        partial.write_bytes(msgspec.msgpack.encode(_Snapshot(_SNAPSHOT_VERSION, time.time(), entries)))
+        partial.replace(self.snapshot_path)
+        return len(entries)
+
+    async def warm(self) -> None:
+        """Query the reference data until every query is answered with fresh data, then mark the application ready."""
+        proxy_service = self.proxy_service
+        delay = _RETRY_DELAY
+        while True:
+            stale_hits, stale_errors = proxy_service.stale_hits, proxy_service.stale_errors
+            results = await asyncio.gather(
+                proxy_service.campus(),
+                proxy_service.academic_career(),
+                proxy_service.term(),
+                proxy_service.subjects(),
+                return_exceptions=True,
+            )
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if not errors and proxy_service.stale_errors == stale_errors:
+                if proxy_service.stale_hits == stale_hits:
+                    break
+                # Expired data loaded from the snapshot was served while it is refreshed, query again once it is
+                errors = await proxy_service.wait_revalidations()
+                if not errors:
+                    continue
+            self.status.error = (str(errors[0]) or type(errors[0]).__name__) if errors else "Serving stale data"
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _MAX_RETRY_DELAY)
+        self.status.ready = True
+        self.status.warmed_at = time.time()
+        self.status.error = None
+        await self._save_snapshot()
+
+    async def _run(self) -> None:
+        await self.warm()
+        while self.snapshot_interval > 0:
+            await asyncio.sleep(self.snapshot_interval)
+            await self._save_snapshot()
+
+    async def _save_snapshot(self) -> None:
+        try:
+            await anyio.to_thread.run_sync(self.save_snapshot)
+        except OSError:
+            logger.warning("Could not save proxy snapshot %s", self.snapshot_path, exc_info=True)
+
+    async def start(self) -> None:
+        """Load the snapshot and start warming up in the background."""
+        await anyio.to_thread.run_sync(self.load_snapshot)
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._save_snapshot()
+
+
+@asynccontextmanager
+async def warmup_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Warm the reference data caches on startup and persist them on shutdown.
+
+    Must run after `proxy_lifespan`. Readiness is reported by `ProxyController.get_readiness`.
+    """
+    warmup = ReferenceWarmup(
+        app.state[PROXY_SERVICE_STATE_KEY],
+        settings.proxy.SNAPSHOT_PATH,
+        enabled=settings.proxy.WARMUP,
+        snapshot_interval=settings.proxy.SNAPSHOT_INTERVAL,
+    )
+    await warmup.start()
+    app.state[PROXY_WARMUP_STATE_KEY] = warmup
+    try:
+        yield
+    finally:
+        del app.state[PROXY_WARMUP_STATE_KEY]
+        await warmup.close()
@@ -0,0 +1,42 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import cast
+
+from litestar import Litestar
+from litestar.datastructures import State
+
+from src.config.app import settings
+from src.config.constants import CATALOGUE_SYNC_JOB_STATE_KEY, PROXY_SERVICE_STATE_KEY, SEAT_WATCHER_STATE_KEY
+from src.controller.catalogue.services import CatalogueSyncJob
+from src.controller.proxy.services import ProxyQueryService
+from src.controller.seats.services import SeatWatcher
+
+__all__ = (
+    "provide_seat_watcher",
+    "seats_lifespan",
+)
+
+
+def provide_seat_watcher(state: State) -> SeatWatcher:
+    return cast(SeatWatcher, state[SEAT_WATCHER_STATE_KEY])
+
+
+@asynccontextmanager
+async def seats_lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    """Hold the seat watcher for the lifetime of the application and stop its pollers on shutdown.
+
+    Must run after `proxy_lifespan`, whose proxy service the watcher polls through. Class list
+    changes found by catalogue syncs are pushed to subscribers too, if `catalogue_lifespan` ran.
+    """
+    watcher = SeatWatcher(cast(ProxyQueryService, app.state[PROXY_SERVICE_STATE_KEY]), settings.seat_watch)
+    app.state[SEAT_WATCHER_STATE_KEY] = watcher
+    sync_job = cast(CatalogueSyncJob | None, app.state.get(CATALOGUE_SYNC_JOB_STATE_KEY))
+    if sync_job is not None:
+        sync_job.listeners.append(watcher.on_change_set)
+    try:
+        yield
+    finally:
+        if sync_job is not None:
+            sync_job.listeners.remove(watcher.on_change_set)
+        await watcher.close()
+        del app.state[SEAT_WATCHER_STATE_KEY]
@@ -0,0 +1,74 @@
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+import msgspec
+from litestar import Controller, get
+from litestar.di import Provide
+from litestar.params import Parameter
+from litestar.response import ServerSentEvent, ServerSentEventMessage
+
+from src.config.app import settings
+from src.controller.proxy.schema import CourseClassListKey
+from src.controller.seats.dependencies import provide_seat_watcher
+from src.controller.seats.schema import SeatSnapshot
+from src.controller.seats.services import SeatWatcher, Subscription, watch
+from src.controller.seats.urls import SeatsURL
+
+__all__ = ("SeatsController",)
+
+
+class SeatsController(Controller):
+    """Seat Watcher Controller"""
+
+    tags = ["Seats Controller"]
+    dependencies = {
+        "seat_watcher": Provide(provide_seat_watcher, sync_to_thread=False),
+    }
+    dto = None
+    return_dto = None
+
+    @get(
+        operation_id="WatchSeats",
+        name="seats:watch",
+        summary="Watch Seats",
+        description=(
+            "Stream seat availability of classes of a course as server-sent events - a snapshot event with the "
+            "current seat counts, then a changes event whenever classes are added, removed or their seat counts change"
+        ),
+        path=SeatsURL.WATCH.value,
+        exclude_from_auth=True,
+    )
+    async def watch_seats(
+        self,
+        seat_watcher: SeatWatcher,
+        course_id: str,
+        course_offer_number: int,
+        term: int,
+        session: int = 1,
+        class_nbr: Annotated[list[str] | None, Parameter(query="classNbr")] = None,
+    ) -> ServerSentEvent:
+        """Subscribe to seat count changes of a course.
+
+        Args:
+            seat_watcher (SeatWatcher): seat watcher
+            course_id (str): course id
+            course_offer_number (int): course offer number
+            term (int): term code
+            session (int): session code
+            class_nbr (list[str] | None): classes to watch. Defaults to every class of the course.
+
+        Returns:
+            ServerSentEvent: event stream
+        """
+        key = CourseClassListKey(course_id, course_offer_number, term, session)
+        subscription = await seat_watcher.subscribe(key, class_nbr)
+        return ServerSentEvent(_events(seat_watcher, subscription))
+
+
+async def _events(watcher: SeatWatcher, subscription: Subscription) -> AsyncIterator[ServerSentEventMessage]:
+    async for message in watch(watcher, subscription, settings.seat_watch.HEARTBEAT_INTERVAL):
+        if message is None:
+            yield ServerSentEventMessage(comment="keepalive")
+        else:
+            event = "snapshot" if isinstance(message, SeatSnapshot) else "changes"
+            yield ServerSentEventMessage(data=msgspec.json.encode(message).decode(), event=event)
@@ -0,0 +1,35 @@
+from src.controller.catalogue.schema import ClassSectionChange, SeatCount
+from src.utils.schema import CamelizedBaseStruct
+
+__all__ = (
+    "SeatChanges",
+    "SeatSnapshot",
+    "WatchedClass",
+)
+
+
+class WatchedClass(CamelizedBaseStruct):
+    group_type: str
+    class_nbr: str
+    section: str
+    seats: SeatCount
+
+
+class SeatSnapshot(CamelizedBaseStruct, tag_field="kind", tag="snapshot"):
+    """Seat counts of the watched classes when the subscription started"""
+
+    course_id: str
+    course_offer_number: int
+    term: int
+    session: int
+    classes: list[WatchedClass]
+
+
+class SeatChanges(CamelizedBaseStruct, tag_field="kind", tag="changes"):
+    """Watched classes whose seat counts changed, were added or were removed since the last message"""
+
+    course_id: str
+    course_offer_number: int
+    term: int
+    session: int
+    changes: list[ClassSectionChange]
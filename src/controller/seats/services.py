@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import TYPE_CHECKING, Literal
+
+import msgspec
+from litestar.exceptions import ServiceUnavailableException
+
+from src.controller.catalogue.schema import ClassListChangeSet, ClassSectionChange, SeatCount
+from src.controller.proxy.schema import CourseClassListKey
+from src.controller.seats.schema import SeatChanges, SeatSnapshot, WatchedClass
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterable, Sequence
+
+    from src.config.base import SeatWatchSettings
+    from src.controller.proxy.schema import Group
+    from src.controller.proxy.services import ProxyQueryService
+
+__all__ = (
+    "SeatWatcher",
+    "Subscription",
+    "diff_seats",
+    "seats_of",
+)
+
+ClassKey = tuple[str, str]
+"""group_type, class_nbr"""
+
+
+def seats_of(groups: Sequence[Group]) -> dict[ClassKey, WatchedClass]:
+    """Seat counts of the classes of a class list. A class listed in several groups of a type is counted once."""
+    seats: dict[ClassKey, WatchedClass] = {}
+    for group in groups:
+        for class_info in group.classes:
+            seats.setdefault(
+                (group.type, class_info.class_nbr),
+                WatchedClass(
+                    group_type=group.type,
+                    class_nbr=class_info.class_nbr,
+                    section=class_info.section,
+                    seats=SeatCount(size=class_info.size, enrolled=class_info.enrolled, available=class_info.available),
+                ),
+            )
+    return seats
+
+
+def diff_seats(old: dict[ClassKey, WatchedClass], new: dict[ClassKey, WatchedClass]) -> list[ClassSectionChange]:
+    """Classes added, removed, or whose seat counts changed between two class lists.
+
+    Args:
+        old (dict[ClassKey, WatchedClass]): seat counts before
+        new (dict[ClassKey, WatchedClass]): seat counts after
+
+    Returns:
+        list[ClassSectionChange]: changes, in the order of `new` then removed classes in the order of `old`
+    """
+    changes = []
+    for key, after in new.items():
+        before = old.get(key)
+        if before is None:
+            changes.append(_change("added", after, new=after.seats))
+        elif before.seats != after.seats:
+            changes.append(_change("changed", after, old=before.seats, new=after.seats))
+    changes.extend(_change("removed", before, old=before.seats) for key, before in old.items() if key not in new)
+    return changes
+
+
+def _change(
+    kind: Literal["added", "changed", "removed"],
+    watched: WatchedClass,
+    old: SeatCount | None = None,
+    new: SeatCount | None = None,
+) -> ClassSectionChange:
+    return ClassSectionChange(
+        kind=kind, group_type=watched.group_type, class_nbr=watched.class_nbr, section=watched.section, old=old, new=new
+    )
+
+
+class Subscription:
+    """Changes to the watched classes of a course, pushed by the poller of the course.
+
+    Changes a slow subscriber has not read yet are merged per class, so it always catches up with
+    the latest seat counts and its backlog never exceeds the size of the class list.
+    """
+
+    def __init__(self, key: CourseClassListKey, class_nbrs: Iterable[str] | None) -> None:
+        self.key = key
+        self.class_nbrs = frozenset(class_nbrs) if class_nbrs else None
+        """Watched class numbers. None watches every class of the course"""
+        self.snapshot: SeatSnapshot | None = None
+        self._pending: dict[ClassKey, ClassSectionChange] = {}
+        self._ready = asyncio.Event()
+
+    def watches(self, class_nbr: str) -> bool:
+        return self.class_nbrs is None or class_nbr in self.class_nbrs
+
+    def push(self, changes: Iterable[ClassSectionChange]) -> None:
+        for change in changes:
+            if not self.watches(change.class_nbr):
+                continue
+            key = (change.group_type, change.class_nbr)
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                # Changes since the subscriber last read, from the seat count it last saw
+                if pending.old == change.new:
+                    continue
+                kind = "added" if pending.old is None else "removed" if change.new is None else "changed"
+                change = msgspec.structs.replace(change, kind=kind, old=pending.old)
+            self._pending[key] = change
+        if self._pending:
+            self._ready.set()
+
+    async def next(self, timeout: float | None = None) -> SeatChanges | None:
+        """Changes since the last call, waiting up to `timeout` seconds for one. None if there was none."""
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        self._ready.clear()
+        if not self._pending:
+            return None
+        changes, self._pending = list(self._pending.values()), {}
+        return SeatChanges(
+            course_id=self.key.course_id,
+            course_offer_number=self.key.course_offer_number,
+            term=self.key.term,
+            session=self.key.session,
+            changes=changes,
+        )
+
+
+class _Poller:
+    def __init__(self, key: CourseClassListKey) -> None:
+        self.key = key
+        self.seats: dict[ClassKey, WatchedClass] = {}
+        self.subscriptions: set[Subscription] = set()
+        self.ready: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        """Done once the class list was fetched for the first time"""
+        self.task: asyncio.Task[None] | None = None
+
+
+class SeatWatcher:
+    """Watches the seat counts of courses for any number of subscribers.
+
+    Each watched course has a single background poller that fetches its class list every
+    `POLL_INTERVAL` seconds through the proxy cache, however many subscribers watch it, and pushes
+    the seat count changes to them. A poller stops once its last subscriber leaves. Class lists
+    refreshed by a catalogue sync are pushed too, via `on_change_set`.
+    """
+
+    def __init__(self, proxy_service: ProxyQueryService, config: SeatWatchSettings) -> None:
+        self.proxy_service = proxy_service
+        self.config = config
+        self._pollers: dict[CourseClassListKey, _Poller] = {}
+
+    @property
+    def watched(self) -> int:
+        """Number of courses being polled."""
+        return len(self._pollers)
+
+    async def _fetch(self, key: CourseClassListKey) -> dict[ClassKey, WatchedClass]:
+        return seats_of(
+            await self.proxy_service.course_class_list(
+                course_id=key.course_id, course_offer_number=key.course_offer_number, term=key.term, session=key.session
+            )
+        )
+
+    async def subscribe(self, key: CourseClassListKey, class_nbrs: Iterable[str] | None = None) -> Subscription:
+        """Start watching classes of a course.
+
+        The subscription must be passed to `unsubscribe` once it is no longer read.
+
+        Args:
+            key (CourseClassListKey): course to watch
+            class_nbrs (Iterable[str] | None, optional): classes to watch. Defaults to every class of the course.
+
+        Raises:
+            ServiceUnavailableException: if `MAX_COURSES` courses are watched already
+            Exception: the error of the first class list fetch of the course
+
+        Returns:
+            Subscription: subscription, with a snapshot of the current seat counts of the watched classes
+        """
+        poller = self._pollers.get(key)
+        if poller is None:
+            if len(self._pollers) >= self.config.MAX_COURSES:
+                raise ServiceUnavailableException(detail="Too many courses are being watched")
+            poller = self._pollers[key] = _Poller(key)
+            poller.task = asyncio.create_task(self._poll(poller))
+        subscription = Subscription(key, class_nbrs)
+        poller.subscriptions.add(subscription)
+        try:
+            await asyncio.shield(poller.ready)
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+        subscription.snapshot = SeatSnapshot(
+            course_id=key.course_id,
+            course_offer_number=key.course_offer_number,
+            term=key.term,
+            session=key.session,
+            classes=[seats for seats in poller.seats.values() if subscription.watches(seats.class_nbr)],
+        )
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        poller = self._pollers.get(subscription.key)
+        if poller is None:
+            return
+        poller.subscriptions.discard(subscription)
+        if not poller.subscriptions:
+            self._stop(poller)
+
+    def _stop(self, poller: _Poller) -> None:
+        if self._pollers.get(poller.key) is poller:
+            del self._pollers[poller.key]
+        if poller.task is not None:
+            poller.task.cancel()
+
+    def _update(self, poller: _Poller, seats: dict[ClassKey, WatchedClass]) -> None:
+        changes = diff_seats(poller.seats, seats)
+        poller.seats = seats
+        if changes:
+            for subscription in poller.subscriptions:
+                subscription.push(changes)
+
+    async def _poll(self, poller: _Poller) -> None:
+        try:
+            seats = await self._fetch(poller.key)
+        except Exception as e:  # noqa: BLE001
+            if self._pollers.get(poller.key) is poller:
+                del self._pollers[poller.key]
+            poller.ready.set_exception(e)
+            # Retrieved by the subscribers waiting on it, if any are left
+            poller.ready.exception()
+            return
+        poller.seats = seats
+        poller.ready.set_result(None)
+        while True:
+            await asyncio.sleep(self.config.POLL_INTERVAL)
+            try:
+                seats = await self._fetch(poller.key)
+            except Exception:  # noqa: BLE001, S112
+                # Subscribers keep the last seat counts; the next poll tries again
+                continue
+            self._update(poller, seats)
+
+    def on_change_set(self, change_set: ClassListChangeSet) -> None:
+        """`CatalogueSyncJob` listener - push the changes of a class list refreshed by a catalogue sync."""
+        key = CourseClassListKey(
+            course_id=change_set.course_id,
+            course_offer_number=int(change_set.course_offer_nbr),
+            term=int(change_set.term),
+            session=int(change_set.session),
+        )
+        poller = self._pollers.get(key)
+        if poller is None or not poller.ready.done() or poller.ready.exception() is not None:
+            return
+        seats = dict(poller.seats)
+        for change in change_set.changes:
+            class_key = (change.group_type, change.class_nbr)
+            if change.new is None:
+                seats.pop(class_key, None)
+            else:
+                seats[class_key] = WatchedClass(
+                    group_type=change.group_type, class_nbr=change.class_nbr, section=change.section, seats=change.new
+                )
+        # Diffing against the polled seat counts drops changes the subscribers were already sent
+        self._update(poller, seats)
+
+    async def close(self) -> None:
+        pollers = list(self._pollers.values())
+        for poller in pollers:
+            self._stop(poller)
+        await asyncio.gather(*(poller.task for poller in pollers if poller.task is not None), return_exceptions=True)
+
+
+async def watch(
+    watcher: SeatWatcher, subscription: Subscription, heartbeat: float
+) -> AsyncIterator[SeatSnapshot | SeatChanges | None]:
+    """Messages of a subscription: its snapshot, then changes as they are pushed.
+
+    None is yielded after `heartbeat` seconds without changes, so that idle streams can be kept
+    alive. The subscription is ended when iteration stops.
+
+    Args:
+        watcher (SeatWatcher): watcher the subscription is of
+        subscription (Subscription): subscription
+        heartbeat (float): max seconds between yields
+
+    Yields:
+        SeatSnapshot | SeatChanges | None: messages
+    """
+    try:
+        if subscription.snapshot is not None:
+            yield subscription.snapshot
+        while True:
+            yield await subscription.next(heartbeat)
+    finally:
+        watcher.unsubscribe(subscription)
@@ -0,0 +1,7 @@
+from enum import Enum
+
+__all__ = ("SeatsURL",)
+
+
+class SeatsURL(Enum):
+    WATCH = "/seats/watch"
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Any
+
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy import JSON, Index, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+__all__ = ("ClassSection",)
+
+
+class ClassSection(UUIDAuditBase):
+    """Class of a course class list. The full upstream class is kept in `data`; seat counts are also stored as columns.
+
+    `content_hash` is a digest of the canonical encoding of the upstream class, used to skip unchanged classes.
+    """
+
+    __tablename__ = "class_section_table"
+    __table_args__ = (
+        UniqueConstraint("course_id", "course_offer_nbr", "term", "session", "group_type", "class_nbr"),
+        Index("ix_class_section_course", "course_id", "course_offer_nbr", "term", "session"),
+        {"comment": "Catalogue mirror of courseplanner-api course class lists"},
+    )
+
+    course_id: Mapped[str] = mapped_column(String(length=16))
+    course_offer_nbr: Mapped[str] = mapped_column(String(length=8))
+    term: Mapped[str] = mapped_column(String(length=16))
+    session: Mapped[str] = mapped_column(String(length=8))
+    group_type: Mapped[str] = mapped_column(String(length=64))
+    class_nbr: Mapped[str] = mapped_column(String(length=16))
+    section: Mapped[str] = mapped_column(String(length=16))
+    size: Mapped[int]
+    enrolled: Mapped[int]
+    available: Mapped[int]
+    content_hash: Mapped[str] = mapped_column(String(length=32))
+    data: Mapped[dict[str, Any]] = mapped_column(JSON)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy import JSON, String, Text, UniqueConstraint, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+if TYPE_CHECKING:
+    from sqlalchemy import Connection, MetaData
+
+__all__ = (
+    "SEARCH_INDEX_NAME",
+    "SEARCH_KEY_NAME",
+    "CourseDetail",
+)
+
+SEARCH_INDEX_NAME = "course_search_index"
+"""SQLite: FTS5 table over course details. PostgreSQL: GIN index over the `search_vector` column."""
+SEARCH_KEY_NAME = "course_search_key"
+"""SQLite: table of the integer keys of course details in the FTS5 table."""
+
+
+class CourseDetail(UUIDAuditBase):
+    """Course detail. The full upstream row is kept in `data`; searchable fields are also stored as columns."""
+
+    __tablename__ = "course_detail_table"
+    __table_args__ = (
+        UniqueConstraint("course_id", "course_offer_nbr", "term", "year"),
+        {"comment": "Catalogue mirror of courseplanner-api course details"},
+    )
+
+    course_id: Mapped[str] = mapped_column(String(length=16))
+    course_offer_nbr: Mapped[str] = mapped_column(String(length=8))
+    term: Mapped[str] = mapped_column(String(length=16))
+    year: Mapped[str] = mapped_column(String(length=8))
+    subject: Mapped[str] = mapped_column(String(length=32))
+    catalog_nbr: Mapped[str] = mapped_column(String(length=16))
+    course_title: Mapped[str]
+    syllabus: Mapped[str] = mapped_column(Text)
+    assumed_knowledge: Mapped[str] = mapped_column(Text)
+    data: Mapped[dict[str, Any]] = mapped_column(JSON)
+
+
+_SEARCH_COLUMNS = "course_title, subject, catalog_nbr, syllabus, assumed_knowledge"
+_NEW_VALUES = "new.course_title, new.subject, new.catalog_nbr, new.syllabus, new.assumed_knowledge"
+_OLD_VALUES = "old.course_title, old.subject, old.catalog_nbr, old.syllabus, old.assumed_knowledge"
+# The statements below are built from the constants above only, never from input - hence the S608 suppressions.
+_NEW_KEY = f"(SELECT search_rowid FROM {SEARCH_KEY_NAME} WHERE detail_id = new.id)"  # noqa: S608
+_OLD_KEY = f"(SELECT search_rowid FROM {SEARCH_KEY_NAME} WHERE detail_id = old.id)"  # noqa: S608
+_INSERT_NEW = f"""INSERT INTO {SEARCH_INDEX_NAME}(rowid, {_SEARCH_COLUMNS})
+    VALUES ({_NEW_KEY}, {_NEW_VALUES});"""  # noqa: S608
+_DELETE_OLD = f"""INSERT INTO {SEARCH_INDEX_NAME}({SEARCH_INDEX_NAME}, rowid, {_SEARCH_COLUMNS})
+    VALUES ('delete', {_OLD_KEY}, {_OLD_VALUES});"""  # noqa: S608
+
+# FTS5 keys its rows by integer. The implicit rowid of the UUID keyed detail table may change on
+# VACUUM, so details are given a stable integer key in a separate table instead. The index reads
+# details through a view keyed by it.
+_SQLITE_SEARCH_INDEX = (
+    f"CREATE TABLE {SEARCH_KEY_NAME} (search_rowid INTEGER PRIMARY KEY, detail_id NOT NULL UNIQUE)",
+    f"""CREATE VIEW {SEARCH_INDEX_NAME}_content AS
+        SELECT k.search_rowid, {", ".join(f"d.{name}" for name in _SEARCH_COLUMNS.split(", "))}
+        FROM {SEARCH_KEY_NAME} AS k JOIN course_detail_table AS d ON d.id = k.detail_id""",  # noqa: S608
+    f"CREATE VIRTUAL TABLE {SEARCH_INDEX_NAME} USING fts5({_SEARCH_COLUMNS}, "
+    f"content='{SEARCH_INDEX_NAME}_content', content_rowid='search_rowid', tokenize='porter unicode61')",
+    f"""CREATE TRIGGER {SEARCH_INDEX_NAME}_ai AFTER INSERT ON course_detail_table BEGIN
+        INSERT INTO {SEARCH_KEY_NAME}(detail_id) VALUES (new.id); {_INSERT_NEW}
+    END""",  # noqa: S608
+    f"""CREATE TRIGGER {SEARCH_INDEX_NAME}_ad AFTER DELETE ON course_detail_table BEGIN
+        {_DELETE_OLD} DELETE FROM {SEARCH_KEY_NAME} WHERE detail_id = old.id;
+    END""",  # noqa: S608
+    f"CREATE TRIGGER {SEARCH_INDEX_NAME}_au AFTER UPDATE ON course_detail_table BEGIN {_DELETE_OLD} {_INSERT_NEW} END",
+    # Index rows mirrored before the index existed
+    f"INSERT INTO {SEARCH_KEY_NAME}(detail_id) SELECT id FROM course_detail_table",  # noqa: S608
+    f"INSERT INTO {SEARCH_INDEX_NAME}({SEARCH_INDEX_NAME}) VALUES ('rebuild')",  # noqa: S608
+)
+# Drops an index keyed by the rowid of the detail table, as created by earlier versions
+_SQLITE_DROP_SEARCH_INDEX = (
+    f"DROP TRIGGER IF EXISTS {SEARCH_INDEX_NAME}_ai",
+    f"DROP TRIGGER IF EXISTS {SEARCH_INDEX_NAME}_ad",
+    f"DROP TRIGGER IF EXISTS {SEARCH_INDEX_NAME}_au",
+    f"DROP TABLE IF EXISTS {SEARCH_INDEX_NAME}",
+)
+
+_POSTGRES_SEARCH_INDEX = (
+    """ALTER TABLE course_detail_table ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(course_title, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(subject, '') || ' ' || coalesce(catalog_nbr, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(syllabus, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(assumed_knowledge, '')), 'C')
+    ) STORED""",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} ON course_detail_table USING GIN (search_vector)",
+)
+
+
+@event.listens_for(UUIDAuditBase.metadata, "after_create")
+def _create_search_index(target: MetaData, connection: Connection, **kw: Any) -> None:
+    """Create the full-text index over course details. The index is kept up to date by the database."""
+    statements: tuple[str, ...] = ()
+    match connection.dialect.name:
+        case "sqlite":
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_KEY_NAME,)
+            ).first()
+            if exists is None:
+                statements = (*_SQLITE_DROP_SEARCH_INDEX, *_SQLITE_SEARCH_INDEX)
+        case "postgresql":
+            statements = _POSTGRES_SEARCH_INDEX
+    for statement in statements:
+        connection.exec_driver_sql(statement)
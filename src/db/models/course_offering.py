@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy import Index, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+__all__ = ("CourseOffering",)
+
+
+class CourseOffering(UUIDAuditBase):
+    """Course search row. Columns are the lowercase names of `CourseSearch` fields."""
+
+    __tablename__ = "course_offering_table"
+    __table_args__ = (
+        UniqueConstraint("course_id", "course_offer_nbr", "term", "class_nbr"),
+        Index("ix_course_offering_year_term", "year", "term"),
+        Index("ix_course_offering_subject_catalog_nbr", "subject", "catalog_nbr"),
+        {"comment": "Catalogue mirror of courseplanner-api course search results"},
+    )
+
+    acad_career: Mapped[str] = mapped_column(String(length=16))
+    acad_career_descr: Mapped[str]
+    campus: Mapped[str]
+    catalog_nbr: Mapped[str] = mapped_column(String(length=16))
+    class_nbr: Mapped[str] = mapped_column(String(length=16), index=True)
+    course_id: Mapped[str] = mapped_column(String(length=16), index=True)
+    course_offer_nbr: Mapped[str] = mapped_column(String(length=8))
+    course_title: Mapped[str] = mapped_column(index=True)
+    subject: Mapped[str] = mapped_column(String(length=32))
+    year: Mapped[str] = mapped_column(String(length=8))
+    term: Mapped[str] = mapped_column(String(length=16))
+    term_descr: Mapped[str]
+    units: Mapped[str] = mapped_column(String(length=8))
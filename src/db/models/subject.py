@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy import String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+__all__ = ("Subject",)
+
+
+class Subject(UUIDAuditBase):
+    __tablename__ = "subject_table"
+    __table_args__ = (
+        UniqueConstraint("subject", "year"),
+        {"comment": "Catalogue mirror of courseplanner-api subject areas"},
+    )
+
+    subject: Mapped[str] = mapped_column(String(length=32))
+    descr: Mapped[str]
+    year: Mapped[int] = mapped_column(index=True)
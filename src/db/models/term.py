@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from advanced_alchemy.base import UUIDAuditBase
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+__all__ = ("Term",)
+
+
+class Term(UUIDAuditBase):
+    __tablename__ = "term_table"
+    __table_args__ = {"comment": "Catalogue mirror of courseplanner-api terms"}
+
+    term: Mapped[str] = mapped_column(String(length=16), unique=True, index=True)
+    descr: Mapped[str]
+    acad_year: Mapped[str] = mapped_column(String(length=8), index=True)
+    current: Mapped[str] = mapped_column(String(length=8))
@@ -9,6 +9,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from advanced_alchemy.exceptions import IntegrityError
+from aiohttp import ClientError
 from litestar.exceptions import (
     HTTPException,
     InternalServerException,
@@ -16,7 +17,7 @@ from litestar.exceptions import (
 )
 from litestar.exceptions.responses import create_exception_response
 from litestar.repository.exceptions import ConflictError, NotFoundError, RepositoryError
-from litestar.status_codes import HTTP_409_CONFLICT
+from litestar.status_codes import HTTP_409_CONFLICT, HTTP_502_BAD_GATEWAY
 
 if TYPE_CHECKING:
     from typing import Any
@@ -33,6 +34,12 @@ class HTTPConflictException(HTTPException):
     status_code = HTTP_409_CONFLICT
 
 
+class HTTPBadGatewayException(HTTPException):
+    """Upstream service failed to answer the request."""
+
+    status_code = HTTP_502_BAD_GATEWAY
+
+
 def exception_to_http_response(
     request: Request[Any, Any, Any],
     exc: Exception,
@@ -55,5 +62,8 @@ def exception_to_http_response(
     if isinstance(exc, ConflictError | RepositoryError | IntegrityError):
         http_exc = HTTPConflictException
         return create_exception_response(request, http_exc(detail=str(exc.detail)))
+    if isinstance(exc, ClientError):
+        http_exc = HTTPBadGatewayException
+        return create_exception_response(request, http_exc(detail=str(exc)))
     http_exc = InternalServerException
     return create_exception_response(request, http_exc(detail=str(exc.__cause__)))
@@ -0,0 +1,126 @@
+from datetime import date, datetime, time
+
+import msgspec
+import pytest
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.testing import TestClient
+
+from src.config.base import ProxySettings
+from src.config.constants import PROXY_SERVICE_STATE_KEY
+from src.controller.calendar.ics import Event, _fold, events_of, render
+from src.controller.calendar.meetings import MeetingInterval
+from src.controller.calendar.router import CalendarController
+from src.controller.proxy.etag import record_etag
+from src.controller.proxy.schema import ClassInfo, CourseDetail, CriticalDates, Group, Meetings, Term
+from src.controller.proxy.services import ProxyQueryService
+
+
+def interval(first: date, last: date, weekday: int = 0) -> MeetingInterval:
+    return MeetingInterval(weekday=weekday, start=time(9), end=time(10), first=first, last=last, location="Room 1")
+
+
+def test_events_merge_date_ranges() -> None:
+    intervals = [interval(date(2024, 2, 26), date(2024, 4, 5)), interval(date(2024, 4, 22), date(2024, 5, 31))]
+    (event,) = events_of("1", "COMP 1000 Lecture", "", intervals)
+    assert event.start == datetime(2024, 2, 26, 9)
+    assert event.end == datetime(2024, 2, 26, 10)
+    assert event.count == 14
+    assert event.exdates == (datetime(2024, 4, 8, 9), datetime(2024, 4, 15, 9))
+
+    once = list(events_of("2", "Exam", "", [interval(date(2024, 6, 3), date(2024, 6, 3))]))
+    assert [event.count for event in once] == [1]
+    assert list(events_of("3", "None", "", [interval(date(2024, 6, 4), date(2024, 6, 6))])) == []
+
+
+def test_render_folds_and_escapes() -> None:
+    event = Event(
+        uid="1@x",
+        summary="Lecture; Tutorial, Workshop",
+        description="é" * 60,
+        location="",
+        start=datetime(2024, 2, 26, 9),
+        end=datetime(2024, 2, 26, 10),
+        count=2,
+    )
+    body = b"".join(render("Timetable", [[event], []]))
+    assert body.startswith(b"BEGIN:VCALENDAR\r\n")
+    assert body.endswith(b"END:VCALENDAR\r\n")
+    assert b"SUMMARY:Lecture\\; Tutorial\\, Workshop\r\n" in body
+    assert b"RRULE:FREQ=WEEKLY;COUNT=2\r\n" in body
+    assert b"EXDATE" not in body
+    assert all(len(line) <= 75 for line in body.split(b"\r\n"))
+    assert _fold("x" * 80) == b"x" * 75 + b"\r\n " + b"x" * 5 + b"\r\n"
+    # Unfolding restores the line
+    description = next(line for line in body.replace(b"\r\n ", b"").split(b"\r\n") if line.startswith(b"DESC"))
+    assert description.decode() == "DESCRIPTION:" + "é" * 60
+
+
+def course_detail() -> CourseDetail:
+    fields: dict[str, object] = {field: "" for field in CourseDetail.__struct_fields__}
+    fields.update(
+        SUBJECT="COMP SCI",
+        CATALOG_NBR="1102",
+        COURSE_TITLE="Object Oriented Programming",
+        EFTLS=0.125,
+        CRITICAL_DATES=CriticalDates(CENSUS_DT="", LAST_DAY="", LAST_DAY_TO_WF="", LAST_DAY_TO_WFN=""),
+    )
+    return msgspec.convert(fields, CourseDetail)
+
+
+def class_info(class_nbr: str, days: str) -> ClassInfo:
+    meeting = Meetings(dates="26 Feb - 31 May", days=days, start_time="9am", end_time="10am", location="Hub")
+    return ClassInfo(
+        class_nbr=class_nbr,
+        section="LE01",
+        size=10,
+        enrolled=0,
+        available=10,
+        institution="UOFAD",
+        component="",
+        meetings=[meeting],
+    )
+
+
+def test_export_calendar(monkeypatch: pytest.MonkeyPatch) -> None:
+    version = {"class_list": "1"}
+
+    async def course_class_list(course_id: str, course_offer_number: int, term: int, session: int) -> list[Group]:
+        record_etag(f"class-list-{version['class_list']}")
+        return [Group(type="Lecture", classes=[class_info("10001", "Monday"), class_info("10002", "Friday")])]
+
+    async def term(year: int) -> list[Term]:
+        return [Term(TERM="4410", DESCR="Semester 1", ACAD_YEAR=str(year), CURRENT="Y")]
+
+    async def detail(course_id: str, course_offer_number: int, term: int, year: int) -> CourseDetail:
+        record_etag("detail")
+        return course_detail()
+
+    proxy_service = ProxyQueryService(None, ProxySettings())  # type: ignore[arg-type]
+    monkeypatch.setattr(proxy_service, "course_class_list", course_class_list)
+    monkeypatch.setattr(proxy_service, "term", term)
+    monkeypatch.setattr(proxy_service, "course_detail", detail)
+    app = Litestar([CalendarController], state=State({PROXY_SERVICE_STATE_KEY: proxy_service}))
+    url = "/calendar/export.ics?term=4410&course=107592:1&classNbr=10002&classNbr=99999"
+    with TestClient(app) as client:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/calendar")
+        body = response.content
+        assert body.count(b"BEGIN:VEVENT") == 1
+        assert b"SUMMARY:COMP SCI 1102 Lecture\r\n" in body
+        assert b"UID:4410-10002-0@calendar_be\r\n" in body
+        assert b"DTSTART;TZID=Australia/Adelaide:20240301T090000\r\n" in body
+        assert b"RRULE:FREQ=WEEKLY;COUNT=14\r\n" in body
+        assert b"X-WR-CALNAME:Timetable Semester 1\r\n" in body
+
+        # The same selection in another order is served from the cache, until the class list changes
+        again = client.get("/calendar/export.ics?term=4410&classNbr=99999&classNbr=10002&course=107592:1")
+        assert again.content == body
+        assert proxy_service.responses.hits == 1
+        assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+        version["class_list"] = "2"
+        assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 200
+        assert proxy_service.responses.hits == 2
+
+        assert client.get("/calendar/export.ics?term=4410&course=107592&classNbr=1").status_code == 400
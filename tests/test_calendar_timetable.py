@@ -0,0 +1,326 @@
+import itertools
+import json
+import random
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import msgspec
+import pytest
+
+from src.config.base import ProxySettings, TimetableSettings
+from src.controller.calendar.bitset import clash_matrix, occupancy
+from src.controller.calendar.meetings import TermCalendar, parse_meeting
+from src.controller.calendar.parallel import ParallelRankedSearch, TimetablePool
+from src.controller.calendar.schema import (
+    RankedTimetableRequest,
+    RankedTimetableResult,
+    TimetableCourse,
+    TimetablePreferences,
+    TimetableRequest,
+)
+from src.controller.calendar.services import TimetableService, build_components
+from src.controller.calendar.solver import Component, Option, RankedSearch, Slot, search
+from src.controller.proxy.schema import ClassInfo, Group, Meetings, Term
+
+CALENDAR = TermCalendar(term="4410", year=2024)
+
+
+def meeting(days: str, start_time: str, end_time: str, dates: str = "26 Feb - 31 May") -> Meetings:
+    return Meetings(dates=dates, days=days, start_time=start_time, end_time=end_time, location="")
+
+
+def class_info(class_nbr: str, *meetings: Meetings, available: int = 10) -> ClassInfo:
+    return ClassInfo(
+        class_nbr=class_nbr,
+        section=f"S{class_nbr}",
+        size=10,
+        enrolled=10 - available,
+        available=available,
+        institution="UOFAD",
+        component="",
+        meetings=list(meetings),
+    )
+
+
+def slots(meeting: Meetings) -> list[Slot]:
+    return [Slot.from_interval(interval) for interval in parse_meeting(meeting, CALENDAR)]
+
+
+def test_parse_meeting() -> None:
+    (slot,) = slots(meeting("Monday", "10am", "12:30pm", "26 Feb - 02 Apr"))
+    assert (slot.day, slot.start, slot.end) == (0, 600, 750)
+    assert slot.last_day - slot.first_day == 36
+    assert [slot.day for slot in slots(meeting("Tuesday, Thursday", "12pm", "1pm"))] == [1, 3]
+    assert slots(meeting("", "", "")) == []
+    assert slots(meeting("Online", "TBA", "TBA")) == []
+
+    first_half = slots(meeting("Monday", "9am", "10am", "26 Feb - 05 Apr"))[0]
+    second_half = slots(meeting("Monday", "9am", "10am", "22 Apr - 31 May"))[0]
+    assert not first_half.clashes(second_half)
+    assert first_half.clashes(slots(meeting("Monday", "9:30am", "11am", "not a date"))[0])
+
+
+def test_parse_meeting_ranges_and_lines() -> None:
+    split = parse_meeting(meeting("Monday", "9am", "10am", "26 Feb - 05 Apr, 22 Apr - 31 May"), CALENDAR)
+    assert [(interval.first, interval.last) for interval in split] == [
+        (date(2024, 2, 26), date(2024, 4, 5)),
+        (date(2024, 4, 22), date(2024, 5, 31)),
+    ]
+    assert len(list(split[0].occurrences())) == 6
+
+    lines = parse_meeting(meeting("Monday\nFriday", "9am\n2pm", "10am\n4pm", "26 Feb - 31 May"), CALENDAR)
+    assert [(interval.weekday, interval.start_minutes, interval.end_minutes) for interval in lines] == [
+        (0, 540, 600),
+        (4, 840, 960),
+    ]
+
+    (summer,) = parse_meeting(meeting("Wednesday", "9am", "5pm", "09 Dec - 07 Feb"), CALENDAR)
+    assert (summer.first_occurrence, summer.last_occurrence) == (date(2024, 12, 11), date(2025, 2, 5))
+    (later,) = parse_meeting(meeting("Wednesday", "9am", "5pm", "09 Dec - 07 Feb"), TermCalendar("4510", 2025))
+    assert later.first.year == 2025
+
+
+def test_parse_meeting_is_cached() -> None:
+    first = parse_meeting(meeting("Thursday", "3pm", "4pm", "01 Mar - 30 Apr"), CALENDAR)
+    again = parse_meeting(meeting("Thursday", "3pm", "4pm", "01 Mar - 30 Apr"), CALENDAR)
+    assert first is again
+    assert first != parse_meeting(meeting("Thursday", "3pm", "4pm", "01 Mar - 30 Apr"), TermCalendar("4510", 2025))
+
+
+def test_term_calendar_from_terms() -> None:
+    terms = [
+        Term(TERM="4410", DESCR="Semester 1", ACAD_YEAR="2024", CURRENT="Y"),
+        Term(TERM="4420", DESCR="Semester 2", ACAD_YEAR="2024", CURRENT="N"),
+    ]
+    calendars = TermCalendar.from_terms(terms)
+    assert calendars["4420"] == TermCalendar(term="4420", year=2024, description="Semester 2")
+
+
+def random_components(rng: random.Random, courses: int, components: int, options: int) -> list[Component]:
+    result = []
+    for course in range(courses):
+        for component in range(components):
+            choices = []
+            for option in range(options):
+                day, hour = rng.randrange(5), rng.randrange(8, 18)
+                slot = Slot(day, hour * 60, (hour + rng.choice((1, 2))) * 60, 1, 366)
+                choices.append(Option(class_nbrs=(f"{course}{component}{option}",), section="", slots=(slot,)))
+            result.append(Component(course_id=str(course), name=str(component), options=tuple(choices)))
+    return result
+
+
+def brute_force(components: list[Component]) -> set[tuple[Option, ...]]:
+    return {
+        timetable
+        for timetable in itertools.product(*(component.options for component in components))
+        if not any(a.clashes(b) for x, y in itertools.combinations(timetable, 2) for a in x.slots for b in y.slots)
+    }
+
+
+def test_search_finds_every_timetable() -> None:
+    rng = random.Random(16)
+    for _ in range(20):
+        components = random_components(rng, courses=3, components=2, options=4)
+        result = search(components, max_results=10_000)
+        assert result.complete
+        assert len(result.timetables) == len(set(result.timetables))
+        assert set(result.timetables) == brute_force(components)
+
+
+def test_search_prunes_dead_ends() -> None:
+    # Six components competing for five slots: 5**6 combinations, none of which is clash-free
+    options = tuple(
+        Option(class_nbrs=(str(hour),), section="", slots=(Slot(0, hour * 60, hour * 60 + 60, 1, 366),))
+        for hour in range(9, 14)
+    )
+    components = [Component(course_id=str(course), name="Lecture", options=options) for course in range(6)]
+    result = search(components, max_results=10)
+    assert result.complete
+    assert result.timetables == []
+    assert result.nodes < 1000
+
+
+def test_search_stops_at_max_results_and_deadline() -> None:
+    components = random_components(random.Random(1), courses=5, components=4, options=6)
+    result = search(components, max_results=3)
+    assert len(result.timetables) == 3
+    assert not result.complete
+
+    started = time.monotonic()
+    result = search(components, max_results=10**9, deadline=started + 0.05)
+    assert time.monotonic() - started < 1
+    assert not result.complete
+
+
+def test_build_components_merges_identical_classes() -> None:
+    groups = [
+        Group(
+            type="Lecture",
+            classes=[
+                class_info("1", meeting("Monday", "9am", "10am")),
+                class_info("2", meeting("Monday", "9am", "10am")),
+                class_info("3", meeting("Friday", "9am", "10am"), available=0),
+            ],
+        ),
+        Group(type="Tutorial", classes=[class_info("4", meeting("Monday", "9am", "10am"))]),
+    ]
+    lecture, tutorial = build_components("000001", groups, CALENDAR)
+    (option,) = lecture.options
+    assert option.class_nbrs == ("1", "2")
+    assert len(build_components("000001", groups, CALENDAR, include_full=True)[0].options) == 2
+    assert search([lecture, tutorial], max_results=10).timetables == []
+
+
+def test_build_components_orders_meetings() -> None:
+    groups = [
+        Group(
+            type="Lecture",
+            classes=[
+                class_info("1", meeting("Wednesday", "2pm", "3pm"), meeting("Monday", "9am", "10am")),
+                class_info("2", meeting("Monday", "9am", "10am"), meeting("Wednesday", "2pm", "3pm")),
+            ],
+        )
+    ]
+    ((option,),) = (component.options for component in build_components("000001", groups, CALENDAR))
+    assert option.class_nbrs == ("1", "2")
+    assert [(slot.day, slot.start) for slot in option.slots] == [(0, 540), (2, 840)]
+
+
+def score(timetable: tuple[Option, ...], preferences: TimetablePreferences) -> float:
+    slots = [slot for option in timetable for slot in option.slots]
+    days = {slot.day for slot in slots}
+    hours = (
+        sum(
+            max(slot.end for slot in slots if slot.day == day) - min(slot.start for slot in slots if slot.day == day)
+            for day in days
+        )
+        / 60
+    )
+    early = sum(slot.start < (preferences.avoid_before or 0) * 60 for slot in slots)
+    return preferences.early_penalty * early + preferences.day_penalty * len(days) + preferences.span_penalty * hours
+
+
+def test_ranked_search_finds_best_timetables() -> None:
+    rng = random.Random(18)
+    preferences = TimetablePreferences(avoid_before=10)
+    for _ in range(10):
+        components = random_components(rng, courses=3, components=2, options=4)
+        expected = sorted(score(timetable, preferences) for timetable in brute_force(components))[:5]
+        ranked = RankedSearch(components, preferences, top_k=5)
+        found = [found_score for found_score, _ in ranked]
+        assert ranked.complete
+        assert [entry[0] for entry in ranked.best] == pytest.approx(expected)
+        assert all(found_score == pytest.approx(score(t, preferences)) for found_score, t in ranked.best)
+        # Timetables are yielded as they enter the best found so far, the first one after a single dive
+        assert len(found) >= len(expected)
+
+
+def test_ranked_search_stops_at_deadline() -> None:
+    components = random_components(random.Random(1), courses=8, components=4, options=8)
+    ranked = RankedSearch(components, TimetablePreferences(), top_k=10, deadline=time.monotonic() + 0.05)
+    started = time.monotonic()
+    found = list(ranked)
+    assert time.monotonic() - started < 1
+    assert found
+    assert not ranked.complete
+
+
+def class_lists_service(class_lists: dict[str, list[Group]]) -> TimetableService:
+    async def course_class_list(course_id: str, course_offer_number: int, term: int, session: int) -> list[Group]:
+        return class_lists[course_id]
+
+    async def term(year: int) -> list[Term]:
+        return [Term(TERM="4410", DESCR="Semester 1", ACAD_YEAR=str(year), CURRENT="Y")]
+
+    proxy_service = SimpleNamespace(course_class_list=course_class_list, term=term, config=ProxySettings())
+    return TimetableService(proxy_service)  # type: ignore[arg-type]
+
+
+async def test_generate_timetables() -> None:
+    class_lists = {
+        "1": [
+            Group(type="Lecture", classes=[class_info("11", meeting("Monday", "9am", "11am"))]),
+            Group(
+                type="Workshop",
+                classes=[
+                    class_info("12", meeting("Tuesday", "9am", "10am")),
+                    class_info("13", meeting("Wednesday", "9am", "10am")),
+                ],
+            ),
+        ],
+        "2": [
+            Group(
+                type="Lecture",
+                classes=[
+                    class_info("21", meeting("Monday", "10am", "11am")),
+                    class_info("22", meeting("Tuesday", "9am", "11am")),
+                ],
+            )
+        ],
+    }
+
+    service = class_lists_service(class_lists)
+    result = await service.generate(
+        TimetableRequest(courses=[TimetableCourse("1", 1, 4410), TimetableCourse("2", 1, 4410)])
+    )
+    assert result.complete
+    assert [[c.class_nbr for c in timetable.classes] for timetable in result.timetables] == [["11", "13", "22"]]
+
+
+def test_clash_matrix_matches_slot_clashes() -> None:
+    rng = random.Random(17)
+    sections = []
+    for _ in range(60):
+        slots = []
+        for _ in range(rng.randrange(3)):
+            day, start, first_day = rng.randrange(5), rng.randrange(480, 1200), rng.randrange(1, 300)
+            slots.append(Slot(day, start, start + rng.randrange(5, 120), first_day, first_day + rng.randrange(60)))
+        sections.append(tuple(slots))
+    masks = occupancy(sections)
+    assert masks.shape[1] < 64
+    clashes = clash_matrix(masks)
+    for i, j in itertools.product(range(len(sections)), repeat=2):
+        expected = any(a.clashes(b) for a in sections[i] for b in sections[j])
+        assert clashes[i, j] == expected
+
+
+async def test_rank_timetables_streams_ndjson() -> None:
+    lectures = [class_info("1", meeting("Monday", "8am", "9am")), class_info("2", meeting("Tuesday", "10am", "11am"))]
+    tutorials = [
+        class_info("3", meeting("Tuesday", "11am", "12pm")),
+        class_info("4", meeting("Friday", "10am", "11am")),
+    ]
+    groups = [Group(type="Lecture", classes=lectures), Group(type="Tutorial", classes=tutorials)]
+    service = class_lists_service({"1": groups})
+    request = RankedTimetableRequest(
+        courses=[TimetableCourse("1", 1, 4410)], preferences=TimetablePreferences(avoid_before=9)
+    )
+    lines = [json.loads(line) async for line in await service.rank(request)]
+    assert all(line["kind"] == "timetable" for line in lines[:-1])
+    result = msgspec.convert(lines[-1], RankedTimetableResult)
+    assert result.complete
+    assert [[c.class_nbr for c in timetable.classes] for timetable in result.timetables] == [
+        ["2", "3"],
+        ["2", "4"],
+        ["1", "3"],
+        ["1", "4"],
+    ]
+    assert lines[0]["classes"] == msgspec.to_builtins(result.timetables[0].classes)
+
+
+async def test_parallel_ranked_search_matches_ranked_search() -> None:
+    pool = TimetablePool(TimetableSettings(WORKERS=2, PARALLEL_MIN_OPTIONS=0))
+    preferences = TimetablePreferences(avoid_before=10)
+    try:
+        for seed in range(3):
+            components = random_components(random.Random(seed), courses=4, components=3, options=5)
+            ranked = RankedSearch(components, preferences, top_k=5)
+            list(ranked)
+            parallel = ParallelRankedSearch(pool, components, preferences, 5, time.monotonic() + 30)
+            found = [entry async for entry in parallel]
+            assert found
+            assert parallel.complete
+            assert [score for score, _ in parallel.best] == pytest.approx([score for score, _ in ranked.best])
+    finally:
+        pool.close()
@@ -0,0 +1,52 @@
+import msgspec
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.controller.catalogue.schema import SeatCount
+from src.controller.catalogue.services import ClassSectionService
+from src.controller.proxy.schema import ClassInfo, Group
+
+
+def class_info(class_nbr: str, enrolled: int, size: int = 100) -> ClassInfo:
+    return ClassInfo(
+        class_nbr=class_nbr,
+        section=f"LE{class_nbr}",
+        size=size,
+        enrolled=enrolled,
+        available=size - enrolled,
+        institution="UOFAD",
+        component="Lecture",
+        meetings=[],
+    )
+
+
+async def test_apply_class_list_writes_only_changes(session: AsyncSession) -> None:
+    service = ClassSectionService(session=session)
+    first = await service.apply_class_list(
+        "000001", "1", "4410", [Group(type="Lecture", classes=[class_info("1", 10), class_info("2", 20)])]
+    )
+    assert [(change.kind, change.class_nbr) for change in first.changes] == [("added", "1"), ("added", "2")]
+
+    statements: list[str] = []
+    event.listen(session.sync_session.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    second = await service.apply_class_list(
+        "000001", "1", "4410", [Group(type="Lecture", classes=[class_info("1", 10), class_info("3", 0)])]
+    )
+    assert second.unchanged == 1
+    assert [msgspec.to_builtins(change) for change in second.changes] == [
+        {"kind": "added", "groupType": "Lecture", "classNbr": "3", "section": "LE3", "old": None,
+         "new": {"size": 100, "enrolled": 0, "available": 100}},
+        {"kind": "removed", "groupType": "Lecture", "classNbr": "2", "section": "LE2",
+         "old": {"size": 100, "enrolled": 20, "available": 80}, "new": None},
+    ]  # fmt: skip
+    assert not any(statement.startswith("UPDATE") for statement in statements)
+
+    third = await service.apply_class_list(
+        "000001", "1", "4410", [Group(type="Lecture", classes=[class_info("1", 11), class_info("3", 0)])]
+    )
+    (change,) = third.changes
+    assert change.kind == "changed"
+    assert change.old == SeatCount(size=100, enrolled=10, available=90)
+    assert change.new == SeatCount(size=100, enrolled=11, available=89)
+    assert third.unchanged == 1
+    assert await service.count() == 2
@@ -0,0 +1,82 @@
+import pytest
+from litestar.exceptions import ServiceUnavailableException
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.controller.catalogue.services import CourseDetailService
+from src.db.models.course_detail import CourseDetail
+
+
+def detail(course_id: str, subject: str, catalog_nbr: str, title: str, syllabus: str) -> CourseDetail:
+    return CourseDetail(
+        course_id=course_id,
+        course_offer_nbr="1",
+        term="4410",
+        year="2024",
+        subject=subject,
+        catalog_nbr=catalog_nbr,
+        course_title=title,
+        syllabus=syllabus,
+        assumed_knowledge="",
+        data={},
+    )
+
+
+async def test_search_text_ranks_title_matches_first(session: AsyncSession) -> None:
+    service = CourseDetailService(session=session)
+    await service.create_many(
+        [
+            detail("1", "COMP SCI", "1001", "Puzzle Based Learning", "Introduces programming through puzzles."),
+            detail("2", "COMP SCI", "1102", "Object Oriented Programming", "Classes and objects."),
+            detail("3", "MATHS", "1011", "Mathematics IA", "Calculus."),
+        ]
+    )
+    await session.flush()
+
+    hits = await service.search_text("program")
+    assert [hit.course_id for hit in hits] == ["2", "1"]
+    assert hits[0].rank > hits[1].rank
+    assert [hit.course_id for hit in await service.search_text("comp 1102")] == ["2"]
+    assert await service.search_text("program", term="4420") == []
+    assert await service.search_text('"') == []
+
+
+async def test_search_on_unsupported_database(session: AsyncSession, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(session.get_bind().dialect, "name", "mysql")
+    with pytest.raises(ServiceUnavailableException):
+        await CourseDetailService(session=session).search_text("program")
+
+
+async def test_search_index_follows_updates(session: AsyncSession) -> None:
+    service = CourseDetailService(session=session)
+    model = await service.create(detail("1", "COMP SCI", "1001", "Puzzle Based Learning", ""))
+    await session.flush()
+
+    model.course_title = "Algorithm Design"
+    await session.flush()
+    assert await service.search_text("puzzle") == []
+    assert [hit.course_id for hit in await service.search_text("algorithm")] == ["1"]
+
+    await service.delete(model.id)
+    await session.flush()
+    assert await service.search_text("algorithm") == []
+
+
+async def test_search_index_survives_vacuum(session: AsyncSession) -> None:
+    service = CourseDetailService(session=session)
+    models = await service.create_many(
+        [detail(str(index), "COMP SCI", f"100{index}", f"Course {index}", "Programming.") for index in range(3)]
+    )
+    await service.delete(models[0].id)
+    await session.commit()
+    engine = session.bind
+    assert isinstance(engine, AsyncEngine)
+    async with engine.connect() as connection:
+        await (await connection.execution_options(isolation_level="AUTOCOMMIT")).exec_driver_sql("VACUUM")
+
+    assert sorted(hit.course_id for hit in await service.search_text("programming")) == ["1", "2"]
+    models[1].course_title = "Algorithm Design"
+    await session.flush()
+    assert [hit.course_id for hit in await service.search_text("algorithm")] == ["1"]
+    await service.delete(models[2].id)
+    await session.flush()
+    assert [hit.course_id for hit in await service.search_text("programming")] == ["1"]
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from types import SimpleNamespace
+
+import msgspec
+import pytest
+from advanced_alchemy.base import orm_registry
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.testing import TestClient
+from litestar.types import ASGIApp, Receive, Scope, Send
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+import src.controller.catalogue.services as catalogue_services
+from src.config.base import ProxySettings
+from src.config.constants import CATALOGUE_SYNC_JOB_STATE_KEY, PROXY_SERVICE_STATE_KEY
+from src.controller.catalogue.router import CatalogueController
+from src.controller.catalogue.schema import CatalogueSyncStatus, ClassListChangeSet
+from src.controller.catalogue.services import (
+    CatalogueSyncJob,
+    CatalogueSyncService,
+    ClassSectionService,
+    CourseDetailService,
+    CourseOfferingService,
+)
+from src.controller.proxy.schema import ClassInfo, CourseDetail, CourseSearch, Group, Subject, Term
+from src.controller.proxy.services import ProxyQueryService
+
+
+def offering(subject: str, course_id: str, class_nbr: str) -> CourseSearch:
+    fields = {field: "" for field in CourseSearch.__struct_fields__}
+    fields.update(SUBJECT=subject, COURSE_ID=course_id, COURSE_OFFER_NBR="1", CLASS_NBR=class_nbr, YEAR="2024")
+    fields.update(TERM="4410", COURSE_TITLE=f"Course {course_id}")
+    return CourseSearch(**fields)
+
+
+class Upstream:
+    """Fake courseplanner-api behind the query methods the catalogue sync uses."""
+
+    def __init__(self) -> None:
+        self.pages = {
+            "COMP SCI": [[offering("COMP SCI", "1", "10001")], [offering("COMP SCI", "1", "10002")]],
+            "MATHS": [[offering("MATHS", "2", "20001")]],
+        }
+        self.broken: set[str] = {"BROKEN", "2"}
+        """Subjects and course ids whose queries fail"""
+        self.enrolled = {"1": 10, "2": 20}
+
+    def proxy_service(self, monkeypatch: pytest.MonkeyPatch) -> ProxyQueryService:
+        service = ProxyQueryService(None, ProxySettings())  # type: ignore[arg-type]
+        for name in ("term", "subjects", "course_paginator", "course_detail", "course_class_list"):
+            monkeypatch.setattr(service, name, getattr(self, name))
+        return service
+
+    async def term(self, year: int) -> list[Term]:
+        if "TERM" in self.broken:
+            raise RuntimeError("upstream failed")
+        return [Term(TERM="4410", DESCR="Semester 1", ACAD_YEAR=str(year), CURRENT="Y")]
+
+    async def subjects(self, year: int) -> list[Subject]:
+        return [Subject(SUBJECT=subject, DESCR=subject) for subject in ("COMP SCI", "MATHS", "BROKEN")]
+
+    async def course_paginator(
+        self, subject_areas: str, year: int, page_size: int, prefetch: int
+    ) -> AsyncIterator[SimpleNamespace]:
+        if subject_areas in self.broken:
+            raise RuntimeError("upstream failed")
+
+        async def pages() -> AsyncIterator[SimpleNamespace]:
+            for page in self.pages[subject_areas]:
+                await asyncio.sleep(0)
+                yield SimpleNamespace(data=page)
+
+        return pages()
+
+    async def course_detail(self, course_id: str, course_offer_number: int, term: int, year: int) -> CourseDetail:
+        if course_id in self.broken:
+            raise RuntimeError("upstream failed")
+        fields: dict[str, object] = {field: "" for field in CourseDetail.__struct_fields__}
+        fields.update(COURSE_ID=course_id, COURSE_TITLE=f"Course {course_id}", SUBJECT="COMP SCI", EFTLS=0.125)
+        fields["CRITICAL_DATES"] = {"CENSUS_DT": "", "LAST_DAY": "", "LAST_DAY_TO_WF": "", "LAST_DAY_TO_WFN": ""}
+        return msgspec.convert(fields, CourseDetail)
+
+    async def course_class_list(self, course_id: str, course_offer_number: int, term: int) -> list[Group]:
+        enrolled = self.enrolled[course_id]
+        class_info = ClassInfo(
+            class_nbr=f"{course_id}0001",
+            section="LE01",
+            size=100,
+            enrolled=enrolled,
+            available=100 - enrolled,
+            institution="UOFAD",
+            component="Lecture",
+            meetings=[],
+        )
+        return [Group(type="Lecture", classes=[class_info])]
+
+
+async def test_sync_mirrors_a_year(session: AsyncSession, monkeypatch: pytest.MonkeyPatch) -> None:
+    upstream = Upstream()
+    sync_service = CatalogueSyncService(upstream.proxy_service(monkeypatch), session)
+    status = await sync_service.sync(2024, CatalogueSyncStatus())
+    await session.commit()
+    assert (status.terms, status.subjects, status.failed_subjects) == (1, 3, 1)
+    assert (status.offerings, status.details, status.failed_details) == (3, 1, 1)
+    assert (status.class_lists, status.changed_class_sections, status.failed_class_lists) == (2, 2, 0)
+    assert [change_set.course_id for change_set in sync_service.change_sets] == ["1", "2"]
+    assert await CourseOfferingService(session=session).count() == 3
+    assert await CourseDetailService(session=session).count() == 1
+    assert await ClassSectionService(session=session).count() == 2
+
+    # A subject that fails to download keeps its previously mirrored rows
+    upstream.broken = {"BROKEN", "MATHS"}
+    status = await CatalogueSyncService(upstream.proxy_service(monkeypatch), session).sync(2024, CatalogueSyncStatus())
+    await session.commit()
+    assert (status.failed_subjects, status.offerings, status.details) == (2, 2, 1)
+    assert await CourseOfferingService(session=session).count() == 3
+    assert await CourseDetailService(session=session).count() == 1
+
+    upstream.enrolled["2"] = 21
+    sync_service = CatalogueSyncService(upstream.proxy_service(monkeypatch), session)
+    status = await sync_service.sync_class_lists(2024, CatalogueSyncStatus())
+    assert (status.class_lists, status.changed_class_sections) == (2, 1)
+    ((change_set, change),) = (
+        (change_set, change) for change_set in sync_service.change_sets for change in change_set.changes
+    )
+    assert (change_set.course_id, change.kind, change.new and change.new.enrolled) == ("2", "changed", 21)
+
+
+@pytest.fixture()
+async def engine(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'catalogue.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(orm_registry.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(catalogue_services, "alchemy", SimpleNamespace(get_session=session_maker))
+    yield engine
+    await engine.dispose()
+
+
+async def test_sync_job_runs_one_sync_at_a_time(engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch) -> None:
+    upstream = Upstream()
+    job = CatalogueSyncJob()
+    change_sets: list[ClassListChangeSet] = []
+
+    def broken(change_set: ClassListChangeSet) -> None:
+        raise ValueError(change_set.course_offer_nbr)
+
+    job.listeners.extend([broken, change_sets.append])
+    status = job.start(upstream.proxy_service(monkeypatch), 2024)
+    assert job.running
+    assert job.start(upstream.proxy_service(monkeypatch), 2024, "class_lists") is status
+    assert job._task is not None
+    await job._task
+    assert (status.state, status.mode, status.offerings) == ("succeeded", "full", 3)
+    assert status.finished_at is not None
+    # Listeners are told about changes once they are committed, even if another listener fails
+    assert [change_set.course_id for change_set in change_sets] == ["1", "2"]
+
+    upstream.broken.add("TERM")
+    failed = job.start(upstream.proxy_service(monkeypatch), 2024)
+    assert failed is not status
+    assert job._task is not None
+    await job._task
+    assert (failed.state, failed.error) == ("failed", "upstream failed")
+    assert len(change_sets) == 2
+    await job.close()
+
+
+def as_user(is_superuser: bool) -> Callable[[ASGIApp], ASGIApp]:
+    def middleware(app: ASGIApp) -> ASGIApp:
+        async def with_user(scope: Scope, receive: Receive, send: Send) -> None:
+            scope["user"] = SimpleNamespace(is_superuser=is_superuser)
+            await app(scope, receive, send)
+
+        return with_user
+
+    return middleware
+
+
+@pytest.mark.usefixtures("engine")
+def test_sync_route(monkeypatch: pytest.MonkeyPatch) -> None:
+    upstream = Upstream()
+    job = CatalogueSyncJob()
+    state = State({PROXY_SERVICE_STATE_KEY: upstream.proxy_service(monkeypatch), CATALOGUE_SYNC_JOB_STATE_KEY: job})
+    app = Litestar([CatalogueController], state=state, middleware=[as_user(is_superuser=True)])
+    with TestClient(app) as client:
+        response = client.post("/catalogue/sync", params={"year": 2024})
+        assert response.status_code == 202
+        assert response.json()["state"] == "running"
+        deadline = time.monotonic() + 5
+        while (status := client.get("/catalogue/sync").json())["state"] == "running" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert status["state"] == "succeeded"
+        assert status["classLists"] == 2
+
+    app = Litestar([CatalogueController], state=state, middleware=[as_user(is_superuser=False)])
+    with TestClient(app) as client:
+        assert client.post("/catalogue/sync").status_code == 403
+        assert client.get("/catalogue/sync").status_code == 403
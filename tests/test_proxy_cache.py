@@ -0,0 +1,147 @@
+import asyncio
+import gzip
+import time
+from pathlib import Path
+
+from litestar.stores.memory import MemoryStore
+
+from src.controller.proxy.cache import CacheEntry, MemoryCache, ProxyCache, ResponseCache, create_store
+from src.controller.proxy.schema import Subject
+from src.controller.proxy.store import SQLiteStore
+
+
+def make_entry(size: int, ttl: float = 60, stale_ttl: float = 0) -> CacheEntry:
+    expires_at = time.time() + ttl
+    return CacheEntry(value=None, size=size, expires_at=expires_at, stale_until=expires_at + stale_ttl)
+
+
+def test_memory_cache_evicts_least_recently_used() -> None:
+    cache = MemoryCache(max_entries=2, max_bytes=1000)
+    cache.set("a", make_entry(1))
+    cache.set("b", make_entry(1))
+    assert cache.get("a") is not None
+    cache.set("c", make_entry(1))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_memory_cache_is_bounded_by_size() -> None:
+    cache = MemoryCache(max_entries=10, max_bytes=100)
+    cache.set("a", make_entry(60))
+    cache.set("b", make_entry(60))
+    assert len(cache) == 1
+    assert cache.size == 60
+    cache.set("c", make_entry(200))
+    assert cache.get("c") is None
+    assert cache.get("b") is not None
+
+
+def test_memory_cache_keeps_stale_entries_until_evictable() -> None:
+    cache = MemoryCache(max_entries=10, max_bytes=100)
+    cache.set("a", make_entry(10, ttl=-1))
+    assert cache.get("a") is None
+    assert cache.size == 0
+    cache.set("b", make_entry(10, ttl=-1, stale_ttl=60))
+    entry = cache.get("b")
+    assert entry is not None
+    assert entry.expired
+
+
+async def test_proxy_cache_reads_through_shared_tier() -> None:
+    store = MemoryStore()
+    value = [Subject(SUBJECT="COMP SCI", DESCR="Computer Science")]
+    stored = await ProxyCache(MemoryCache(10, 10_000), store).set("key", value, ttl=60)
+
+    cache = ProxyCache(MemoryCache(10, 10_000), store)
+    entry = await cache.get("key", list[Subject])
+    assert entry is not None
+    assert entry.value == value
+    assert entry.etag == stored.etag
+    assert cache.store_hits == 1
+    assert await cache.get("key", list[Subject]) is not None
+    assert cache.hits == 1
+    assert await cache.get("other", list[Subject]) is None
+    assert cache.misses == 1
+
+
+async def test_proxy_cache_etag_follows_content() -> None:
+    cache = ProxyCache(MemoryCache(10, 10_000))
+    first = await cache.set("a", [Subject(SUBJECT="COMP SCI", DESCR="Computer Science")], ttl=60)
+    same = await cache.set("b", [Subject(SUBJECT="COMP SCI", DESCR="Computer Science")], ttl=30)
+    changed = await cache.set("a", [Subject(SUBJECT="COMP SCI", DESCR="Computing")], ttl=60)
+    assert first.etag == same.etag
+    assert first.etag != changed.etag
+
+
+def test_response_cache_keeps_gzip_copy_of_large_bodies() -> None:
+    cache = ResponseCache(max_entries=10, max_bytes=10_000, gzip_min_size=100)
+    small = cache.set("small", b"[]")
+    large = cache.set("large", b"[" + b'"subject",' * 100 + b"null]")
+    assert small.gzip is None
+    assert large.gzip is not None
+    assert gzip.decompress(large.gzip) == large.json
+    assert cache.memory.size == len(small.json) + len(large.json) + len(large.gzip)
+    assert cache.get("large") is large
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_sqlite_store_persists_and_expires(tmp_path: Path) -> None:
+    path = tmp_path / "cache" / "proxy.sqlite"
+    store = create_store(f"sqlite://{path}")
+    assert isinstance(store, SQLiteStore)
+    await store.set("a", b"1", expires_in=60)
+    await store.set("b", "2")
+    await store.set("c", b"3", expires_in=-1)
+    assert await store.get("a") == b"1"
+    assert await store.exists("b")
+    assert await store.expires_in("b") is None
+    assert 0 < (await store.expires_in("a") or 0) <= 60
+    assert await store.get("c") is None
+    await store.close()
+
+    # Values survive the store being reopened, by this or another process
+    reopened = SQLiteStore(path)
+    assert await reopened.get("a", renew_for=3600) == b"1"
+    assert (await reopened.expires_in("a") or 0) > 60
+    await reopened.delete("a")
+    assert not await reopened.exists("a")
+    assert await reopened.size() == 1
+    await reopened.delete_all()
+    assert await reopened.size() == 0
+    await reopened.close()
+
+
+async def test_sqlite_store_is_bounded_by_size(tmp_path: Path) -> None:
+    store = SQLiteStore(tmp_path / "proxy.sqlite", max_bytes=250)
+    await store.set("expired", b"x" * 100, expires_in=-1)
+    await store.set("a", b"x" * 100, expires_in=60)
+    await store.set("a", b"x" * 50, expires_in=60)
+    assert await store.size() == 150
+    # Expired values are dropped first, then just enough of the least recently read
+    await store.set("b", b"x" * 150, expires_in=60)
+    assert await store.exists("a")
+    assert await store.size() == 200
+    await store.set("c", b"x" * 100)
+    assert not await store.exists("a")
+    assert await store.size() == 250
+    await store.close()
+
+
+async def test_sqlite_store_is_shared_by_connections(tmp_path: Path) -> None:
+    path = tmp_path / "proxy.sqlite"
+    stores = [SQLiteStore(path, max_bytes=10_000) for _ in range(4)]
+    await asyncio.gather(
+        *(store.set(f"{i}:{key}", b"x" * 10, expires_in=60) for i, store in enumerate(stores) for key in range(50))
+    )
+    assert await stores[0].size() == 4 * 50 * 10
+    assert await stores[3].get("0:49") == b"x" * 10
+
+    value = [Subject(SUBJECT="COMP SCI", DESCR="Computer Science")]
+    await ProxyCache(MemoryCache(10, 10_000), stores[1]).set("key", value, ttl=60)
+    entry = await ProxyCache(MemoryCache(10, 10_000), stores[2]).get("key", list[Subject])
+    assert entry is not None
+    assert entry.value == value
+    for store in stores:
+        await store.close()
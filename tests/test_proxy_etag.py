@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+from litestar import Litestar, get, post
+from litestar.datastructures import State
+from litestar.testing import TestClient
+
+from src.config.base import ProxySettings
+from src.config.constants import PROXY_SERVICE_STATE_KEY
+from src.controller.proxy.cache import ResponseCache
+from src.controller.proxy.dependencies import provide_proxy_service
+from src.controller.proxy.etag import add_etag, record_etag, track_etags
+from src.controller.proxy.schema import Subject, SubjectDTO, Term
+from src.controller.proxy.services import ProxyQueryService
+
+SUBJECTS = [Subject(SUBJECT=f"SUBJ{i}", DESCR=f"Subject {i}") for i in range(50)]
+
+
+@get("/data")
+async def get_data(version: str = "1") -> list[str]:
+    record_etag(f"etag-{version}")
+    return [version]
+
+
+@get("/combined")
+async def get_combined() -> list[str]:
+    record_etag("a")
+    record_etag("b")
+    return ["a", "b"]
+
+
+@get("/reordered")
+async def get_reordered() -> list[str]:
+    record_etag("b")
+    record_etag("a")
+    record_etag("b")
+    return ["a", "b"]
+
+
+@get("/uncached")
+async def get_uncached() -> list[str]:
+    return []
+
+
+@get("/subjects", return_dto=SubjectDTO)
+async def get_subjects(version: str = "1") -> list[Subject]:
+    record_etag(f"subjects-{version}")
+    return SUBJECTS if version == "1" else SUBJECTS[:1]
+
+
+@post("/data", status_code=200)
+async def post_data() -> list[str]:
+    record_etag("etag-1")
+    return []
+
+
+app = Litestar(
+    [get_data, get_combined, get_reordered, get_uncached, get_subjects, post_data],
+    before_request=track_etags,
+    after_request=add_etag,
+    state=State({PROXY_SERVICE_STATE_KEY: SimpleNamespace(responses=ResponseCache(100, 1_000_000))}),
+)
+
+
+def test_conditional_get() -> None:
+    with TestClient(app) as client:
+        response = client.get("/data")
+        assert response.headers["etag"] == '"etag-1"'
+        not_modified = client.get("/data", headers={"If-None-Match": '"other", W/"etag-1"'})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == '"etag-1"'
+        assert client.get("/data?version=2", headers={"If-None-Match": '"etag-1"'}).status_code == 200
+
+
+def test_etag_only_for_get_responses_built_from_cached_data() -> None:
+    with TestClient(app) as client:
+        combined = client.get("/combined").headers["etag"]
+        assert combined not in ('"a"', '"b"')
+        assert client.get("/combined", headers={"If-None-Match": combined}).status_code == 304
+        # Independent of the order and number of times the data was read
+        assert client.get("/reordered").headers["etag"] == combined
+        assert "etag" not in client.get("/uncached").headers
+        response = client.post("/data", headers={"If-None-Match": '"etag-1"'})
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+
+
+def test_encoded_response_cache() -> None:
+    responses = app.state[PROXY_SERVICE_STATE_KEY].responses
+    with TestClient(app) as client:
+        first = client.get("/subjects", headers={"Accept-Encoding": "identity"})
+        assert first.json()[0] == {"subject": "SUBJ0", "descr": "Subject 0"}
+        compressed = client.get("/subjects", headers={"Accept-Encoding": "gzip"})
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.content == first.content
+        assert (responses.hits, responses.misses) == (1, 1)
+        assert client.get("/subjects?version=2").json() == [{"subject": "SUBJ0", "descr": "Subject 0"}]
+        assert responses.misses == 2
+
+
+@get("/mixed")
+async def get_mixed(state: State) -> list[str]:
+    proxy_service = provide_proxy_service(state)
+    terms = await proxy_service.term()
+    subjects = await proxy_service.subjects()
+    return [term.TERM for term in terms] + [subject.SUBJECT for subject in subjects]
+
+
+def test_no_etag_for_responses_using_uncached_data(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def call(param_builder: object, response_dto: type, extractor: str) -> SimpleNamespace:
+        if response_dto is Term:
+            return SimpleNamespace(data=[Term(TERM="4410", DESCR="Semester 1", ACAD_YEAR="2024", CURRENT="Y")])
+        return SimpleNamespace(data=SUBJECTS[:1])
+
+    # Subjects are not cached, terms are
+    proxy_service = ProxyQueryService(None, ProxySettings(CACHE_TTL={"SUBJECTS_BY_YEAR": 0}))  # type: ignore[arg-type]
+    monkeypatch.setattr(proxy_service, "_call", call)
+    mixed_app = Litestar(
+        [get_mixed],
+        before_request=track_etags,
+        after_request=add_etag,
+        state=State({PROXY_SERVICE_STATE_KEY: proxy_service}),
+    )
+    with TestClient(mixed_app) as client:
+        for _ in range(2):
+            response = client.get("/mixed")
+            assert response.status_code == 200
+            assert "etag" not in response.headers
@@ -0,0 +1,94 @@
+import asyncio
+
+import msgspec
+import pytest
+
+from src.controller.proxy.helpers import Paginator, ParamsBuilder, ResponseParser, SingleFlight
+from src.controller.proxy.schema import Group, Subject
+
+
+def make_body(rows: list[dict], status: str = "success") -> bytes:
+    return msgspec.json.encode(
+        {"status": status, "data": {"query": {"num_rows": len(rows), "total_rows": 40, "rows": rows}}}
+    )
+
+
+def test_params_key_is_order_independent() -> None:
+    first = ParamsBuilder(target="A", term=4410, year=2024)
+    second = ParamsBuilder(year=2024, term=4410, target="A")
+    assert first.params != second.params
+    assert first.key == second.key
+
+
+async def test_single_flight_coalesces_concurrent_calls() -> None:
+    calls = 0
+
+    async def fetch() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    single_flight = SingleFlight()
+    results = await asyncio.gather(*(single_flight.do("key", fetch) for _ in range(10)))
+    assert results == [42] * 10
+    assert calls == 1
+    assert single_flight.calls == 1
+    assert single_flight.coalesced == 9
+
+    assert await single_flight.do("key", fetch) == 42
+    assert calls == 2
+
+
+def test_decode_rows_skips_unknown_fields() -> None:
+    body = make_body([{"attr:rownumber": 1, "SUBJECT": "COMP SCI", "DESCR": "Computer Science"}])
+    result = ResponseParser.decode(body, Subject)
+    assert result.data == [Subject(SUBJECT="COMP SCI", DESCR="Computer Science")]
+    assert result.num_rows == 1
+    assert result.total_rows == 40
+
+
+def test_decode_groups() -> None:
+    group = {"type": "Lecture", "classes": []}
+    result = ResponseParser.decode(make_body([{"groups": [group]}]), Group, extractor="groups")
+    assert result.data == [Group(type="Lecture", classes=[])]
+    assert ResponseParser.decode(make_body([]), Group, extractor="groups").data == []
+
+
+def test_decode_unsuccessful_query() -> None:
+    with pytest.raises(Exception, match="unsuccessful"):
+        ResponseParser.decode(make_body([], status="error"), Subject)
+    with pytest.raises(Exception, match="unsuccessful"):
+        ResponseParser.decode(b'{"status": "error", "data": "bad request"}', Subject)
+
+
+@pytest.mark.parametrize("prefetch", [0, 3])
+async def test_paginator_yields_pages_in_order(prefetch: int) -> None:
+    from aiohttp import ClientSession, web
+    from aiohttp.test_utils import TestServer
+
+    total_rows, page_size = 110, 25
+    in_flight = max_in_flight = 0
+
+    async def handler(request: web.Request) -> web.Response:
+        nonlocal in_flight, max_in_flight
+        page_number = int(request.query["pagenbr"])
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # Later pages answer faster to check that ordering does not depend on arrival
+        await asyncio.sleep(0.05 / page_number)
+        in_flight -= 1
+        start = (page_number - 1) * page_size
+        rows = [{"SUBJECT": str(i), "DESCR": ""} for i in range(start, min(start + page_size, total_rows))]
+        return web.Response(body=make_body(rows).replace(b'"total_rows":40', f'"total_rows":{total_rows}'.encode()))
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    async with TestServer(app) as server, ClientSession() as client:
+        paginator = Paginator(
+            client, str(server.make_url("/")), ParamsBuilder(target="A"), Subject, page_size, prefetch
+        )
+        subjects = [row.SUBJECT async for page in paginator for row in page.data]
+
+    assert subjects == [str(i) for i in range(total_rows)]
+    assert max_in_flight == (min(prefetch, 4) if prefetch else 1)
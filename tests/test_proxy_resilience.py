@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+from src.controller.proxy.resilience import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    LatencyWindow,
+    TokenBucket,
+    hedge,
+    is_upstream_failure,
+)
+
+
+async def test_token_bucket_limits_rate() -> None:
+    bucket = TokenBucket(rate=100, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    assert time.monotonic() - start >= 0.035
+
+
+async def test_adaptive_limiter_aimd() -> None:
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=8, latency_target=1)
+    started = [await limiter.acquire() for _ in range(4)]
+    # Failures of requests started before the first decrease back off once
+    for started_at in started:
+        await limiter.release(started_at, ok=False)
+    assert limiter.limit == 4
+    for _ in range(4):
+        await limiter.release(await limiter.acquire(), ok=True)
+    assert 4.9 < limiter.limit < 5
+    limit = limiter.limit
+    await limiter.release(await limiter.acquire(), ok=None)
+    assert limiter.limit == limit
+    assert limiter.in_flight == 0
+
+
+async def test_adaptive_limiter_bounds_in_flight() -> None:
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=2, latency_target=1)
+    await limiter.acquire()
+    await limiter.acquire()
+    with pytest.raises(TimeoutError):
+        async with asyncio.timeout(0.01):
+            await limiter.acquire()
+
+
+def state(breaker: CircuitBreaker) -> str:
+    # Read through a call so that mypy does not narrow the state across transitions
+    return breaker.state
+
+
+def test_circuit_breaker_transitions() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.01)
+    breaker.record(ok=False)
+    assert state(breaker) == "closed"
+    breaker.record(ok=False)
+    assert state(breaker) == "open"
+    assert not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.probing
+    assert not breaker.allow()
+    breaker.record(ok=False, probe=True)
+    assert state(breaker) == "open"
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record(ok=True, probe=True)
+    assert state(breaker) == "closed"
+    assert breaker.opens == 1
+
+
+def test_circuit_breaker_ignores_late_outcomes() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record(ok=False)
+    # A request sent before the circuit opened succeeds
+    breaker.record(ok=True)
+    assert state(breaker) == "open"
+    time.sleep(0.02)
+    assert breaker.allow()
+    # Another one fails while the probe is in flight
+    breaker.record(ok=False)
+    assert state(breaker) == "half_open"
+    assert breaker.probing
+    assert not breaker.allow()
+    breaker.record(ok=True, probe=True)
+    assert state(breaker) == "closed"
+
+
+def test_only_upstream_errors_count_as_failures() -> None:
+    def response_error(status: int) -> aiohttp.ClientResponseError:
+        return aiohttp.ClientResponseError(None, (), status=status)  # type: ignore[arg-type]
+
+    assert is_upstream_failure(response_error(503))
+    assert is_upstream_failure(response_error(429))
+    assert not is_upstream_failure(response_error(404))
+    assert is_upstream_failure(TimeoutError())
+    assert not is_upstream_failure(ValueError())
+
+
+async def test_hedge_falls_back_to_the_call_that_succeeds() -> None:
+    outcomes = iter([(0.02, ValueError("reset")), (0.03, None)])
+
+    async def call() -> str:
+        delay, error = next(outcomes)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return "ok"
+
+    assert await hedge(call, delay=0.01) == ("ok", True)
+
+
+def test_latency_window_quantile() -> None:
+    window = LatencyWindow(size=100, min_samples=10)
+    for latency in range(9):
+        window.add(latency)
+    assert window.quantile(0.95) is None
+    for latency in range(9, 200):
+        window.add(latency)
+    assert window.quantile(0.95) == 195
@@ -0,0 +1,296 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+import aiohttp
+import msgspec
+import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.exceptions import NotFoundException
+from litestar.testing import TestClient
+
+import src.controller.proxy.services as services
+from src.config.base import ProxySettings
+from src.config.constants import PROXY_SERVICE_STATE_KEY
+from src.controller.proxy.resilience import RetryPolicy, UpstreamUnavailableException
+from src.controller.proxy.router import ProxyController
+from src.controller.proxy.schema import ClassInfo, CourseDetail, CourseSearch, Group, Meetings
+from src.controller.proxy.services import ProxyQueryService
+
+
+class Upstream:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fail = False
+        self.fail_times = 0
+        self.delay = 0.0
+        self.delays: list[float] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        await asyncio.sleep(self.delays.pop(0) if self.delays else self.delay)
+        if self.fail or self.calls <= self.fail_times:
+            return web.Response(status=500)
+        rows = [{"CAMPUS": "NTRCE", "DESCR": f"North Terrace {self.calls}"}]
+        body = {"status": "success", "data": {"query": {"num_rows": 1, "total_rows": 1, "rows": rows}}}
+        return web.Response(body=msgspec.json.encode(body))
+
+
+@pytest.fixture()
+async def upstream(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[Upstream]:
+    upstream = Upstream()
+    app = web.Application()
+    app.router.add_get("/", upstream.handle)
+    async with TestServer(app) as server:
+        monkeypatch.setattr(services, "API_END_POINT", str(server.make_url("/")))
+        yield upstream
+
+
+@pytest.fixture()
+async def service(upstream: Upstream) -> AsyncIterator[ProxyQueryService]:
+    async with ClientSession() as client:
+        service = ProxyQueryService(client, ProxySettings())
+        yield service
+        await service.close()
+
+
+def expire(service: ProxyQueryService, seconds_ago: float) -> None:
+    for entry in service.cache.memory._entries.values():
+        entry.expires_at = time.time() - seconds_ago
+        entry.stale_until = entry.expires_at + service.config.CACHE_STALE_IF_ERROR
+
+
+async def test_cached_query(upstream: Upstream, service: ProxyQueryService) -> None:
+    first = await service.campus()
+    assert await service.campus() == first
+    assert upstream.calls == 1
+
+
+async def test_stale_while_revalidate(upstream: Upstream, service: ProxyQueryService) -> None:
+    await service.campus()
+    expire(service, 1)
+    upstream.delay = 0.05
+    stale = await asyncio.gather(*(service.campus() for _ in range(5)))
+    assert all(campus[0].DESCR == "North Terrace 1" for campus in stale)
+    assert service.stale_hits == 5
+    await asyncio.sleep(0.1)
+    assert upstream.calls == 2
+    assert (await service.campus())[0].DESCR == "North Terrace 2"
+
+
+async def test_stale_if_error(upstream: Upstream, service: ProxyQueryService) -> None:
+    await service.campus()
+    expire(service, service.config.CACHE_STALE_WHILE_REVALIDATE + 1)
+    upstream.fail = True
+    assert (await service.campus())[0].DESCR == "North Terrace 1"
+    assert service.stale_errors == 1
+
+
+async def test_retries_then_circuit_breaker_fails_fast(upstream: Upstream, service: ProxyQueryService) -> None:
+    upstream.fail = True
+    with pytest.raises(aiohttp.ClientResponseError):
+        await service.academic_career()
+    assert upstream.calls == 3
+    assert service.stats().retries == 2
+    # Two more failures reach the failure threshold, the last retry is rejected without calling upstream
+    with pytest.raises(UpstreamUnavailableException):
+        await service.academic_career()
+    assert service.guard.breaker.state == "open"
+    assert upstream.calls == 5
+    with pytest.raises(UpstreamUnavailableException):
+        await service.academic_career()
+    assert upstream.calls == 5
+    assert service.stats().rejected_calls == 2
+
+
+async def test_paginator_pages_are_guarded(upstream: Upstream, service: ProxyQueryService) -> None:
+    upstream.fail = True
+    paginator = await service.course_paginator(subject_areas="COMP SCI", prefetch=4)
+    # Pages are retried like any other query
+    with pytest.raises(aiohttp.ClientResponseError):
+        await anext(aiter(paginator))
+    assert upstream.calls == 3
+    with pytest.raises(UpstreamUnavailableException):
+        await anext(aiter(paginator))
+    # The circuit breaker is open, so the crawl fails fast without calling upstream
+    assert service.guard.breaker.state == "open"
+    calls = upstream.calls
+    with pytest.raises(UpstreamUnavailableException):
+        await anext(aiter(paginator))
+    assert upstream.calls == calls
+    await paginator.aclose()
+
+
+async def test_retry_recovers_from_transient_failure(upstream: Upstream, service: ProxyQueryService) -> None:
+    upstream.fail_times = 1
+    assert (await service.campus())[0].DESCR == "North Terrace 2"
+    assert service.stats().attempts == 2
+
+
+async def test_hedged_attempt_wins_over_slow_attempt(upstream: Upstream, service: ProxyQueryService) -> None:
+    window = service.latency[services.CAMPUS_TARGET]
+    for _ in range(window.min_samples):
+        window.add(0.01)
+    upstream.delays = [0.5]
+    assert (await service.campus())[0].DESCR == "North Terrace 2"
+    stats = service.stats()
+    assert (stats.attempts, stats.hedged_calls, stats.hedge_wins) == (2, 1, 1)
+    assert upstream.calls == 2
+
+
+async def test_deadline_bounds_retries(upstream: Upstream, service: ProxyQueryService) -> None:
+    service.retry_policy[services.CAMPUS_TARGET] = RetryPolicy(attempts=10, deadline=0.05, hedge=False)
+    upstream.fail = True
+    with pytest.raises(aiohttp.ServerTimeoutError):
+        await service.campus()
+
+
+def test_course_detail_batch() -> None:
+    calls: list[str] = []
+
+    async def course_detail(course_id: str, course_offer_number: int, term: int, year: int = 2024) -> CourseDetail:
+        calls.append(course_id)
+        await asyncio.sleep(0)
+        if course_id == "missing":
+            raise NotFoundException("Course missing not found")
+        fields: dict[str, object] = {field: "" for field in CourseDetail.__struct_fields__}
+        fields.update(COURSE_ID=course_id, COURSE_TITLE=f"Course {course_id} {year}", EFTLS=0.125)
+        fields["CRITICAL_DATES"] = {"CENSUS_DT": "", "LAST_DAY": "", "LAST_DAY_TO_WF": "", "LAST_DAY_TO_WFN": ""}
+        return msgspec.convert(fields, CourseDetail)
+
+    service = ProxyQueryService(None, ProxySettings())  # type: ignore[arg-type]
+    service.course_detail = course_detail  # type: ignore[method-assign]
+    app = Litestar([ProxyController], state=State({PROXY_SERVICE_STATE_KEY: service}))
+    keys = [
+        {"courseId": "2", "courseOfferNumber": 1, "term": 4410},
+        {"courseId": "missing", "courseOfferNumber": 1, "term": 4410},
+        {"courseId": "1", "courseOfferNumber": 1, "term": 4410, "year": 2025},
+        {"courseId": "2", "courseOfferNumber": 1, "term": 4410, "year": 2024},
+    ]
+    with TestClient(app) as client:
+        response = client.post("/proxy/courseDetail/batch", json=keys)
+        assert response.status_code == 200
+        items = response.json()
+        assert [(item["courseId"], item["year"]) for item in items] == [
+            ("2", 2024),
+            ("missing", 2024),
+            ("1", 2025),
+            ("2", 2024),
+        ]
+        # Duplicate keys are queried once
+        assert sorted(calls) == ["1", "2", "missing"]
+        assert items[0] == items[3]
+        assert items[0]["error"] is None
+        assert items[2]["detail"]["courseTitle"] == "Course 1 2025"
+        assert items[1] == {
+            "courseId": "missing",
+            "courseOfferNumber": 1,
+            "term": 4410,
+            "year": 2024,
+            "detail": None,
+            "error": "404: Course missing not found",
+        }
+        too_many = [keys[0]] * (service.config.BATCH_MAX_SIZE + 1)
+        assert client.post("/proxy/courseDetail/batch", json=too_many).status_code == 400
+        assert len(calls) == 3
+
+
+def class_list(course_id: str, session: int) -> list[Group]:
+    meeting = Meetings(dates="26 Feb - 31 May", days="Monday", start_time="9am", end_time="10am", location="")
+    class_info = ClassInfo(
+        class_nbr=f"{course_id}-{session}",
+        section="LE01",
+        size=10,
+        enrolled=0,
+        available=10,
+        institution="UOFAD",
+        component="",
+        meetings=[meeting],
+    )
+    return [Group(type="Lecture", classes=[class_info])]
+
+
+def test_course_class_list(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def course_class_list(course_id: str, course_offer_number: int, term: int, session: int = 1) -> list[Group]:
+        return class_list(course_id, session)
+
+    service = ProxyQueryService(None, ProxySettings())  # type: ignore[arg-type]
+    monkeypatch.setattr(service, "course_class_list", course_class_list)
+    app = Litestar([ProxyController], state=State({PROXY_SERVICE_STATE_KEY: service}))
+    with TestClient(app) as client:
+        response = client.get(
+            "/proxy/courseClassList", params={"course_id": "1", "course_offer_number": 1, "term": 4410}
+        )
+        assert response.json() == [
+            {
+                "type": "Lecture",
+                "classes": [
+                    {
+                        "classNbr": "1-1",
+                        "section": "LE01",
+                        "size": 10,
+                        "enrolled": 0,
+                        "available": 10,
+                        "institution": "UOFAD",
+                        "component": "",
+                    }
+                ],
+            }
+        ]
+
+
+def test_course_class_list_batch() -> None:
+    calls: list[str] = []
+
+    async def course_class_list(course_id: str, course_offer_number: int, term: int, session: int = 1) -> list[Group]:
+        calls.append(course_id)
+        await asyncio.sleep(0)
+        if course_id == "missing":
+            raise NotFoundException("Course missing not found")
+        return class_list(course_id, session)
+
+    service = ProxyQueryService(None, ProxySettings())  # type: ignore[arg-type]
+    service.course_class_list = course_class_list  # type: ignore[method-assign]
+    app = Litestar([ProxyController], state=State({PROXY_SERVICE_STATE_KEY: service}))
+    keys = [
+        {"courseId": "2", "courseOfferNumber": 1, "term": 4410},
+        {"courseId": "missing", "courseOfferNumber": 1, "term": 4410},
+        {"courseId": "1", "courseOfferNumber": 1, "term": 4410, "session": 2},
+        {"courseId": "2", "courseOfferNumber": 1, "term": 4410, "session": 1},
+    ]
+    with TestClient(app) as client:
+        items = client.post("/proxy/courseClassList/batch", json=keys).json()
+        assert [(item["courseId"], item["session"]) for item in items] == [("2", 1), ("missing", 1), ("1", 2), ("2", 1)]
+        assert sorted(calls) == ["1", "2", "missing"]
+        assert items[0] == items[3]
+        assert items[0]["error"] is None
+        # Class lists are encoded like the single class list route
+        single = client.get("/proxy/courseClassList", params={"course_id": "2", "course_offer_number": 1, "term": 4410})
+        assert items[0]["groups"] == single.json()
+        assert items[1] == {
+            "courseId": "missing",
+            "courseOfferNumber": 1,
+            "term": 4410,
+            "session": 1,
+            "groups": [],
+            "error": "404: Course missing not found",
+        }
+        too_many = [keys[0]] * (service.config.BATCH_MAX_SIZE + 1)
+        assert client.post("/proxy/courseClassList/batch", json=too_many).status_code == 400
+
+
+def test_course_routes_without_catalogue(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def course(**kwargs: object) -> list[CourseSearch]:
+        return [CourseSearch(**{field: "1" for field in CourseSearch.__struct_fields__})]
+
+    service = ProxyQueryService(None, ProxySettings(SERVE_FROM_CATALOGUE=False))  # type: ignore[arg-type]
+    monkeypatch.setattr(service, "course", course)
+    # No database is configured - upstream mode must not open a session
+    app = Litestar([ProxyController], state=State({PROXY_SERVICE_STATE_KEY: service}))
+    with TestClient(app) as client:
+        response = client.get("/proxy/course", params={"subjectAreas": "COMP SCI"})
+        assert response.status_code == 200
+        assert response.json()[0]["courseId"] == "1"
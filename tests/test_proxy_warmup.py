@@ -0,0 +1,139 @@
+import asyncio
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.testing import TestClient
+
+from src.config.base import ProxySettings
+from src.config.constants import PROXY_SERVICE_STATE_KEY, PROXY_WARMUP_STATE_KEY
+from src.controller.proxy.router import ProxyController
+from src.controller.proxy.schema import Campus, Career, Subject, Term
+from src.controller.proxy.services import ProxyQueryService
+from src.controller.proxy.warmup import ReferenceWarmup
+
+
+class Upstream:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fail = False
+
+    async def call(self, param_builder: object, response_dto: type, extractor: str) -> object:
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("upstream failed")
+        rows: dict[type, object] = {
+            Campus: [Campus(CAMPUS="Adelaide", DESCR="Adelaide")],
+            Career: [Career(FIELDVALUE="UGRD", XLATLONGNAME="Undergraduate")],
+            Term: [Term(TERM="4410", DESCR="Semester 1", ACAD_YEAR="2024", CURRENT="Y")],
+            Subject: [Subject(SUBJECT="COMP SCI", DESCR="Computer Science")],
+        }
+        return SimpleNamespace(data=rows[response_dto])
+
+
+def proxy_service(upstream: Upstream) -> ProxyQueryService:
+    service = ProxyQueryService(None, ProxySettings())  # type: ignore[arg-type]
+    service._call = upstream.call  # type: ignore[method-assign,assignment]
+    return service
+
+
+async def test_snapshot_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "snapshot.msgpack"
+    upstream = Upstream()
+    warmup = ReferenceWarmup(proxy_service(upstream), str(path))
+    await warmup.start()
+    assert warmup._task is not None
+    await warmup._task
+    assert warmup.status.ready
+    assert upstream.calls == 4
+    # Saved once warm, as there was no snapshot to start from
+    assert path.exists()
+
+    # A cold start serves the snapshot without calling upstream
+    upstream.fail = True
+    cold = ReferenceWarmup(proxy_service(upstream), str(path), enabled=False)
+    assert cold.load_snapshot() == 4
+    assert cold.status.snapshot_entries == 4
+    assert [campus.CAMPUS for campus in await cold.proxy_service.campus()] == ["Adelaide"]
+    assert upstream.calls == 4
+
+
+async def test_expired_snapshot_is_served_stale(tmp_path: Path) -> None:
+    path = tmp_path / "snapshot.msgpack"
+    upstream = Upstream()
+    service = proxy_service(upstream)
+    await service.term()
+    for _, entry in service.cache.memory.items():
+        entry.expires_at = time.time() - 1
+    warmup = ReferenceWarmup(service, str(path))
+    assert warmup.save_snapshot() == 1
+
+    cold = ReferenceWarmup(proxy_service(upstream), str(path))
+    assert cold.load_snapshot() == 1
+    upstream.fail = True
+    assert [term.TERM for term in await cold.proxy_service.term()] == ["4410"]
+    assert cold.proxy_service.stale_hits == 1
+    await cold.proxy_service.close()
+
+    # Corrupt snapshots are ignored
+    path.write_bytes(b"not msgpack")
+    assert ReferenceWarmup(proxy_service(upstream), str(path)).load_snapshot() == 0
+
+
+async def test_ready_once_snapshot_is_refreshed(tmp_path: Path) -> None:
+    path = tmp_path / "snapshot.msgpack"
+    upstream = Upstream()
+    service = proxy_service(upstream)
+    await ReferenceWarmup(service, str(path)).warm()
+    for _, entry in service.cache.memory.items():
+        entry.expires_at = time.time() - 1
+    ReferenceWarmup(service, str(path)).save_snapshot()
+    expired = ReferenceWarmup(service, str(path))
+    expired.load_snapshot()
+
+    # Expired snapshot data is served, but does not make the application ready
+    upstream.fail = True
+    cold = ReferenceWarmup(proxy_service(upstream), str(path))
+    await cold.start()
+    assert cold._task is not None
+    deadline = time.monotonic() + 5
+    while cold.status.error is None and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    assert (cold.status.ready, cold.status.error) == (False, "upstream failed")
+
+    upstream.fail = False
+    await cold._task
+    assert cold.status.ready
+    assert cold.proxy_service.stale_hits > 0
+    # The refreshed data is saved even though the snapshot was loaded
+    refreshed = ReferenceWarmup(service, str(path))
+    assert refreshed.load_snapshot() == 4
+    assert (refreshed.status.snapshot_saved_at or 0) > (expired.status.snapshot_saved_at or 0) > 0
+    await cold.close()
+
+
+def test_readiness_flips_once_warm(tmp_path: Path) -> None:
+    upstream = Upstream()
+    upstream.fail = True
+    service = proxy_service(upstream)
+    warmup = ReferenceWarmup(service, str(tmp_path / "snapshot.msgpack"))
+    app = Litestar(
+        [ProxyController],
+        state=State({PROXY_SERVICE_STATE_KEY: service, PROXY_WARMUP_STATE_KEY: warmup}),
+        on_startup=[warmup.start],
+        on_shutdown=[warmup.close],
+    )
+    with TestClient(app) as client:
+        response = client.get("/proxy/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+        upstream.fail = False
+        deadline = time.monotonic() + 5
+        while (response := client.get("/proxy/ready")).status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert response.status_code == 200
+        assert response.json()["error"] is None
+        assert response.json()["warmedAt"] is not None
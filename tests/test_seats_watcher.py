@@ -0,0 +1,166 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Literal
+
+import pytest
+
+from src.config.base import SeatWatchSettings
+from src.controller.catalogue.schema import ClassListChangeSet, ClassSectionChange, SeatCount
+from src.controller.proxy.schema import ClassInfo, CourseClassListKey, Group
+from src.controller.seats.schema import SeatChanges, SeatSnapshot
+from src.controller.seats.services import SeatWatcher, Subscription, watch
+
+KEY = CourseClassListKey(course_id="107592", course_offer_number=1, term=4410)
+
+
+class Upstream:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.available = {"10001": 5, "10002": 0}
+        self.fail = False
+
+    async def course_class_list(self, course_id: str, course_offer_number: int, term: int, session: int) -> list[Group]:
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("upstream failed")
+        classes = [
+            ClassInfo(
+                class_nbr=class_nbr,
+                section=f"LE{class_nbr[-1]}",
+                size=10,
+                enrolled=10 - available,
+                available=available,
+                institution="UOFAD",
+                component="",
+                meetings=[],
+            )
+            for class_nbr, available in self.available.items()
+        ]
+        return [Group(type="Lecture", classes=classes)]
+
+
+def seat_watcher(upstream: Upstream, poll_interval: float = 0.01) -> SeatWatcher:
+    return SeatWatcher(
+        SimpleNamespace(course_class_list=upstream.course_class_list),  # type: ignore[arg-type]
+        SeatWatchSettings(POLL_INTERVAL=poll_interval, HEARTBEAT_INTERVAL=1, MAX_COURSES=2),
+    )
+
+
+async def test_one_poller_per_course() -> None:
+    upstream = Upstream()
+    watcher = seat_watcher(upstream)
+    subscriptions = await asyncio.gather(*(watcher.subscribe(KEY, ["10002"]) for _ in range(20)))
+    everything = await watcher.subscribe(KEY)
+    try:
+        assert watcher.watched == 1
+        assert upstream.calls == 1
+        snapshot = subscriptions[0].snapshot
+        assert snapshot is not None
+        assert [(c.class_nbr, c.seats.available) for c in snapshot.classes] == [("10002", 0)]
+        assert everything.snapshot is not None and len(everything.snapshot.classes) == 2
+
+        upstream.available["10001"] = 4
+        changes = await everything.next(timeout=1)
+        assert changes is not None
+        assert summary(changes) == [("changed", "10001", 5, 4)]
+        # Changes to classes a subscriber does not watch are not pushed to it
+        assert await subscriptions[0].next(timeout=0.05) is None
+
+        upstream.available["10002"] = 1
+        changes = await subscriptions[0].next(timeout=1)
+        assert changes is not None
+        assert summary(changes) == [("changed", "10002", 0, 1)]
+        # One upstream poll per interval, however many subscribers there are
+        assert upstream.calls < 40
+    finally:
+        for subscription in [*subscriptions, everything]:
+            watcher.unsubscribe(subscription)
+    assert watcher.watched == 0
+    await watcher.close()
+
+
+def summary(changes: SeatChanges) -> list[tuple[str, str, int | None, int | None]]:
+    return [
+        (c.kind, c.class_nbr, c.old.available if c.old else None, c.new.available if c.new else None)
+        for c in changes.changes
+    ]
+
+
+def change(class_nbr: str, old: int | None, new: int | None) -> ClassSectionChange:
+    def seats(available: int | None) -> SeatCount | None:
+        return None if available is None else SeatCount(size=10, enrolled=10 - available, available=available)
+
+    kind: Literal["added", "changed", "removed"] = "added" if old is None else "removed" if new is None else "changed"
+    return ClassSectionChange(
+        kind=kind, group_type="Lecture", class_nbr=class_nbr, section="LE01", old=seats(old), new=seats(new)
+    )
+
+
+async def test_slow_subscriber_gets_merged_changes() -> None:
+    subscription = Subscription(KEY, None)
+    subscription.push([change("1", 0, 1), change("2", 3, 2)])
+    subscription.push([change("1", 1, 2), change("2", 2, 3), change("3", None, 5)])
+    subscription.push([change("3", 5, None)])
+    changes = await subscription.next(timeout=0)
+    assert changes is not None
+    assert summary(changes) == [("changed", "1", 0, 2)]
+    assert await subscription.next(timeout=0) is None
+
+
+async def test_first_fetch_error_fails_subscription() -> None:
+    upstream = Upstream()
+    upstream.fail = True
+    watcher = seat_watcher(upstream)
+    with pytest.raises(RuntimeError):
+        await watcher.subscribe(KEY)
+    assert watcher.watched == 0
+
+    upstream.fail = False
+    subscription = await watcher.subscribe(KEY)
+    # Later failures keep the last seat counts
+    upstream.fail = True
+    await asyncio.sleep(0.05)
+    assert watcher.watched == 1
+    watcher.unsubscribe(subscription)
+    await watcher.close()
+
+
+async def test_catalogue_change_sets_are_pushed_once() -> None:
+    upstream = Upstream()
+    watcher = seat_watcher(upstream, poll_interval=0.05)
+    subscription = await watcher.subscribe(KEY)
+    messages = aiter(watch(watcher, subscription, heartbeat=1))
+    assert isinstance(await anext(messages), SeatSnapshot)
+
+    upstream.available["10002"] = 3
+    watcher.on_change_set(
+        ClassListChangeSet(
+            course_id="107592",
+            course_offer_nbr="1",
+            term="4410",
+            session="1",
+            changes=[change("10002", 0, 3)],
+            unchanged=1,
+        )
+    )
+    changes = await anext(messages)
+    assert isinstance(changes, SeatChanges)
+    assert summary(changes) == [("changed", "10002", 0, 3)]
+    # The next poll finds the same seat counts, which were already pushed
+    await asyncio.sleep(0.1)
+    assert await subscription.next(timeout=0) is None
+
+    await messages.aclose()  # type: ignore[attr-defined]
+    assert watcher.watched == 0
+    await watcher.close()
+
+
+async def test_max_courses() -> None:
+    watcher = seat_watcher(Upstream())
+    subscriptions = [await watcher.subscribe(KEY), await watcher.subscribe(CourseClassListKey("1", 1, 4410))]
+    with pytest.raises(Exception, match="Too many courses"):
+        await watcher.subscribe(CourseClassListKey("2", 1, 4410))
+    for subscription in subscriptions:
+        watcher.unsubscribe(subscription)
+    await watcher.close()